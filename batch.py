@@ -0,0 +1,337 @@
+"""
+여러 청구서를 동시에 처리하는 일괄 분석 모듈
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from extraction import (
+    DEFAULT_PROMPT,
+    GEMINI_MODEL_NAME,
+    extract_bill,
+    load_bill_image,
+    prepare_bill_source,
+    request_packed_extraction
+)
+from bill_store import content_hash
+from extraction_cache import make_cache_key
+from extractors import BillDocument, local_first_chain
+from gemini_client import payload_bytes
+from image_utils import PreprocessOptions
+from pdf_utils import DEFAULT_PDF_DPI, extract_pdf_text
+from tracing import span
+
+
+DEFAULT_CONCURRENCY = 4
+
+# 한 번의 요청에 묶을 최대 청구서 수와 이미지 크기 합계
+# (Gemini 인라인 요청 한도 20MB보다 충분히 작게 유지)
+DEFAULT_MAX_PACK_ITEMS = 6
+DEFAULT_MAX_PACK_BYTES = 8 * 1024 * 1024
+
+
+@dataclass
+class BatchItem:
+    """일괄 처리할 청구서 한 건 (파일명과 원본 바이트)"""
+    name: str
+    data: bytes
+
+
+@dataclass
+class BatchResult:
+    """청구서 한 건의 처리 결과"""
+    name: str
+    parsed_data: dict = None
+    error: str = None
+    from_cache: bool = False
+    from_history: bool = False
+    elapsed: float = 0.0
+    # 모델 라우팅을 사용한 경우 최종 결과를 낸 모델과 승격 여부
+    model_name: str = None
+    escalated: bool = False
+    # 결과를 낸 입력 (파일명이 같은 청구서를 구분하여 이력에 저장)
+    item: BatchItem = field(default=None, repr=False, compare=False)
+
+    @property
+    def success(self):
+        return self.error is None
+
+
+def _with_history(items, store, model_name, extract):
+    """
+    처리 이력(BillStore)에 있는 청구서는 Gemini를 호출하지 않고 저장된 결과로 반환하고,
+    나머지는 extract(items)로 분석한 뒤 성공한 결과를 이력에 저장 (generator)
+    """
+    if store is None:
+        yield from extract(items)
+        return
+
+    # 파일명은 겹칠 수 있으므로(휴대폰 업로드의 image.jpg 등) 입력 객체별로 해시를 기록
+    hashes = {id(item): content_hash(item.data) for item in items}
+    known = store.find_many(hashes.values())
+    new_items = []
+    for item in items:
+        stored = known.get(hashes[id(item)])
+        if stored is None:
+            new_items.append(item)
+        else:
+            yield BatchResult(name=item.name, parsed_data=stored.parsed_data, from_history=True, item=item)
+
+    for result in extract(new_items):
+        if result.success:
+            store.record(hashes[id(result.item)], result.name, result.parsed_data, result.model_name or model_name)
+        yield result
+
+
+def _process_item(item, api_key, prompt, model_name, cache, pdf_dpi, pdf_grayscale, preprocess,
+                  local_first=False, router=None):
+    started = time.perf_counter()
+    decision = None
+    try:
+        with span("bill.process", file=item.name):
+            image = load_bill_image(item.name, item.data, dpi=pdf_dpi, grayscale=pdf_grayscale)
+            pdf_text = extract_pdf_text(item.data) if local_first and item.name.lower().endswith(".pdf") else ""
+            if pdf_text:
+                # 인쇄된 항목은 텍스트 레이어에서 읽고 나머지만 Gemini에 요청
+                chain = local_first_chain(api_key, model_name, cache, preprocess, prompt=prompt, router=router)
+                parsed_data, _ = chain.extract(BillDocument(name=item.name, text=pdf_text, source=image))
+                from_cache = False
+                decision = chain.routing
+            elif router is not None:
+                parsed_data, from_cache, decision = router.extract(image, api_key, prompt, cache, preprocess)
+            else:
+                parsed_data, from_cache = extract_bill(image, api_key, prompt, model_name, cache, preprocess)
+        return BatchResult(
+            name=item.name,
+            parsed_data=parsed_data,
+            from_cache=from_cache,
+            elapsed=time.perf_counter() - started,
+            model_name=decision.model_name if decision else None,
+            escalated=decision.escalated if decision else False,
+            item=item
+        )
+    except Exception as e:
+        # 한 건의 실패가 나머지 처리를 막지 않도록 결과로 기록
+        return BatchResult(
+            name=item.name,
+            error=f"{type(e).__name__}: {e}",
+            elapsed=time.perf_counter() - started,
+            item=item
+        )
+
+
+def extract_bills(items, api_key, prompt=DEFAULT_PROMPT, model_name=GEMINI_MODEL_NAME,
+                  concurrency=DEFAULT_CONCURRENCY, cache=None, pdf_dpi=DEFAULT_PDF_DPI,
+                  pdf_grayscale=False, preprocess=None, local_first=False, store=None, router=None):
+    """
+    여러 청구서를 스레드 풀에서 동시에 분석하고 완료되는 순서대로 결과를 반환 (generator)
+
+    Args:
+        items: BatchItem 목록
+        api_key: Gemini API 키
+        prompt: 분석 프롬프트
+        model_name: 사용할 Gemini 모델명
+        concurrency: 동시에 실행할 최대 요청 수
+        cache: ExtractionCache (선택)
+        pdf_dpi: PDF 변환 해상도
+        pdf_grayscale: True이면 PDF를 흑백으로 변환
+        preprocess: 이미지 전처리 설정 PreprocessOptions (선택)
+        local_first: True이면 텍스트가 있는 PDF의 인쇄된 항목을 로컬에서 먼저 추출
+        store: 처리 이력 BillStore (선택, 이미 처리한 청구서는 저장된 결과를 사용)
+        router: model_router.ModelRouter (선택, 빠른 모델 먼저 요청하고 검사에 실패하면 상위 모델로 재요청)
+    """
+    def extract(items):
+        if not items:
+            return
+        max_workers = max(1, min(concurrency, len(items)))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gemini-batch") as executor:
+            futures = [
+                executor.submit(_process_item, item, api_key, prompt, model_name, cache,
+                                pdf_dpi, pdf_grayscale, preprocess, local_first, router)
+                for item in items
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+
+    yield from _with_history(list(items), store, model_name, extract)
+
+
+@dataclass
+class _PackEntry:
+    item: BatchItem
+    source: object
+    cache_key: str
+    started: float
+
+
+def source_size(source):
+    """
+    Gemini에 보낼 입력의 대략적인 크기(바이트)
+    """
+    # 전처리하지 않은 PIL 이미지는 압축 전 크기의 1/10 정도로 추정
+    return payload_bytes([source])
+
+
+def plan_packs(sizes, max_items=DEFAULT_MAX_PACK_ITEMS, max_bytes=DEFAULT_MAX_PACK_BYTES):
+    """
+    입력 크기 목록을 순서대로 묶어 요청 단위(위치 목록)로 나눔
+    한 묶음은 max_items개, 크기 합계 max_bytes를 넘지 않음 (단, 큰 입력 하나는 단독으로 묶음)
+    """
+    packs = []
+    current = []
+    current_bytes = 0
+    for index, size in enumerate(sizes):
+        if current and (len(current) >= max_items or current_bytes + size > max_bytes):
+            packs.append(current)
+            current = []
+            current_bytes = 0
+        current.append(index)
+        current_bytes += size
+    if current:
+        packs.append(current)
+    return packs
+
+
+def _prepare_entry(item, prompt, model_name, cache, pdf_dpi, pdf_grayscale, preprocess):
+    started = time.perf_counter()
+    image = load_bill_image(item.name, item.data, dpi=pdf_dpi, grayscale=pdf_grayscale)
+    source, _ = prepare_bill_source(image, preprocess, original_bytes=len(item.data))
+    cache_key = make_cache_key(source, prompt, model_name) if cache is not None else None
+    return _PackEntry(item=item, source=source, cache_key=cache_key, started=started)
+
+
+def _finish_entry(entry, parsed_data, cache, model_name, decision=None):
+    if cache is not None:
+        cache.put(entry.cache_key, parsed_data, model_name)
+    return BatchResult(
+        name=entry.item.name,
+        parsed_data=parsed_data,
+        elapsed=time.perf_counter() - entry.started,
+        model_name=decision.model_name if decision else None,
+        escalated=decision.escalated if decision else False,
+        item=entry.item
+    )
+
+
+def _process_pack(entries, api_key, prompt, model_name, cache, router=None):
+    """
+    묶음 하나를 요청하고, 실패한 청구서만 나누어 다시 요청
+    - 요청 전체가 실패하면 묶음을 반으로 나눠 각각 다시 요청
+    - 응답에서 빠진 청구서는 한 건씩 다시 요청
+    - router가 있으면 묶음은 첫 단계(빠른) 모델로 요청하고, 검사에 실패한 청구서만 상위 모델로 한 건씩 재요청
+      (캐시에는 라우팅 이름으로 최종 결과를 저장)
+    """
+    if len(entries) == 1:
+        entry = entries[0]
+        try:
+            if router is not None:
+                parsed_data, decision = router.route(entry.source, api_key, prompt)
+                return [_finish_entry(entry, parsed_data, cache, router.name, decision)]
+            parsed_data, _ = extract_bill(entry.source, api_key, prompt, model_name)
+            return [_finish_entry(entry, parsed_data, cache, model_name)]
+        except Exception as e:
+            return [BatchResult(
+                name=entry.item.name,
+                error=f"{type(e).__name__}: {e}",
+                elapsed=time.perf_counter() - entry.started,
+                item=entry.item
+            )]
+
+    started = time.perf_counter()
+    try:
+        extracted = request_packed_extraction(
+            [entry.source for entry in entries], api_key, prompt,
+            router.first_model if router is not None else model_name
+        )
+    except Exception:
+        middle = len(entries) // 2
+        return (_process_pack(entries[:middle], api_key, prompt, model_name, cache, router)
+                + _process_pack(entries[middle:], api_key, prompt, model_name, cache, router))
+    pack_elapsed = time.perf_counter() - started
+
+    results = []
+    for index, entry in enumerate(entries):
+        if index not in extracted:
+            results.extend(_process_pack([entry], api_key, prompt, model_name, cache, router))
+        elif router is not None:
+            try:
+                parsed_data, decision = router.route(entry.source, api_key, prompt,
+                                                     first_result=(extracted[index], pack_elapsed))
+                results.append(_finish_entry(entry, parsed_data, cache, router.name, decision))
+            except Exception as e:
+                results.append(BatchResult(
+                    name=entry.item.name,
+                    error=f"{type(e).__name__}: {e}",
+                    elapsed=time.perf_counter() - entry.started,
+                    item=entry.item
+                ))
+        else:
+            results.append(_finish_entry(entry, extracted[index], cache, model_name))
+    return results
+
+
+def extract_bills_packed(items, api_key, prompt=DEFAULT_PROMPT, model_name=GEMINI_MODEL_NAME,
+                         concurrency=DEFAULT_CONCURRENCY, cache=None, pdf_dpi=DEFAULT_PDF_DPI,
+                         pdf_grayscale=False, preprocess=None, max_pack_items=DEFAULT_MAX_PACK_ITEMS,
+                         max_pack_bytes=DEFAULT_MAX_PACK_BYTES, store=None, router=None):
+    """
+    여러 청구서를 묶어서 한 번의 요청으로 분석하고 완료되는 순서대로 결과를 반환 (generator)
+    묶음 크기는 전처리된 이미지 크기에 따라 자동으로 정해지며, 실패한 청구서만 나누어 다시 요청
+
+    Args:
+        extract_bills와 같고, 추가로
+        max_pack_items: 한 번의 요청에 묶을 최대 청구서 수
+        max_pack_bytes: 한 번의 요청에 묶을 이미지 크기 합계 상한
+    """
+    def extract(items):
+        return _extract_packed(items, api_key, prompt, model_name, concurrency, cache, pdf_dpi,
+                               pdf_grayscale, preprocess, max_pack_items, max_pack_bytes, router)
+
+    yield from _with_history(list(items), store, model_name, extract)
+
+
+def _extract_packed(items, api_key, prompt, model_name, concurrency, cache, pdf_dpi, pdf_grayscale,
+                    preprocess, max_pack_items, max_pack_bytes, router=None):
+    items = list(items)
+    if not items:
+        return
+
+    # 묶음 크기를 정하려면 전송 크기를 알아야 하므로 기본 전처리를 적용
+    # (원본 크기는 업로드된 바이트 수를 그대로 사용하여 재인코딩 추정을 하지 않음)
+    preprocess = preprocess or PreprocessOptions()
+    max_workers = max(1, min(concurrency, len(items)))
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gemini-pack") as executor:
+        prepare_futures = {
+            executor.submit(_prepare_entry, item, prompt, router.name if router is not None else model_name,
+                            cache, pdf_dpi, pdf_grayscale, preprocess): item
+            for item in items
+        }
+
+        pending = []
+        for future, item in prepare_futures.items():
+            try:
+                entry = future.result()
+            except Exception as e:
+                yield BatchResult(name=item.name, error=f"{type(e).__name__}: {e}", item=item)
+                continue
+
+            cached_data = cache.get(entry.cache_key) if cache is not None else None
+            if cached_data is not None:
+                yield BatchResult(
+                    name=item.name,
+                    parsed_data=cached_data,
+                    from_cache=True,
+                    elapsed=time.perf_counter() - entry.started,
+                    item=item
+                )
+            else:
+                pending.append(entry)
+
+        packs = plan_packs([source_size(entry.source) for entry in pending], max_pack_items, max_pack_bytes)
+        pack_futures = [
+            executor.submit(_process_pack, [pending[i] for i in pack], api_key, prompt, model_name, cache, router)
+            for pack in packs
+        ]
+        for future in as_completed(pack_futures):
+            yield from future.result()
@@ -0,0 +1,73 @@
+"""
+공문 일괄 생성 벤치마크
+청구서마다 generate_water_bill_document를 호출하는 방식과 bulk_documents의 ZIP/병합 방식을 비교하고,
+건수를 늘려도 최대 메모리 사용량(tracemalloc)이 일정한지 확인
+
+사용 예:
+    python benchmarks/bench_bulk_documents.py --counts 100 1000
+"""
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulk_documents import write_documents_zip, write_merged_document  # noqa: E402
+from odt_utils import generate_water_bill_document  # noqa: E402
+
+
+def make_records(count):
+    """청구서 count건 분량의 추출 결과 레코드 (generator)"""
+    for index in range(count):
+        yield {
+            "name": f"청구서_{index:05d}.pdf",
+            "due_date_amount": 100_000 + index * 37,
+            "water_usage_m3": 120 + index % 30,
+            "lab1_tons": 30 + index % 7,
+            "lab2_tons": 20 + index % 5,
+            "service_period": "2025.06.23 ~ 2025.07.22",
+        }
+
+
+def run_per_call(template_path, count, output_dir):
+    for index, record in enumerate(make_records(count)):
+        generate_water_bill_document(template_path, os.path.join(output_dir, f"{index}.odt"), record)
+
+
+def measure(label, count, func):
+    tracemalloc.start()
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {count:>6}건  {elapsed:7.2f}초  {count / elapsed:8.1f}건/초  "
+          f"최대 메모리 {peak / 1024 / 1024:7.1f}MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="공문 일괄 생성 벤치마크")
+    parser.add_argument("--template", help="템플릿 ODT (기본값: 서식 폴더의 첫 번째 파일)")
+    parser.add_argument("--counts", type=int, nargs="+", default=[100, 1000])
+    args = parser.parse_args(argv)
+
+    template_path = args.template or sorted(glob.glob("서식/*.odt"))[0]
+    with tempfile.TemporaryDirectory() as output_dir:
+        for count in args.counts:
+            measure("건별 generate 호출", count, lambda: run_per_call(template_path, count, output_dir))
+            zip_path = os.path.join(output_dir, "bulk.zip")
+            measure("ZIP 일괄 생성", count,
+                    lambda: write_documents_zip(template_path, make_records(count), zip_path))
+            print(f"{'':<28} ZIP 크기 {os.path.getsize(zip_path) / 1024 / 1024:.1f}MB")
+            merged_path = os.path.join(output_dir, "merged.odt")
+            measure("병합 문서 생성", count,
+                    lambda: write_merged_document(template_path, make_records(count), merged_path))
+            print(f"{'':<28} 병합 문서 크기 {os.path.getsize(merged_path) / 1024 / 1024:.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Gemini 클라이언트 재사용 벤치마크
+매번 configure + GenerativeModel을 새로 만드는 방식과 캐시된 모델을 재사용하는 방식의 응답 시간을 비교
+
+사용 예:
+    python benchmarks/bench_client_reuse.py --calls 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import google.generativeai as genai  # noqa: E402
+from dotenv import load_dotenv  # noqa: E402
+
+from gemini_client import GEMINI_MODEL_NAME, generate_content, latency_stats  # noqa: E402
+
+PROMPT = "숫자 1을 JSON {\"value\": 1} 형식으로만 답하세요."
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gemini 클라이언트 재사용 벤치마크")
+    parser.add_argument("--calls", type=int, default=5)
+    parser.add_argument("--model", default=GEMINI_MODEL_NAME)
+    args = parser.parse_args(argv)
+
+    load_dotenv(dotenv_path="gemini.env")
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        parser.error("GEMINI_API_KEY가 없습니다.")
+
+    fresh = []
+    for _ in range(args.calls):
+        started = time.perf_counter()
+        genai.configure(api_key=api_key)
+        genai.GenerativeModel(args.model).generate_content(PROMPT)
+        fresh.append(time.perf_counter() - started)
+
+    for _ in range(args.calls):
+        generate_content(api_key, args.model, PROMPT)
+
+    summary = latency_stats.summary()
+    print(f"매번 새로 생성: 평균 {statistics.mean(fresh):.3f}s")
+    print(f"재사용 (cold):  {summary['cold_avg']:.3f}s × {summary['cold_calls']}")
+    if summary["warm_calls"]:
+        print(f"재사용 (warm):  평균 {summary['warm_avg']:.3f}s × {summary['warm_calls']}")
+
+
+if __name__ == "__main__":
+    main()
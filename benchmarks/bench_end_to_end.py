@@ -0,0 +1,273 @@
+"""
+종단간 벤치마크 (가짜 Gemini 모델, 합성 청구서/템플릿 사용, 네트워크 불필요)
+
+단건 분석, 일괄 분석(동시 요청 / 묶음 요청), 공문 생성(건별 / ZIP 일괄) 경로의
+처리량, p50/p99 응답 시간, 최대 메모리(tracemalloc), 단계별 처리 시간을 측정하고
+결과를 JSON으로 저장하여 커밋 간에 비교할 수 있게 합니다.
+
+사용 예:
+    python benchmarks/bench_end_to_end.py                              # benchmarks/results/에 저장
+    python benchmarks/bench_end_to_end.py --sizes small large --latency 0.5 --error-rate 0.1
+    python benchmarks/bench_end_to_end.py --compare benchmarks/results/이전결과.json
+    python benchmarks/bench_end_to_end.py --route --fast-bad-rate 0.2   # 모델 라우팅 (승격률·상대 비용 기록)
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import gemini_client  # noqa: E402
+from batch import BatchItem  # noqa: E402
+from benchmarks.fake_gemini import DEFAULT_RESPONSE, FakeGenerativeModel, FakeModelFactory  # noqa: E402
+from benchmarks.synthetic import IMAGE_SIZES, make_bill_files, make_template_odt  # noqa: E402
+from bulk_documents import write_documents_zip  # noqa: E402
+from image_utils import PreprocessOptions  # noqa: E402
+from model_router import default_router, router_stats  # noqa: E402
+from odt_utils import build_water_bill_document  # noqa: E402
+from pipeline import BillPipeline  # noqa: E402
+from request_scheduler import RequestScheduler, percentile  # noqa: E402
+from tracing import tracer  # noqa: E402
+
+DEFAULT_RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+FAKE_API_KEY = "fake-key"
+FAKE_MODEL_NAME = "fake-gemini"
+FAKE_FAST_MODEL_NAME = "fake-gemini-flash"
+
+
+def git_revision():
+    """
+    현재 커밋 (짧은 해시)과 작업 트리 변경 여부 (git을 사용할 수 없으면 None)
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def measure(func, trace_memory):
+    """
+    func()를 실행하여 (응답 시간 목록, 오류 수)와 함께 소요 시간, 최대 메모리, 단계별 시간을 측정
+    """
+    gc.collect()
+    tracer.reset()
+    router_stats.reset()
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    latencies, errors = func()
+    elapsed = time.perf_counter() - started
+    peak = None
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    latencies = sorted(latencies)
+    p50, p99 = percentile(latencies, 0.50), percentile(latencies, 0.99)
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "latency_p50_ms": round(p50 * 1000, 2) if p50 is not None else None,
+        "latency_p99_ms": round(p99 * 1000, 2) if p99 is not None else None,
+        "peak_memory_mb": round(peak / 1024 / 1024, 2) if peak is not None else None,
+        "stages": {
+            name: {"count": stage["count"], "p50_ms": round(stage["p50"] * 1000, 2),
+                   "p99_ms": round(stage["p99"] * 1000, 2)}
+            for name, stage in tracer.stage_summary().items()
+        },
+        "routing": router_stats.summary() if router_stats.summary()["bills"] else None,
+    }
+
+
+def run_single(pipeline, files):
+    # 한 건씩 차례로 분석하고 공문까지 생성 (Streamlit 단건 화면과 같은 경로)
+    latencies, errors = [], 0
+    for name, data in files:
+        started = time.perf_counter()
+        result = pipeline.process(name, data, with_document=True)
+        latencies.append(time.perf_counter() - started)
+        errors += not result.success
+    return latencies, errors
+
+
+def run_batch(pipeline, files, concurrency, pack):
+    latencies, errors = [], 0
+    items = [BatchItem(name=name, data=data) for name, data in files]
+    for result in pipeline.process_many(items, concurrency=concurrency, pack=pack):
+        latencies.append(result.elapsed)
+        errors += not result.success
+    return latencies, errors
+
+
+def make_records(count):
+    for index in range(count):
+        yield {**DEFAULT_RESPONSE, "name": f"bill_{index:05d}.png",
+               "due_date_amount": DEFAULT_RESPONSE["due_date_amount"] + index * 37}
+
+
+def run_documents(template_path, count):
+    latencies, errors = [], 0
+    for record in make_records(count):
+        started = time.perf_counter()
+        result = build_water_bill_document(template_path, record)
+        latencies.append(time.perf_counter() - started)
+        errors += not result["success"]
+    return latencies, errors
+
+
+def run_documents_zip(template_path, count, output_dir):
+    # 일괄 생성은 한 번의 호출이므로 건당 평균 시간을 응답 시간으로 기록
+    report = write_documents_zip(template_path, make_records(count), os.path.join(output_dir, "bulk.zip"))
+    per_document = report.elapsed / max(1, report.documents)
+    return [per_document] * report.documents, len(report.failures)
+
+
+def run_benchmarks(args, template_path, output_dir):
+    factory = FakeModelFactory(latency=args.latency, error_rate=args.error_rate, seed=args.seed)
+    router = None
+    if args.route:
+        # 빠른 모델은 절반의 지연 시간으로 응답하고, fast_bad_rate 비율로 검사에 실패하는 결과(연구소 사용량 초과)를 반환
+        rng = random.Random(args.seed)
+
+        def fast_response(contents):
+            if rng.random() < args.fast_bad_rate:
+                return {**DEFAULT_RESPONSE, "lab1_tons": DEFAULT_RESPONSE["water_usage_m3"] * 2}
+            return DEFAULT_RESPONSE
+
+        factory.models[FAKE_FAST_MODEL_NAME] = FakeGenerativeModel(
+            FAKE_FAST_MODEL_NAME, response=fast_response, latency=args.latency / 2,
+            error_rate=args.error_rate, seed=args.seed,
+        )
+        router = default_router(FAKE_MODEL_NAME, FAKE_FAST_MODEL_NAME)
+    gemini_client.set_model_factory(factory)
+    # 오류를 재시도로 흡수하되 대기 시간은 짧게 (할당량 제한 없이 측정)
+    gemini_client.set_scheduler(RequestScheduler(
+        timeout=max(5.0, args.latency * 10), requests_per_minute=1_000_000, burst=args.concurrency * 4,
+        base_delay=0.01, max_delay=0.05, failure_threshold=1_000_000,
+    ))
+    pipeline = BillPipeline(FAKE_API_KEY, model_name=FAKE_MODEL_NAME, preprocess=PreprocessOptions(),
+                            template_path=template_path, router=router)
+    has_poppler = shutil.which("pdftoppm") is not None
+
+    scenarios = {}
+    for size in args.sizes:
+        for image_format in args.formats:
+            label = f"{size}_{image_format.lower()}"
+            if image_format == "PDF" and not has_poppler:
+                scenarios[f"single_{label}"] = {"skipped": "poppler(pdftoppm)가 없어 PDF를 변환할 수 없습니다."}
+                continue
+            files = make_bill_files(args.bills, size, image_format, seed=args.seed)
+            print(f"▶ {label}: 청구서 {len(files)}건 "
+                  f"(파일당 약 {sum(len(data) for _, data in files) / len(files) / 1024:,.0f}KB)", file=sys.stderr)
+            scenarios[f"single_{label}"] = measure(
+                lambda: run_single(pipeline, files[:args.single_bills]), args.memory)
+            scenarios[f"batch_{label}"] = measure(
+                lambda: run_batch(pipeline, files, args.concurrency, pack=False), args.memory)
+            scenarios[f"batch_packed_{label}"] = measure(
+                lambda: run_batch(pipeline, files, args.concurrency, pack=True), args.memory)
+
+    print(f"▶ 공문 생성: {args.documents}건", file=sys.stderr)
+    scenarios["documents_per_call"] = measure(lambda: run_documents(template_path, args.documents), args.memory)
+    scenarios["documents_zip"] = measure(
+        lambda: run_documents_zip(template_path, args.documents, output_dir), args.memory)
+    return scenarios
+
+
+def print_table(scenarios, previous=None):
+    header = f"{'시나리오':<28} {'건수':>6} {'오류':>4} {'처리량(건/초)':>14} {'p50(ms)':>10} {'p99(ms)':>10} {'메모리(MB)':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, result in scenarios.items():
+        if "skipped" in result:
+            print(f"{name:<28} 건너뜀: {result['skipped']}")
+            continue
+        line = (f"{name:<28} {result['count']:>6} {result['errors']:>4} {result['throughput_per_s']:>14,.1f} "
+                f"{result['latency_p50_ms']:>10,.1f} {result['latency_p99_ms']:>10,.1f} "
+                f"{result['peak_memory_mb'] if result['peak_memory_mb'] is not None else '-':>10}")
+        before = (previous or {}).get(name)
+        if before and "skipped" not in before and before.get("throughput_per_s"):
+            change = result["throughput_per_s"] / before["throughput_per_s"] - 1
+            line += f"  (처리량 {change:+.1%}, p99 {before['latency_p99_ms']:,.1f} → {result['latency_p99_ms']:,.1f}ms)"
+        if result.get("routing"):
+            line += (f"  [승격 {result['routing']['escalation_rate']:.0%}, "
+                     f"상대 비용 {result['routing']['total_cost']:g}]")
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="종단간 벤치마크 (가짜 Gemini 모델 사용)")
+    parser.add_argument("--bills", type=int, default=24, help="크기·형식별 일괄 분석 청구서 수 (기본값: 24)")
+    parser.add_argument("--single-bills", type=int, default=8, help="단건 분석으로 측정할 청구서 수 (기본값: 8)")
+    parser.add_argument("--documents", type=int, default=200, help="생성할 공문 수 (기본값: 200)")
+    parser.add_argument("--sizes", nargs="+", choices=sorted(IMAGE_SIZES), default=["small", "medium"])
+    parser.add_argument("--formats", nargs="+", choices=["PNG", "JPEG", "PDF"], default=["PNG", "PDF"])
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.2, help="가짜 Gemini 응답 지연 시간(초, 기본값: 0.2)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="가짜 Gemini 오류율 (0.0 ~ 1.0)")
+    parser.add_argument("--route", action="store_true", help="빠른 모델 먼저 요청하는 모델 라우팅 사용")
+    parser.add_argument("--fast-bad-rate", type=float, default=0.2,
+                        help="--route에서 빠른 모델이 검사에 실패하는 결과를 낼 확률 (기본값: 0.2)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--template", help="공문 템플릿 ODT (기본값: 합성 템플릿)")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="tracemalloc을 끄고 측정 (메모리 측정 부하 없이 처리량만 확인)")
+    parser.add_argument("--output", help=f"결과 JSON 경로 (기본값: {os.path.relpath(DEFAULT_RESULTS_DIR, ROOT)}/<시각>_<커밋>.json)")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON")
+    args = parser.parse_args(argv)
+
+    # 가짜 모델이 일부러 낸 오류의 span 경고는 결과 표를 가리므로 숨김 (오류 수는 결과에 기록됨)
+    logging.getLogger("trace").setLevel(logging.ERROR)
+    commit, dirty = git_revision()
+    with tempfile.TemporaryDirectory() as output_dir:
+        template_path = args.template or make_template_odt(os.path.join(output_dir, "template.odt"))
+        scenarios = run_benchmarks(args, template_path, output_dir)
+
+    results = {
+        "commit": commit,
+        "dirty": dirty,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "scenarios": scenarios,
+    }
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous_results = json.load(f)
+        previous = previous_results["scenarios"]
+        print(f"비교 기준: {previous_results.get('commit')} ({previous_results.get('created_at')})")
+    print_table(scenarios, previous)
+
+    output = args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{commit or 'unknown'}.json")
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n결과 저장: {output}")
+    return 1 if any(result.get("errors") for result in scenarios.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
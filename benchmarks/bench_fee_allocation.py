@@ -0,0 +1,137 @@
+"""
+연구소별 요금 배분 계산 벤치마크와 무작위 검증
+
+무작위 (청구서, 연구소) 데이터를 만들어 다음을 확인합니다.
+- allocate(정확한 유리수 연산)와 allocate_batch(NumPy)가 모든 행에서 같은 결과를 내는지
+- 반올림 나머지(합계 부과액 - 연구소별 부과액 합)가 remainder_bound 범위 안에 있는지
+- 절사 정책에서 연구소별 부과액이 0 이상이고, 전체 요금을 넘지 않는지
+- 기존 float 계산((int(x) // 10) * 10)과 결과가 달라지는 행 수
+
+사용 예:
+    python benchmarks/bench_fee_allocation.py --bills 20000 --labs 2 --repeat 3
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fee_allocation import (  # noqa: E402
+    ROUNDING_MODES,
+    TRUNCATE,
+    RoundingPolicy,
+    allocate,
+    allocate_batch,
+    remainder_bound,
+)
+
+
+def random_bills(count, labs, seed):
+    """
+    (금액, 전체 사용량, 연구소별 사용량) 목록을 생성 (사용량은 0.001 단위, 연구소 합계 ≤ 전체 사용량)
+    """
+    rng = random.Random(seed)
+    bills = []
+    for _ in range(count):
+        total_usage = rng.randint(1, 5_000_000) / 1000
+        amount = rng.randint(0, 50_000_000)
+        remaining = int(total_usage * 1000)
+        lab_usages = []
+        for _ in range(labs):
+            share = rng.randint(0, remaining)
+            lab_usages.append(share / 1000)
+            remaining -= share
+        bills.append((amount, total_usage, lab_usages))
+    return bills
+
+
+def legacy_fee(amount, total_usage, lab_usage):
+    return (int(amount / total_usage * lab_usage) // 10) * 10
+
+
+def check(bills, labs, policy):
+    """
+    무작위 검증을 수행하고 실패 메시지 목록을 반환
+    """
+    failures = []
+    amounts = [bill[0] for bill in bills]
+    usages = [bill[1] for bill in bills]
+    lab_rows = [bill[2] for bill in bills]
+    shares, totals = allocate_batch(amounts, usages, lab_rows, policy)
+    low, high = remainder_bound(labs, policy)
+
+    for index, (amount, usage, lab_usages) in enumerate(bills):
+        allocation = allocate(amount, usage, {f"lab{n}": value for n, value in enumerate(lab_usages, 1)}, policy)
+        expected = list(allocation.shares.values())
+        if expected != shares[index].tolist() or allocation.total != int(totals[index]):
+            failures.append(f"행 {index}: allocate {expected}/{allocation.total} "
+                            f"≠ allocate_batch {shares[index].tolist()}/{int(totals[index])}")
+        if not low <= allocation.remainder <= high:
+            failures.append(f"행 {index}: 나머지 {allocation.remainder}가 범위 [{low}, {high}]를 벗어남")
+        if any(share % policy.unit for share in expected):
+            failures.append(f"행 {index}: {policy.unit}원 단위가 아닌 부과액 {expected}")
+        if policy.mode == TRUNCATE and (min(expected) < 0 or allocation.total > amount):
+            failures.append(f"행 {index}: 절사 부과액 {expected}/{allocation.total}이 금액 {amount} 범위를 벗어남")
+        if len(failures) > 10:
+            break
+    return failures
+
+
+def timed(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="연구소별 요금 배분 계산 벤치마크")
+    parser.add_argument("--bills", type=int, default=20000, help="청구서 수 (기본값: 20000)")
+    parser.add_argument("--labs", type=int, default=2, help="청구서당 연구소 수 (기본값: 2)")
+    parser.add_argument("--check-bills", type=int, default=5000, help="검증할 청구서 수 (기본값: 5000)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    exit_code = 0
+    for mode in ROUNDING_MODES:
+        policy = RoundingPolicy(mode=mode)
+        for labs in sorted({1, 2, args.labs, 5}):
+            failures = check(random_bills(args.check_bills, labs, args.seed + labs), labs, policy)
+            status = "통과" if not failures else f"실패 {len(failures)}건"
+            print(f"검증 [{mode}, 연구소 {labs}곳, {args.check_bills}건]: {status}")
+            for failure in failures:
+                print(f"  - {failure}")
+            exit_code = exit_code or bool(failures)
+
+    bills = random_bills(args.bills, args.labs, args.seed)
+    amounts = [bill[0] for bill in bills]
+    usages = [bill[1] for bill in bills]
+    lab_rows = [bill[2] for bill in bills]
+    rows = args.bills * args.labs
+
+    legacy = timed(lambda: [[legacy_fee(a, u, lab) for lab in labs] for a, u, labs in bills], args.repeat)
+    exact = timed(lambda: [allocate(a, u, dict(enumerate(labs))) for a, u, labs in bills], args.repeat)
+    batch = timed(lambda: allocate_batch(amounts, usages, lab_rows), args.repeat)
+
+    shares, _ = allocate_batch(amounts, usages, lab_rows)
+    differing = sum(
+        legacy_fee(a, u, lab) != int(share)
+        for (a, u, labs), row in zip(bills, shares)
+        for lab, share in zip(labs, row)
+    )
+
+    print(f"\n청구서 {args.bills}건 × 연구소 {args.labs}곳 = {rows}행 (최소 {args.repeat}회)")
+    print(f"기존 float 계산:        {legacy * 1000:8.1f}ms  ({rows / legacy:,.0f}행/초)")
+    print(f"allocate (Fraction):    {exact * 1000:8.1f}ms  ({rows / exact:,.0f}행/초)")
+    print(f"allocate_batch (NumPy): {batch * 1000:8.1f}ms  ({rows / batch:,.0f}행/초)")
+    print(f"기존 float 계산과 부과액이 다른 행: {differing}행 (다른 행은 부동소수점 오차로 10원 경계에서 달라진 경우)")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+이미지 전처리 정확도/지연 시간 벤치마크
+
+샘플 청구서 폴더의 각 파일을 원본 그대로 보낸 경우와 전처리 후 보낸 경우로 나눠
+전송 크기, Gemini 응답 시간, lab1_tons/lab2_tons 추출 결과를 비교합니다.
+
+정답 파일(--expected)은 {"파일명": {"lab1_tons": 30, "lab2_tons": 20, ...}} 형식의 JSON이며,
+없으면 원본 전송 결과를 기준으로 일치 여부를 비교합니다.
+--offline을 주면 Gemini를 호출하지 않고 전송 크기와 전처리 시간만 측정합니다.
+
+사용 예:
+    python benchmarks/bench_image_preprocess.py 샘플청구서/ --expected 샘플청구서/expected.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv  # noqa: E402
+
+from extraction import (  # noqa: E402
+    DEFAULT_PROMPT,
+    GEMINI_MODEL_NAME,
+    SUPPORTED_EXTENSIONS,
+    load_bill_image,
+    parse_response_text,
+    request_extraction,
+)
+from image_utils import (  # noqa: E402
+    DEFAULT_MAX_LONG_EDGE,
+    PreprocessOptions,
+    preprocess_image,
+)
+
+CHECKED_FIELDS = ("lab1_tons", "lab2_tons", "due_date_amount", "water_usage_m3")
+
+
+def same_number(a, b):
+    try:
+        return float(a) == float(b)
+    except (TypeError, ValueError):
+        return a == b
+
+
+def timed_extraction(source, api_key, model_name):
+    started = time.perf_counter()
+    parsed = parse_response_text(request_extraction(source, api_key, DEFAULT_PROMPT, model_name))
+    return parsed, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="이미지 전처리 정확도/지연 시간 벤치마크")
+    parser.add_argument("folder", help="샘플 청구서 폴더")
+    parser.add_argument("--expected", help="정답 JSON 파일")
+    parser.add_argument("--max-edge", type=int, default=DEFAULT_MAX_LONG_EDGE)
+    parser.add_argument("--grayscale", action="store_true")
+    parser.add_argument("--enhance-contrast", action="store_true")
+    parser.add_argument("--image-format", choices=["JPEG", "WEBP"], default="JPEG")
+    parser.add_argument("--model", default=GEMINI_MODEL_NAME)
+    parser.add_argument("--offline", action="store_true", help="Gemini를 호출하지 않음")
+    args = parser.parse_args(argv)
+
+    options = PreprocessOptions(
+        max_long_edge=args.max_edge,
+        grayscale=args.grayscale,
+        enhance_contrast=args.enhance_contrast,
+        image_format=args.image_format
+    )
+    expected = {}
+    if args.expected:
+        with open(args.expected, encoding="utf-8") as f:
+            expected = json.load(f)
+
+    load_dotenv(dotenv_path="gemini.env")
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not args.offline and not api_key:
+        parser.error("GEMINI_API_KEY가 없습니다. --offline으로 크기만 측정할 수 있습니다.")
+
+    names = sorted(n for n in os.listdir(args.folder) if n.lower().endswith(SUPPORTED_EXTENSIONS))
+    rows = []
+    for name in names:
+        with open(os.path.join(args.folder, name), "rb") as f:
+            data = f.read()
+        image = load_bill_image(name, data)
+
+        started = time.perf_counter()
+        processed = preprocess_image(image, options, len(data))
+        row = {
+            "file": name,
+            "raw_kb": processed.original_bytes / 1024,
+            "processed_kb": processed.processed_bytes / 1024,
+            "preprocess_ms": (time.perf_counter() - started) * 1000,
+        }
+
+        if not args.offline:
+            raw_result, row["raw_s"] = timed_extraction(image, api_key, args.model)
+            processed_result, row["processed_s"] = timed_extraction(processed.to_blob(), api_key, args.model)
+            reference = expected.get(name, raw_result)
+            row["raw_correct"] = all(
+                same_number(raw_result.get(k), reference.get(k)) for k in CHECKED_FIELDS if k in reference
+            )
+            row["processed_correct"] = all(
+                same_number(processed_result.get(k), reference.get(k)) for k in CHECKED_FIELDS if k in reference
+            )
+        rows.append(row)
+
+        line = f"{name:<40} {row['raw_kb']:>9,.0f}KB -> {row['processed_kb']:>7,.0f}KB {row['preprocess_ms']:>7.0f}ms"
+        if not args.offline:
+            line += (
+                f"  원본 {row['raw_s']:.2f}s {'✔' if row['raw_correct'] else '✘'}"
+                f"  전처리 {row['processed_s']:.2f}s {'✔' if row['processed_correct'] else '✘'}"
+            )
+        print(line)
+
+    if not rows:
+        print("샘플 청구서가 없습니다.")
+        return
+
+    print("-" * 80)
+    print(f"평균 전송 크기: {statistics.mean(r['raw_kb'] for r in rows):,.0f}KB -> "
+          f"{statistics.mean(r['processed_kb'] for r in rows):,.0f}KB")
+    if not args.offline:
+        print(f"평균 응답 시간: {statistics.mean(r['raw_s'] for r in rows):.2f}s -> "
+              f"{statistics.mean(r['processed_s'] for r in rows):.2f}s")
+        print(f"정확도: 원본 {sum(r['raw_correct'] for r in rows)}/{len(rows)}, "
+              f"전처리 {sum(r['processed_correct'] for r in rows)}/{len(rows)}")
+
+
+if __name__ == "__main__":
+    main()
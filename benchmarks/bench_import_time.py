@@ -0,0 +1,163 @@
+"""
+시작 시간 벤치마크 (모듈 import 시간과 Streamlit 재실행마다 반복되는 준비 작업)
+
+- import: 모듈마다 새 인터프리터에서 `python -X importtime -c "import 모듈"`을 실행하여
+  누적 import 시간과 가장 오래 걸린 하위 패키지를 보고 (여러 번 실행하여 최솟값 사용)
+- rerun: 화면을 다시 그릴 때마다 하던 작업(gemini.env 읽기, 서식 폴더 검색)을
+  매번 수행할 때와 수정 시각으로 캐시할 때의 시간을 비교
+
+사용 예:
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --modules app cli service --output before.json
+    python benchmarks/bench_import_time.py --compare before.json
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import make_template_odt  # noqa: E402
+from pipeline import GENERATED_PREFIX, find_template  # noqa: E402
+
+DEFAULT_MODULES = ["app", "page10_gemini_test", "jobs", "pipeline", "cli", "service"]
+
+
+def import_profile(module, repeat):
+    """
+    (누적 import 시간(ms), {하위 패키지: 누적 시간(ms)}, 오류) - repeat번 실행 중 가장 빠른 결과
+    """
+    best = None
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-W", "ignore", "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            return None, {}, result.stderr.strip().splitlines()[-1]
+
+        # 하위 모듈이 먼저 출력되고 최상위 모듈이 마지막에 출력되므로,
+        # 인터프리터 시작 시 불러온 모듈(site 등)의 기록은 최상위 줄을 만날 때마다 버림
+        total, packages = 0, {}
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, name = line.split("|")
+            if not cumulative.strip().isdigit():
+                continue  # 머리글
+            microseconds = int(cumulative)
+            if name.startswith("  "):
+                package = name.strip().split(".")[0]
+                packages[package] = max(packages.get(package, 0), microseconds)
+            elif name.strip() == module:
+                total = microseconds
+                break
+            else:
+                packages = {}
+        if best is None or total < best[0]:
+            best = (total, packages)
+
+    total, packages = best
+    heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    return total / 1000, {name: value / 1000 for name, value in heaviest if name != module}, None
+
+
+def legacy_rerun(env_path, template_dir):
+    # 이전 방식: 재실행마다 환경 변수 파일을 읽고 서식 폴더를 검색
+    from dotenv import load_dotenv
+
+    load_dotenv(dotenv_path=env_path)
+    template_files = sorted(
+        path for path in glob.glob(os.path.join(template_dir, "*.odt"))
+        if not os.path.basename(path).startswith(f"{GENERATED_PREFIX}_")
+    )
+    return template_files[0] if template_files else None
+
+
+def cached_rerun(env_path, template_dir, loaded_env):
+    # 현재 방식: 수정 시각이 바뀌었을 때만 다시 읽음 (Streamlit의 cache_resource와 같은 조회)
+    mtime = os.path.getmtime(env_path)
+    if loaded_env.get(env_path) != mtime:
+        from dotenv import load_dotenv
+
+        load_dotenv(dotenv_path=env_path)
+        loaded_env[env_path] = mtime
+    return find_template(template_dir)
+
+
+def rerun_profile(number, template_count):
+    """
+    재실행 1회당 준비 작업 시간(μs): 이전 방식과 캐시 사용 방식
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        env_path = os.path.join(directory, "gemini.env")
+        with open(env_path, "w", encoding="utf-8") as f:
+            f.write("BENCH_IMPORT_TIME_KEY=dummy\n" + "".join(f"BENCH_VAR_{i}=value{i}\n" for i in range(20)))
+        template_dir = os.path.join(directory, "서식")
+        os.makedirs(template_dir)
+        make_template_odt(os.path.join(template_dir, "template.odt"), filler_paragraphs=10)
+        for index in range(template_count):
+            # 이전 버전이 서식 폴더에 남긴 생성 문서
+            open(os.path.join(template_dir, f"{GENERATED_PREFIX}_{index:04d}.odt"), "wb").close()
+
+        assert legacy_rerun(env_path, template_dir) == cached_rerun(env_path, template_dir, {})
+        loaded_env = {}
+        legacy = min(timeit.repeat(lambda: legacy_rerun(env_path, template_dir), number=number, repeat=5))
+        cached = min(timeit.repeat(lambda: cached_rerun(env_path, template_dir, loaded_env),
+                                   number=number, repeat=5))
+    return {"legacy_us": legacy / number * 1e6, "cached_us": cached / number * 1e6}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="모듈 import 시간과 재실행 준비 작업 시간 측정")
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=5, help="모듈별 실행 횟수 (최솟값 사용, 기본값: 5)")
+    parser.add_argument("--top", type=int, default=5, help="표시할 무거운 하위 패키지 수 (기본값: 5)")
+    parser.add_argument("--templates", type=int, default=200, help="서식 폴더에 둘 생성 문서 수 (기본값: 200)")
+    parser.add_argument("--output", help="결과 JSON 경로")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON")
+    args = parser.parse_args(argv)
+
+    previous = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+
+    results = {"python": sys.version.split()[0], "imports": {}, "rerun": None}
+    print(f"{'모듈':<22} {'import(ms)':>11}  가장 무거운 하위 패키지 (ms)")
+    print("-" * 90)
+    for module in args.modules:
+        total, packages, error = import_profile(module, args.repeat)
+        if error:
+            results["imports"][module] = {"error": error}
+            print(f"{module:<22} {'실패':>11}  {error}")
+            continue
+        results["imports"][module] = {"total_ms": round(total, 2),
+                                      "packages": {name: round(value, 2) for name, value in packages.items()}}
+        heaviest = ", ".join(f"{name} {value:,.0f}" for name, value in list(packages.items())[:args.top])
+        line = f"{module:<22} {total:>11,.1f}  {heaviest}"
+        before = previous.get("imports", {}).get(module, {}).get("total_ms")
+        if before:
+            line += f"  (이전 {before:,.1f}ms, {total / before - 1:+.0%})"
+        print(line)
+
+    rerun = rerun_profile(number=200, template_count=args.templates)
+    results["rerun"] = {key: round(value, 2) for key, value in rerun.items()}
+    print(f"\n재실행 준비 작업 (gemini.env + 서식 폴더, 생성 문서 {args.templates}개): "
+          f"매번 {rerun['legacy_us']:,.1f}μs → 캐시 {rerun['cached_us']:,.1f}μs "
+          f"({rerun['legacy_us'] / rerun['cached_us']:.1f}배)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
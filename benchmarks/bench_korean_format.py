@@ -0,0 +1,139 @@
+"""
+한글 금액 표기와 사용기간 처리 벤치마크 (공문 일괄 생성의 치환 내용 계산 단계)
+
+기존 방식(호출마다 표를 다시 만들고, 공문 한 건에 사용기간을 strptime으로 세 번 파싱)과
+korean_format(미리 만든 표, 캐시, 한 번만 파싱)을 비교하고, 두 방식의 결과가 같은지 확인
+
+사용 예:
+    python benchmarks/bench_korean_format.py --count 100000 --repeat 3
+"""
+import argparse
+import calendar
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from korean_format import ServicePeriod, number_to_korean  # noqa: E402
+from odt_utils import build_water_bill_replacements  # noqa: E402
+
+
+def legacy_number_to_korean(number):
+    """기존 구현 (호출마다 표와 내부 함수를 다시 만듦)"""
+    if number == 0:
+        return "영"
+    units = ["", "일", "이", "삼", "사", "오", "육", "칠", "팔", "구"]
+    tens = ["", "십", "백", "천"]
+    thousands = ["", "만", "억", "조"]
+
+    def convert_under_10000(n):
+        result = []
+        for i, digit in enumerate(str(n).zfill(4)):
+            digit = int(digit)
+            pos = 3 - i
+            if digit == 0:
+                continue
+            if digit == 1 and pos > 0:
+                result.append(tens[pos])
+            else:
+                result.append(units[digit] + tens[pos])
+        return "".join(result)
+
+    if number < 0:
+        return "마이너스 " + legacy_number_to_korean(abs(number))
+    parts = []
+    thousand_index = 0
+    while number > 0:
+        part = number % 10000
+        if part > 0:
+            parts.append(convert_under_10000(part) + thousands[thousand_index])
+        number //= 10000
+        thousand_index += 1
+    return "".join(reversed(parts))
+
+
+def legacy_parse_period(period_str):
+    period_str = period_str.replace(" ", "").strip()
+    start_str, end_str = period_str.split("~")
+    return datetime.strptime(start_str, "%Y.%m.%d"), datetime.strptime(end_str, "%Y.%m.%d")
+
+
+def legacy_period_fields(period_str):
+    """기존 구현과 같이 월, 다음 달 말일, 표시 형식마다 사용기간을 다시 파싱"""
+    start, _ = legacy_parse_period(period_str)
+    month = start.month
+    start, _ = legacy_parse_period(period_str)
+    year, next_month = (start.year + 1, 1) if start.month == 12 else (start.year, start.month + 1)
+    last_day = f"{year}. {next_month}. {calendar.monthrange(year, next_month)[1]}."
+    start, end = legacy_parse_period(period_str)
+    formatted = f"{start.year}. {start.month}. {start.day}. ~ {end.month}. {end.day}."
+    return month, last_day, formatted
+
+
+def period_fields(period_str):
+    period = ServicePeriod.parse(period_str)
+    return period.month, period.next_month_last_day(), period.format()
+
+
+def make_inputs(count, seed):
+    """
+    청구서 count건 분량의 (금액, 사용기간) 목록
+    일괄 생성에서는 같은 달 청구서가 대부분이므로 사용기간은 몇 가지로 반복됨
+    """
+    rng = random.Random(seed)
+    periods = [f"2025.{month:02d}.{day:02d} ~ 2025.{month + 1:02d}.{day - 1:02d}"
+               for month in range(1, 12) for day in (2, 15, 23)]
+    return [(rng.randint(0, 5_000_000) // 10 * 10, rng.choice(periods)) for _ in range(count)]
+
+
+def timed(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def report(label, count, elapsed, baseline=None):
+    speedup = f"  ({baseline / elapsed:4.1f}배)" if baseline else ""
+    print(f"{label:<32} {elapsed * 1000:9.1f}ms  {count / elapsed:12,.0f}건/초{speedup}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="한글 금액 표기와 사용기간 처리 벤치마크")
+    parser.add_argument("--count", type=int, default=100000, help="청구서 수 (기본값: 100000)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    inputs = make_inputs(args.count, args.seed)
+    amounts = [amount for amount, _ in inputs]
+    periods = [period for _, period in inputs]
+
+    mismatches = sum(legacy_number_to_korean(a) != number_to_korean(a) for a in amounts)
+    mismatches += sum(legacy_period_fields(p) != period_fields(p) for p in set(periods))
+    print(f"결과 비교 ({args.count}건): {'일치' if not mismatches else f'불일치 {mismatches}건'}\n")
+
+    legacy = timed(lambda: [legacy_number_to_korean(a) for a in amounts], args.repeat)
+    report("한글 금액 (기존)", args.count, legacy)
+    report("한글 금액 (표 + 캐시)", args.count, timed(lambda: [number_to_korean(a) for a in amounts], args.repeat), legacy)
+
+    legacy = timed(lambda: [legacy_period_fields(p) for p in periods], args.repeat)
+    report("사용기간 3회 파싱 (기존)", args.count, legacy)
+    report("사용기간 1회 파싱 (캐시)", args.count, timed(lambda: [period_fields(p) for p in periods], args.repeat), legacy)
+
+    records = [
+        {"due_date_amount": amount, "water_usage_m3": 120, "lab1_tons": 30, "lab2_tons": 20, "service_period": period}
+        for amount, period in inputs[:min(args.count, 20000)]
+    ]
+    elapsed = timed(lambda: [build_water_bill_replacements(record) for record in records], args.repeat)
+    report("공문 치환 내용 계산 (전체)", len(records), elapsed)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+ODT 템플릿 렌더링 벤치마크
+기존 replace_text_in_odt와 컴파일된 OdtTemplate을 큰 템플릿에서 비교
+
+사용 예:
+    python benchmarks/bench_odt_template.py --scales 1 10 50 --repeat 20
+"""
+import argparse
+import glob
+import io
+import os
+import re
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from odt_utils import OdtTemplate, replace_text_in_odt  # noqa: E402
+
+
+REPLACEMENTS = {
+    "[총요금]": "123,450",
+    "[총사용량]": "100",
+    "[사용기간]": "2025. 6. 23. ~ 7. 22.",
+    "[기준금액]": "1,234.5",
+    "[1연구소사용량]": "30",
+    "[2연구소사용량]": "20",
+    "[연구소사용량]": "50",
+    "[부과액]": "61,720",
+    "[사용기간월]": "6",
+    "[사용기간월다음달말일]": "2025. 7. 31.",
+    "[부과액한글]": "육만천칠백이십",
+}
+
+_BODY_PATTERN = re.compile(r"(<office:text[^>]*>)(.*)(</office:text>)", re.S)
+
+
+def make_large_template(source_path, output_path, scale):
+    """
+    원본 템플릿의 본문을 scale배 반복하여 큰 템플릿을 생성
+    """
+    with zipfile.ZipFile(source_path) as zip_ref, \
+            zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as zip_out:
+        for name in zip_ref.namelist():
+            data = zip_ref.read(name)
+            if name == "content.xml":
+                content = data.decode("utf-8")
+                match = _BODY_PATTERN.search(content)
+                body = match.group(2) * scale
+                content = content[:match.start(2)] + body + content[match.end(2):]
+                data = content.encode("utf-8")
+            zip_out.writestr(name, data)
+
+
+def timed(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--template", help="원본 ODT 템플릿 (기본값: 서식 폴더의 첫 번째 파일)")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    source = args.template or sorted(glob.glob(os.path.join(repo_root, "서식", "*.odt")))[0]
+
+    print(f"{'scale':>6} {'content.xml':>12} {'load(ms)':>9} {'legacy(ms)':>11} {'template(ms)':>13} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            template_path = os.path.join(tmp, f"template_{scale}.odt")
+            make_large_template(source, template_path, scale)
+            with zipfile.ZipFile(template_path) as zip_ref:
+                content_size = zip_ref.getinfo("content.xml").file_size
+
+            load_started = time.perf_counter()
+            template = OdtTemplate(template_path)
+            load_ms = (time.perf_counter() - load_started) * 1000
+
+            legacy = timed(lambda: replace_text_in_odt(template_path, io.BytesIO(), REPLACEMENTS), args.repeat)
+            compiled = timed(lambda: template.render(io.BytesIO(), REPLACEMENTS), args.repeat)
+
+            # 두 방식의 결과가 같은지 확인
+            legacy_out = io.BytesIO()
+            replace_text_in_odt(template_path, legacy_out, REPLACEMENTS)
+            with zipfile.ZipFile(legacy_out) as zip_ref:
+                assert zip_ref.read("content.xml") == template.render_content(REPLACEMENTS).encode("utf-8")
+
+            print(
+                f"{scale:>6} {content_size / 1024:>10.0f}KB {load_ms:>9.1f} "
+                f"{legacy * 1000:>11.2f} {compiled * 1000:>13.2f} {legacy / compiled:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
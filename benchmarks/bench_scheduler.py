@@ -0,0 +1,62 @@
+"""
+요청 스케줄러 동작 확인 (가짜 Gemini 모델 사용, 네트워크 불필요)
+429/503 오류와 지연이 섞인 상황에서 재시도, 대기열, 응답 시간 백분위수를 출력
+
+사용 예:
+    python benchmarks/bench_scheduler.py --requests 50 --concurrency 8 --error-rate 0.2
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gemini_client  # noqa: E402
+from benchmarks.fake_gemini import FakeModelFactory  # noqa: E402
+from request_scheduler import RequestScheduler  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="요청 스케줄러 동작 확인")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--rpm", type=float, default=600, help="분당 요청 수 제한")
+    parser.add_argument("--timeout", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    gemini_client.set_model_factory(
+        FakeModelFactory(latency=args.latency, error_rate=args.error_rate, seed=1)
+    )
+    scheduler = RequestScheduler(
+        timeout=args.timeout,
+        requests_per_minute=args.rpm,
+        burst=args.concurrency,
+        base_delay=0.05,
+        max_delay=0.5,
+        failure_threshold=args.requests,
+    )
+    gemini_client.set_scheduler(scheduler)
+
+    def one_request(_):
+        try:
+            gemini_client.generate_content("fake-key", "fake-model", ["prompt"])
+            return True
+        except Exception:
+            return False
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(one_request, range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    print(f"성공 {sum(results)}/{len(results)}건, {elapsed:.2f}초")
+    print(json.dumps(scheduler.metrics(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
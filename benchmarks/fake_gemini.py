@@ -0,0 +1,108 @@
+"""
+네트워크 없이 사용하는 가짜 Gemini 모델
+
+gemini_client.set_model_factory(FakeModelFactory(...))로 등록하면
+실제 API 대신 미리 정한 JSON을 지정한 지연 시간과 오류율로 반환합니다.
+"""
+import json
+import random
+import threading
+import time
+
+
+DEFAULT_RESPONSE = {
+    "due_date_amount": 123450,
+    "water_usage_m3": 100,
+    "lab1_tons": 30,
+    "lab2_tons": 20,
+    "service_period": "2025.06.23 ~ 2025.07.22",
+}
+
+
+class FakeApiError(Exception):
+    """google.api_core 예외처럼 HTTP 상태 코드를 code 속성으로 가지는 오류"""
+
+    def __init__(self, code, message=""):
+        super().__init__(message or f"fake Gemini error {code}")
+        self.code = code
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """
+    GenerativeModel.generate_content를 흉내 내는 가짜 모델
+
+    Args:
+        model_name: 모델명
+        response: 반환할 딕셔너리, 문자열, 또는 contents를 받아 딕셔너리/문자열을 반환하는 함수
+        latency: 응답 지연 시간(초)
+        error_rate: 오류를 낼 확률 (0.0 ~ 1.0)
+        error_codes: 오류 시 사용할 HTTP 상태 코드 목록
+        errors: 앞에서부터 순서대로 발생시킬 오류 코드 목록 (재시도 테스트용)
+        seed: 난수 시드
+    """
+
+    def __init__(self, model_name="fake-model", response=None, latency=0.0, error_rate=0.0,
+                 error_codes=(429, 503), errors=(), seed=None):
+        self.model_name = model_name
+        self.response = DEFAULT_RESPONSE if response is None else response
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_codes = tuple(error_codes)
+        self._errors = list(errors)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _response_text(self, contents):
+        response = self.response(contents) if callable(self.response) else self.response
+        if isinstance(response, str):
+            return response
+        return json.dumps(response, ensure_ascii=False)
+
+    def generate_content(self, contents, stream=False, request_options=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+            scripted_error = self._errors.pop(0) if self._errors else None
+            random_error = self._rng.random() < self.error_rate
+            error_code = self._rng.choice(self.error_codes) if self.error_codes else 503
+
+        timeout = (request_options or {}).get("timeout")
+        if timeout is not None and self.latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"fake Gemini timed out after {timeout}s")
+        if self.latency:
+            time.sleep(self.latency)
+
+        if scripted_error is not None:
+            raise FakeApiError(scripted_error)
+        if random_error:
+            raise FakeApiError(error_code)
+
+        text = self._response_text(contents)
+        if stream:
+            size = max(1, len(text) // 8)
+            return [FakeResponse(text[i:i + size]) for i in range(0, len(text), size)]
+        return FakeResponse(text)
+
+
+class FakeModelFactory:
+    """
+    gemini_client.set_model_factory에 넘기는 팩토리
+    모델명별로 FakeGenerativeModel을 하나씩 만들어 재사용
+    """
+
+    def __init__(self, **model_options):
+        self.model_options = model_options
+        self.models = {}
+
+    def __call__(self, model_name):
+        model = self.models.get(model_name)
+        if model is None:
+            model = FakeGenerativeModel(model_name, **self.model_options)
+            self.models[model_name] = model
+        return model
@@ -0,0 +1,162 @@
+"""
+벤치마크용 합성 입력 (청구서 이미지/PDF, 공문 템플릿 ODT)
+
+실제 청구서나 서식 파일 없이도 같은 입력으로 반복 측정할 수 있도록
+시드로 고정된 청구서 모양의 이미지와, 모든 [치환항목]을 포함한 ODT 템플릿을 만듭니다.
+"""
+import io
+import random
+import zipfile
+
+from PIL import Image, ImageDraw
+
+# 청구서 이미지 크기 (A4 세로 기준 약 100 / 200 / 400 DPI)
+IMAGE_SIZES = {
+    "small": (850, 1200),
+    "medium": (1650, 2340),
+    "large": (3300, 4680),
+}
+
+PLACEHOLDERS = (
+    "[총요금]", "[총사용량]", "[사용기간]", "[기준금액]", "[1연구소사용량]", "[2연구소사용량]",
+    "[연구소사용량]", "[부과액]", "[사용기간월]", "[사용기간월다음달말일]", "[부과액한글]",
+)
+
+
+def make_bill_image(size="medium", seed=0):
+    """
+    인쇄된 표, 글자 줄, 수기 메모 영역이 있는 청구서 모양의 RGB 이미지
+    (압축 크기가 실제 스캔과 비슷하도록 줄마다 농도와 잡음을 넣음)
+    """
+    width, height = IMAGE_SIZES[size]
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height), (250, 250, 247))
+    draw = ImageDraw.Draw(image)
+    unit = width / 850
+
+    # 머리글과 표
+    draw.rectangle([40 * unit, 40 * unit, width - 40 * unit, 140 * unit], fill=(210, 225, 240))
+    draw.text((60 * unit, 70 * unit), "WATER BILL  2025.06.23 ~ 2025.07.22", fill=(20, 20, 20))
+    top = 180 * unit
+    rows, columns = 14, 4
+    cell_w = (width - 80 * unit) / columns
+    cell_h = 45 * unit
+    for row in range(rows + 1):
+        y = top + row * cell_h
+        draw.line([40 * unit, y, width - 40 * unit, y], fill=(90, 90, 90), width=max(1, int(unit)))
+    for column in range(columns + 1):
+        x = 40 * unit + column * cell_w
+        draw.line([x, top, x, top + rows * cell_h], fill=(90, 90, 90), width=max(1, int(unit)))
+    for row in range(rows):
+        for column in range(columns):
+            value = f"{rng.randint(0, 999_999):,}"
+            draw.text((40 * unit + column * cell_w + 8 * unit, top + row * cell_h + 14 * unit), value,
+                      fill=(30, 30, 30))
+
+    # 본문 글자 줄 (짧은 막대로 흉내)
+    y = top + rows * cell_h + 40 * unit
+    while y < height - 260 * unit:
+        x = 50 * unit
+        while x < width - 80 * unit:
+            word = rng.randint(20, 90) * unit
+            shade = rng.randint(40, 110)
+            draw.rectangle([x, y, x + word, y + 9 * unit], fill=(shade, shade, shade))
+            x += word + rng.randint(8, 16) * unit
+        y += rng.randint(24, 34) * unit
+
+    # 수기 메모 (1연구소, 2연구소 사용량)
+    memo_top = height - 220 * unit
+    for _ in range(2):
+        points = [(60 * unit + i * 12 * unit, memo_top + rng.randint(0, 30) * unit) for i in range(30)]
+        draw.line(points, fill=(30, 40, 160), width=max(2, int(3 * unit)))
+        memo_top += 80 * unit
+
+    # 스캔 잡음
+    pixels = image.load()
+    for _ in range(width * height // 200):
+        px, py = rng.randrange(width), rng.randrange(height)
+        tone = rng.randint(180, 240)
+        pixels[px, py] = (tone, tone, tone)
+    return image
+
+
+def encode_image(image, image_format="PNG"):
+    """
+    이미지를 업로드 파일 바이트로 인코딩 (PNG, JPEG 또는 PDF)
+    """
+    buffer = io.BytesIO()
+    if image_format == "JPEG":
+        image.save(buffer, format="JPEG", quality=90)
+    elif image_format == "PDF":
+        image.save(buffer, format="PDF", resolution=150)
+    else:
+        image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def make_bill_files(count, size="medium", image_format="PNG", seed=0, variants=4):
+    """
+    (파일명, 바이트) 목록 (같은 모양의 청구서 variants개를 돌려 쓰며, 이름은 모두 다름)
+    """
+    extension = {"PNG": "png", "JPEG": "jpg", "PDF": "pdf"}[image_format]
+    encoded = [encode_image(make_bill_image(size, seed + index), image_format) for index in range(variants)]
+    return [(f"bill_{size}_{index:04d}.{extension}", encoded[index % variants]) for index in range(count)]
+
+
+def _paragraphs(count, rng):
+    words = ("수도", "요금", "부과", "연구소", "사용량", "납부", "기한", "안내", "금액", "기준")
+    return "".join(
+        f'<text:p text:style-name="P1">{" ".join(rng.choice(words) for _ in range(12))}</text:p>'
+        for _ in range(count)
+    )
+
+
+def make_template_odt(path, filler_paragraphs=400, seed=0):
+    """
+    모든 [치환항목]을 포함한 공문 템플릿 ODT를 path에 생성
+    (filler_paragraphs로 content.xml 크기를 실제 서식과 비슷하게 맞춤)
+    """
+    rng = random.Random(seed)
+    body = "".join(f'<text:p text:style-name="P1">{name} 항목: {name}</text:p>' for name in PLACEHOLDERS)
+    rows = "".join(
+        "<table:table-row>"
+        + "".join(f'<table:table-cell office:value-type="string"><text:p>{cell}</text:p></table:table-cell>'
+                  for cell in ("[사용기간]", "[총사용량]", "[연구소사용량]", "[부과액]"))
+        + "</table:table-row>"
+        for _ in range(3)
+    )
+    content = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+        'xmlns:style="urn:oasis:names:tc:opendocument:xmlns:style:1.0" '
+        'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" '
+        'xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0" '
+        'xmlns:fo="urn:oasis:names:tc:opendocument:xmlns:xsl-fo-compatible:1.0" office:version="1.2">'
+        '<office:automatic-styles><style:style style:name="P1" style:family="paragraph">'
+        '<style:text-properties fo:font-size="11pt"/></style:style></office:automatic-styles>'
+        '<office:body><office:text>'
+        f'{body}<table:table table:name="요금표"><table:table-column table:number-columns-repeated="4"/>{rows}'
+        f'</table:table>{_paragraphs(filler_paragraphs, rng)}'
+        '</office:text></office:body></office:document-content>'
+    )
+    manifest = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0" '
+        'manifest:version="1.2">'
+        '<manifest:file-entry manifest:full-path="/" manifest:media-type="application/vnd.oasis.opendocument.text"/>'
+        '<manifest:file-entry manifest:full-path="content.xml" manifest:media-type="text/xml"/>'
+        '<manifest:file-entry manifest:full-path="styles.xml" manifest:media-type="text/xml"/>'
+        '</manifest:manifest>'
+    )
+    styles = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<office:document-styles xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+        'office:version="1.2"><office:styles/></office:document-styles>'
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as odt:
+        odt.writestr(zipfile.ZipInfo("mimetype"), "application/vnd.oasis.opendocument.text",
+                     compress_type=zipfile.ZIP_STORED)
+        odt.writestr("META-INF/manifest.xml", manifest)
+        odt.writestr("content.xml", content)
+        odt.writestr("styles.xml", styles)
+    return path
@@ -0,0 +1,199 @@
+"""
+청구서 추출 결과 스키마, 타입이 지정된 결과 객체, JSON 응답 복구
+"""
+import json
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from tracing import traced
+
+
+NUMERIC_FIELDS = ("due_date_amount", "water_usage_m3", "lab1_tons", "lab2_tons")
+BILL_FIELDS = NUMERIC_FIELDS + ("service_period",)
+
+# Gemini 구조화 출력(response_schema)에 전달하는 스키마
+RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "due_date_amount": {"type": "NUMBER", "nullable": True, "description": "납기 내 요금 (원)"},
+        "water_usage_m3": {"type": "NUMBER", "nullable": True, "description": "상수도 사용량 (m³)"},
+        "lab1_tons": {"type": "NUMBER", "nullable": True, "description": "수기 메모의 1연구소 사용량 (톤)"},
+        "lab2_tons": {"type": "NUMBER", "nullable": True, "description": "수기 메모의 2연구소 사용량 (톤)"},
+        "service_period": {"type": "STRING", "nullable": True,
+                           "description": "사용기간 (YYYY.MM.DD ~ YYYY.MM.DD)"},
+    },
+    "required": list(BILL_FIELDS),
+}
+
+GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": RESPONSE_SCHEMA,
+}
+
+# 여러 청구서를 한 번에 요청할 때의 스키마 (이미지 번호 index를 포함한 배열)
+PACKED_RESPONSE_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "index": {"type": "INTEGER", "description": "이미지 번호 (0부터 시작)"},
+            **RESPONSE_SCHEMA["properties"],
+        },
+        "required": ["index"] + list(BILL_FIELDS),
+    },
+}
+
+PACKED_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": PACKED_RESPONSE_SCHEMA,
+}
+
+_NUMBER_PATTERN = re.compile(r"-?\d+(?:\.\d+)?")
+_FENCE_PATTERN = re.compile(r"```(?:json)?", re.IGNORECASE)
+_TRAILING_COMMA_PATTERN = re.compile(r",\s*([}\]])")
+_PYTHON_LITERALS = {"None": "null", "True": "true", "False": "false"}
+_PYTHON_LITERAL_PATTERN = re.compile(r"\b(None|True|False)\b")
+
+
+class BillParseError(ValueError):
+    """응답을 청구서 데이터로 해석할 수 없을 때 발생 (원본 응답 포함)"""
+
+    def __init__(self, message, response_text=""):
+        super().__init__(message)
+        self.response_text = response_text
+
+
+def to_number(value):
+    """
+    숫자 또는 "6,738원", "120 m³" 같은 문자열을 int/float로 변환 (None은 그대로)
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"숫자가 아닙니다: {value!r}")
+    if isinstance(value, (int, float)):
+        number = value
+    else:
+        text = str(value).replace(",", "").strip()
+        if text == "" or text.lower() in ("null", "none"):
+            return None
+        match = _NUMBER_PATTERN.search(text)
+        if not match:
+            raise ValueError(f"숫자가 아닙니다: {value!r}")
+        number = float(match.group())
+    if isinstance(number, float) and number.is_integer():
+        return int(number)
+    return number
+
+
+@dataclass(slots=True)
+class BillData:
+    """검증된 청구서 추출 결과"""
+    due_date_amount: Optional[float] = None
+    water_usage_m3: Optional[float] = None
+    lab1_tons: Optional[float] = None
+    lab2_tons: Optional[float] = None
+    service_period: Optional[str] = None
+
+    @classmethod
+    def from_mapping(cls, data):
+        """
+        딕셔너리에서 BillData를 생성하며 숫자 필드의 타입을 검증
+
+        Raises:
+            ValueError: 숫자 필드를 숫자로 해석할 수 없는 경우
+        """
+        if not isinstance(data, dict):
+            raise ValueError(f"JSON 객체가 아닙니다: {type(data).__name__}")
+
+        period = data.get("service_period")
+        return cls(
+            due_date_amount=to_number(data.get("due_date_amount")),
+            water_usage_m3=to_number(data.get("water_usage_m3")),
+            lab1_tons=to_number(data.get("lab1_tons")),
+            lab2_tons=to_number(data.get("lab2_tons")),
+            service_period=str(period).strip() if period is not None else None,
+        )
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in BILL_FIELDS}
+
+
+def repair_json_text(text):
+    """
+    흔한 형식 오류를 로컬에서 고친 JSON 문자열을 반환
+    (코드 블록 표시, 앞뒤 설명 문장, 끝의 쉼표, 스마트 따옴표, Python 리터럴, 작은따옴표)
+    """
+    repaired = _FENCE_PATTERN.sub("", text)
+    start = repaired.find("{")
+    end = repaired.rfind("}")
+    if start != -1:
+        repaired = repaired[start:end + 1] if end > start else repaired[start:] + "}"
+
+    repaired = repaired.replace("“", '"').replace("”", '"')
+    repaired = _PYTHON_LITERAL_PATTERN.sub(lambda m: _PYTHON_LITERALS[m.group()], repaired)
+    if '"' not in repaired:
+        repaired = repaired.replace("'", '"')
+    repaired = _TRAILING_COMMA_PATTERN.sub(r"\1", repaired)
+    return repaired.strip()
+
+
+@traced("json.parse")
+def parse_bill_response(response_text):
+    """
+    Gemini 응답 텍스트를 BillData로 변환
+    바로 파싱되지 않으면 repair_json_text로 복구를 한 번 시도
+
+    Raises:
+        BillParseError: 복구 후에도 해석할 수 없는 경우
+    """
+    cleaned = _FENCE_PATTERN.sub("", response_text).strip()
+    try:
+        data = json.loads(cleaned)
+    except json.JSONDecodeError:
+        try:
+            data = json.loads(repair_json_text(response_text))
+        except json.JSONDecodeError as e:
+            raise BillParseError(f"JSON 형식 오류: {e}", response_text) from e
+
+    try:
+        return BillData.from_mapping(data)
+    except ValueError as e:
+        raise BillParseError(str(e), response_text) from e
+
+
+@traced("json.parse_packed")
+def parse_packed_response(response_text):
+    """
+    여러 청구서를 한 번에 요청한 응답(JSON 배열)을 {이미지 번호: BillData}로 변환
+    index가 없거나 값이 잘못된 항목은 결과에서 제외하므로, 호출자는 빠진 번호만 다시 요청하면 됨
+
+    Raises:
+        BillParseError: 배열로 해석할 수 없는 경우
+    """
+    cleaned = _FENCE_PATTERN.sub("", response_text).strip()
+    start = cleaned.find("[")
+    end = cleaned.rfind("]")
+    if start != -1 and end > start:
+        cleaned = cleaned[start:end + 1]
+
+    try:
+        items = json.loads(cleaned)
+    except json.JSONDecodeError:
+        try:
+            items = json.loads(_TRAILING_COMMA_PATTERN.sub(r"\1", cleaned))
+        except json.JSONDecodeError as e:
+            raise BillParseError(f"JSON 형식 오류: {e}", response_text) from e
+
+    if not isinstance(items, list):
+        raise BillParseError("JSON 배열이 아닙니다.", response_text)
+
+    results = {}
+    for item in items:
+        try:
+            index = int(item["index"])
+            results[index] = BillData.from_mapping(item)
+        except (KeyError, TypeError, ValueError):
+            continue
+    return results
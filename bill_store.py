@@ -0,0 +1,413 @@
+"""
+청구서 처리 이력 저장소 (SQLite WAL)
+
+처리한 청구서의 추출 결과와 연구소별 사용량·부과액을 보관합니다.
+- 원본 파일 해시로 이미 처리한 청구서를 찾아 Gemini 호출 전에 중복을 걸러냄
+- 사용기간(시작일)과 연구소 기준 인덱스로 월별 사용량 추이를 파일을 다시 읽지 않고 조회
+- CSV / Parquet(pyarrow 필요)으로 내보내기
+"""
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+from fee_allocation import DEFAULT_ROUNDING, allocate_bill, lab_usages_from_bill
+from korean_format import ServicePeriod
+from tracing import increment
+
+DEFAULT_BILL_STORE_PATH = os.path.join(".cache", "bills.sqlite3")
+
+# find_many에서 한 번의 IN 조회에 넣을 최대 해시 수 (SQLite 변수 개수 제한보다 작게)
+_LOOKUP_CHUNK = 500
+
+_BILL_COLUMNS = ("id, content_hash, file_name, service_period, service_start, service_end, "
+                 "due_date_amount, water_usage_m3, total_fee, model_name, parsed_json, created_at")
+
+
+def content_hash(data, page=1):
+    """
+    청구서 원본 바이트의 SHA-256 (여러 페이지 PDF는 페이지 번호를 덧붙여 구분)
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    return digest if page == 1 else f"{digest}:{page}"
+
+
+@dataclass
+class StoredBill:
+    """저장된 청구서 한 건"""
+    id: int
+    content_hash: str
+    file_name: str
+    parsed_data: dict
+    service_period: str = None
+    service_start: str = None
+    service_end: str = None
+    due_date_amount: float = None
+    water_usage_m3: float = None
+    total_fee: int = None
+    model_name: str = ""
+    created_at: float = None
+    labs: dict = field(default_factory=dict)
+
+    @property
+    def processed_at(self):
+        return datetime.fromtimestamp(self.created_at) if self.created_at else None
+
+
+def _to_number(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _date_bound(value):
+    # date 또는 "YYYY-MM"/"YYYY-MM-DD" 문자열을 ISO 형식 비교용 문자열로 변환
+    if value is None:
+        return None
+    return value.isoformat() if isinstance(value, date) else str(value)
+
+
+def _previous_month(month):
+    # "YYYY-MM" → 전월 "YYYY-MM"
+    year, number = int(month[:4]), int(month[5:7])
+    return f"{year - 1}-12" if number == 1 else f"{year}-{number - 1:02d}"
+
+
+class BillStore:
+    """
+    SQLite 기반 청구서 이력 저장소
+
+    bills 테이블에 청구서 한 건씩, bill_labs 테이블에 연구소별 사용량·부과액을 저장하며
+    원본 해시(고유 인덱스), 사용기간 시작일, (연구소, 시작일) 인덱스를 사용합니다.
+    """
+
+    def __init__(self, path=DEFAULT_BILL_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            # WAL은 데이터베이스 파일에 유지되므로 한 번만 설정하면 됨 (읽기와 쓰기가 서로 막지 않음)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS bills (
+                    id INTEGER PRIMARY KEY,
+                    content_hash TEXT NOT NULL UNIQUE,
+                    file_name TEXT,
+                    service_period TEXT,
+                    service_start TEXT,
+                    service_end TEXT,
+                    due_date_amount REAL,
+                    water_usage_m3 REAL,
+                    total_fee INTEGER,
+                    model_name TEXT,
+                    parsed_json TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_bills_period ON bills (service_start);
+                CREATE TABLE IF NOT EXISTS bill_labs (
+                    bill_id INTEGER NOT NULL REFERENCES bills (id) ON DELETE CASCADE,
+                    lab TEXT NOT NULL,
+                    service_start TEXT,
+                    usage REAL,
+                    fee INTEGER,
+                    PRIMARY KEY (bill_id, lab)
+                );
+                CREATE INDEX IF NOT EXISTS idx_bill_labs_lab
+                    ON bill_labs (lab, service_start, usage, fee);
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            with self._lock:
+                yield conn
+                conn.commit()
+        finally:
+            conn.close()
+
+    def record(self, bill_hash, file_name, parsed_data, model_name="", rounding=DEFAULT_ROUNDING):
+        """
+        청구서 처리 결과를 저장 (같은 해시가 있으면 최신 결과로 갱신)
+
+        Returns:
+            저장된 청구서 ID
+        """
+        period = ServicePeriod.parse(parsed_data.get("service_period"))
+        service_start = period.start.isoformat() if period else None
+        service_end = period.end.isoformat() if period else None
+        lab_usages = lab_usages_from_bill(parsed_data)
+        try:
+            allocation = allocate_bill(parsed_data, rounding)
+            lab_fees, total_fee = allocation.shares, allocation.total
+        except ValueError:
+            # 사용량이 0이거나 숫자가 잘못된 청구서도 이력에는 남김 (부과액 없음)
+            lab_fees, total_fee = {}, None
+
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO bills (content_hash, file_name, service_period, service_start, service_end,
+                                   due_date_amount, water_usage_m3, total_fee, model_name, parsed_json,
+                                   created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (content_hash) DO UPDATE SET
+                    file_name = excluded.file_name,
+                    service_period = excluded.service_period,
+                    service_start = excluded.service_start,
+                    service_end = excluded.service_end,
+                    due_date_amount = excluded.due_date_amount,
+                    water_usage_m3 = excluded.water_usage_m3,
+                    total_fee = excluded.total_fee,
+                    model_name = excluded.model_name,
+                    parsed_json = excluded.parsed_json,
+                    updated_at = excluded.updated_at
+                """,
+                (bill_hash, file_name, parsed_data.get("service_period"), service_start, service_end,
+                 _to_number(parsed_data.get("due_date_amount")), _to_number(parsed_data.get("water_usage_m3")),
+                 total_fee, model_name, json.dumps(parsed_data, ensure_ascii=False), now, now)
+            )
+            bill_id = conn.execute("SELECT id FROM bills WHERE content_hash = ?", (bill_hash,)).fetchone()[0]
+            conn.execute("DELETE FROM bill_labs WHERE bill_id = ?", (bill_id,))
+            conn.executemany(
+                "INSERT INTO bill_labs (bill_id, lab, service_start, usage, fee) VALUES (?, ?, ?, ?, ?)",
+                [(bill_id, lab, service_start, _to_number(usage), lab_fees.get(lab))
+                 for lab, usage in lab_usages.items()]
+            )
+        return bill_id
+
+    def _load_labs(self, conn, bills):
+        if not bills:
+            return bills
+        by_id = {bill.id: bill for bill in bills}
+        placeholders = ", ".join("?" * len(by_id))
+        rows = conn.execute(
+            f"SELECT bill_id, lab, usage, fee FROM bill_labs WHERE bill_id IN ({placeholders}) ORDER BY lab",
+            tuple(by_id)
+        )
+        for bill_id, lab, usage, fee in rows:
+            by_id[bill_id].labs[lab] = {"usage": usage, "fee": fee}
+        return bills
+
+    @staticmethod
+    def _to_bill(row):
+        (bill_id, bill_hash, file_name, service_period, service_start, service_end,
+         due_date_amount, water_usage_m3, total_fee, model_name, parsed_json, created_at) = row
+        return StoredBill(
+            id=bill_id,
+            content_hash=bill_hash,
+            file_name=file_name,
+            parsed_data=json.loads(parsed_json),
+            service_period=service_period,
+            service_start=service_start,
+            service_end=service_end,
+            due_date_amount=due_date_amount,
+            water_usage_m3=water_usage_m3,
+            total_fee=total_fee,
+            model_name=model_name,
+            created_at=created_at,
+        )
+
+    def find(self, bill_hash):
+        """
+        해시가 같은 청구서를 반환 (처리한 적이 없으면 None)
+        """
+        return self.find_many([bill_hash]).get(bill_hash)
+
+    def find_many(self, bill_hashes):
+        """
+        여러 해시를 한 번에 조회하여 {해시: StoredBill}을 반환 (처리한 적이 있는 것만)
+        """
+        bill_hashes = list(dict.fromkeys(bill_hashes))
+        found = {}
+        with self._connect() as conn:
+            for offset in range(0, len(bill_hashes), _LOOKUP_CHUNK):
+                chunk = bill_hashes[offset:offset + _LOOKUP_CHUNK]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT {_BILL_COLUMNS} FROM bills WHERE content_hash IN ({placeholders})", chunk
+                ).fetchall()
+                bills = self._load_labs(conn, [self._to_bill(row) for row in rows])
+                found.update((bill.content_hash, bill) for bill in bills)
+        increment("history.lookups", len(bill_hashes))
+        increment("history.hits", len(found))
+        return found
+
+    def _filters(self, start, end, lab, alias="bills"):
+        # 사용기간 시작일 기준 [start, end) 범위와 연구소 조건
+        clauses, params = [], []
+        if start is not None:
+            clauses.append(f"{alias}.service_start >= ?")
+            params.append(_date_bound(start))
+        if end is not None:
+            clauses.append(f"{alias}.service_start < ?")
+            params.append(_date_bound(end))
+        if lab is not None:
+            clauses.append(f"{alias}.id IN (SELECT bill_id FROM bill_labs WHERE lab = ?)")
+            params.append(lab)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, start=None, end=None, lab=None, limit=None):
+        """
+        사용기간 시작일이 [start, end) 범위인 청구서를 최근 순으로 반환
+
+        Args:
+            start, end: date 또는 "YYYY-MM", "YYYY-MM-DD" 문자열 (None이면 제한 없음)
+            lab: 연구소 이름 (예: "lab1", 지정하면 해당 연구소 사용량이 있는 청구서만)
+            limit: 최대 건수
+        """
+        where, params = self._filters(start, end, lab)
+        sql = f"SELECT {_BILL_COLUMNS} FROM bills{where} ORDER BY service_start DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+            return self._load_labs(conn, [self._to_bill(row) for row in rows])
+
+    def monthly_usage(self, start=None, end=None, lab=None):
+        """
+        사용기간 시작 월별 사용량 합계와 전월 대비 증감률
+
+        Returns:
+            [{"month": "YYYY-MM", "bills", "usage", "fee", "change"}, ...] (월 순)
+            lab을 지정하면 해당 연구소의 사용량·부과액, 아니면 청구서 전체 사용량·부과액 합계
+        """
+        clauses, params = ["service_start IS NOT NULL"], []
+        if start is not None:
+            clauses.append("service_start >= ?")
+            params.append(_date_bound(start))
+        if end is not None:
+            clauses.append("service_start < ?")
+            params.append(_date_bound(end))
+        if lab is not None:
+            table, usage, fee = "bill_labs", "usage", "fee"
+            clauses.insert(0, "lab = ?")
+            params.insert(0, lab)
+        else:
+            table, usage, fee = "bills", "water_usage_m3", "total_fee"
+
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT substr(service_start, 1, 7) AS month, COUNT(*), SUM({usage}), SUM({fee}) "
+                f"FROM {table} WHERE {' AND '.join(clauses)} GROUP BY month ORDER BY month",
+                params
+            ).fetchall()
+
+        # 증감률은 바로 앞 행이 아니라 실제 전월과 비교 (전월 기록이 없으면 None)
+        usage_by_month = {month: total_usage for month, _, total_usage, _ in rows}
+        result = []
+        for month, bills, total_usage, total_fee in rows:
+            previous = usage_by_month.get(_previous_month(month))
+            result.append({
+                "month": month,
+                "bills": bills,
+                "usage": total_usage or 0.0,
+                "fee": total_fee or 0,
+                "change": (total_usage - previous) / previous if previous else None,
+            })
+        return result
+
+    def _export_rows(self, start, end, lab):
+        # (열 이름, 행 generator): 연구소별 사용량·부과액은 연구소마다 열로 펼침
+        with self._connect() as conn:
+            labs = [row[0] for row in conn.execute("SELECT DISTINCT lab FROM bill_labs ORDER BY lab")]
+        columns = ["id", "file_name", "content_hash", "service_period", "service_start", "service_end",
+                   "due_date_amount", "water_usage_m3", "total_fee"]
+        columns += [f"{lab}_usage" for lab in labs] + [f"{lab}_fee" for lab in labs]
+        columns += ["model_name", "processed_at"]
+
+        def rows():
+            # 한 번에 읽지 않고 일정 건수씩 읽어서 기록
+            where, params = self._filters(start, end, lab)
+            last_id = 0
+            while True:
+                page_where = f"{where} AND bills.id > ?" if where else " WHERE bills.id > ?"
+                with self._connect() as conn:
+                    page = [self._to_bill(row) for row in conn.execute(
+                        f"SELECT {_BILL_COLUMNS} FROM bills{page_where} ORDER BY id LIMIT ?",
+                        (*params, last_id, _LOOKUP_CHUNK)
+                    ).fetchall()]
+                    self._load_labs(conn, page)
+                if not page:
+                    return
+                for bill in page:
+                    yield [bill.id, bill.file_name, bill.content_hash, bill.service_period, bill.service_start,
+                           bill.service_end, bill.due_date_amount, bill.water_usage_m3, bill.total_fee,
+                           *(bill.labs.get(name, {}).get("usage") for name in labs),
+                           *(bill.labs.get(name, {}).get("fee") for name in labs),
+                           bill.model_name, bill.processed_at.isoformat(timespec="seconds")]
+                last_id = page[-1].id
+
+        return columns, rows()
+
+    def export_csv(self, output, start=None, end=None, lab=None):
+        """
+        이력을 CSV로 내보냄 (output: 파일 경로 또는 텍스트 파일 객체, 엑셀 호환을 위해 경로는 UTF-8 BOM)
+
+        Returns:
+            내보낸 건수
+        """
+        columns, rows = self._export_rows(start, end, lab)
+        if isinstance(output, (str, os.PathLike)):
+            with open(output, "w", encoding="utf-8-sig", newline="") as f:
+                return self._write_csv(f, columns, rows)
+        return self._write_csv(output, columns, rows)
+
+    @staticmethod
+    def _write_csv(f, columns, rows):
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        count = 0
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        return count
+
+    def export_parquet(self, output, start=None, end=None, lab=None):
+        """
+        이력을 Parquet으로 내보냄 (pyarrow 필요)
+
+        Returns:
+            내보낸 건수
+
+        Raises:
+            RuntimeError: pyarrow가 설치되어 있지 않은 경우
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Parquet으로 내보내려면 pyarrow가 필요합니다: pip install pyarrow") from e
+
+        columns, rows = self._export_rows(start, end, lab)
+        data = list(zip(*rows)) or [()] * len(columns)
+        table = pa.table({name: list(values) for name, values in zip(columns, data)})
+        pq.write_table(table, output)
+        return table.num_rows
+
+    def stats(self):
+        """
+        저장된 청구서 수와 사용기간 범위를 반환
+        """
+        with self._connect() as conn:
+            count, first, last = conn.execute(
+                "SELECT COUNT(*), MIN(service_start), MAX(service_start) FROM bills"
+            ).fetchone()
+        return {"bills": count, "first_period": first, "last_period": last}
@@ -0,0 +1,115 @@
+"""
+공문 일괄 생성 (템플릿을 한 번만 로드하여 여러 청구서의 공문을 생성)
+
+추출 결과 레코드를 generator로 하나씩 처리하므로, 건수와 관계없이 메모리 사용량이 일정합니다.
+- write_documents_zip: 청구서별 ODT를 담은 ZIP을 스트리밍으로 기록
+- write_merged_document: 청구서마다 페이지를 나눈 섹션으로 이어 붙인 하나의 ODT를 기록
+"""
+import os
+import time
+import zipfile
+from dataclasses import dataclass, field
+
+from fee_allocation import DEFAULT_ROUNDING
+from odt_utils import build_water_bill_replacements, get_odt_template
+
+DOCUMENT_PREFIX = "수도요금부과"
+
+
+@dataclass
+class BulkRenderReport:
+    """일괄 생성 결과 (생성 건수, 실패 목록, 소요 시간)"""
+    documents: int = 0
+    failures: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def docs_per_second(self):
+        return self.documents / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        return (f"{self.documents}건 생성 (실패 {len(self.failures)}건, "
+                f"{self.elapsed:.2f}초, {self.docs_per_second:,.1f}건/초)")
+
+
+def record_from_result(result):
+    """
+    CLI/파이프라인 결과({"file", "parsed_data", ...})를 일괄 생성용 레코드로 변환
+    """
+    return {"name": result.get("file"), **(result.get("parsed_data") or {})}
+
+
+def document_name(record, index):
+    """
+    레코드의 공문 파일명 (name이 있으면 원본 파일명 기준, 없으면 순번)
+    """
+    name = record.get("name")
+    if name:
+        stem = os.path.splitext(os.path.basename(name))[0]
+        return f"{DOCUMENT_PREFIX}_{stem}.odt"
+    return f"{DOCUMENT_PREFIX}_{index:04d}.odt"
+
+
+def _iter_replacements(records, report, rounding):
+    # 치환 내용을 계산할 수 없는 레코드는 실패로 기록하고 건너뜀
+    for index, record in enumerate(records, start=1):
+        try:
+            replacements = build_water_bill_replacements(record, rounding)
+        except Exception as e:
+            report.failures.append((document_name(record, index), f"{type(e).__name__}: {e}"))
+            continue
+        yield index, record, replacements
+
+
+def render_documents(template_path, records, rounding=DEFAULT_ROUNDING, report=None):
+    """
+    레코드마다 (파일명, ODT 바이트)를 차례로 반환 (generator)
+    """
+    template = get_odt_template(template_path)
+    report = report if report is not None else BulkRenderReport()
+    started = time.perf_counter()
+    for index, record, replacements in _iter_replacements(records, report, rounding):
+        content = template.render_bytes(replacements)
+        report.documents += 1
+        report.elapsed = time.perf_counter() - started
+        yield document_name(record, index), content
+
+
+def write_documents_zip(template_path, records, output, rounding=DEFAULT_ROUNDING):
+    """
+    청구서별 공문 ODT를 하나의 ZIP으로 output(파일 경로 또는 파일 객체)에 기록
+    ODT는 이미 압축되어 있으므로 ZIP에는 무압축으로 저장
+
+    Returns:
+        BulkRenderReport
+    """
+    report = BulkRenderReport()
+    started = time.perf_counter()
+    used_names = set()
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as zip_out:
+        for name, content in render_documents(template_path, records, rounding, report):
+            # 같은 파일명이 있으면 순번을 붙여 구분
+            unique_name = name
+            suffix = 2
+            while unique_name in used_names:
+                unique_name = f"{os.path.splitext(name)[0]}_{suffix}.odt"
+                suffix += 1
+            used_names.add(unique_name)
+            zip_out.writestr(unique_name, content)
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def write_merged_document(template_path, records, output, rounding=DEFAULT_ROUNDING):
+    """
+    모든 청구서의 공문을 페이지를 나눈 섹션으로 이어 붙인 하나의 ODT를 output에 기록
+
+    Returns:
+        BulkRenderReport
+    """
+    report = BulkRenderReport()
+    started = time.perf_counter()
+    replacements = (replacements for _, _, replacements in _iter_replacements(records, report, rounding))
+    report.documents = get_odt_template(template_path).render_merged(output, replacements)
+    report.elapsed = time.perf_counter() - started
+    return report
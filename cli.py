@@ -0,0 +1,304 @@
+"""
+수도요금 청구서 일괄 분석 CLI (Streamlit 없이 실행)
+
+사용 예:
+    python cli.py extract 청구서/ --concurrency 8 --output results.jsonl
+    python cli.py extract 청구서/ --odt-dir 출력/  (공문 ODT도 함께 생성)
+    python cli.py documents results.jsonl --zip 공문.zip  (추출 결과로 공문 일괄 생성)
+    python cli.py history --monthly --lab lab1  (처리 이력의 월별 사용량)
+    python cli.py history --csv 이력.csv --since 2025-01
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from batch import DEFAULT_CONCURRENCY, DEFAULT_MAX_PACK_ITEMS, BatchItem
+from bill_store import DEFAULT_BILL_STORE_PATH, BillStore
+from bulk_documents import record_from_result, write_documents_zip, write_merged_document
+from extraction import DEFAULT_PROMPT, GEMINI_MODEL_NAME, SUPPORTED_EXTENSIONS
+from extraction_cache import ExtractionCache
+from image_utils import DEFAULT_MAX_LONG_EDGE, PreprocessOptions
+from pdf_utils import DEFAULT_PDF_DPI
+from fee_allocation import ROUNDING_MODES, TRUNCATE, RoundingPolicy
+from model_router import FAST_MODEL_NAME, default_router, router_stats
+from pipeline import GENERATED_PREFIX, BillPipeline, find_template
+from tracing import configure_json_logging, tracer
+
+
+def collect_files(paths):
+    """
+    인자로 받은 파일/폴더에서 지원 형식의 청구서 파일 경로를 수집
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                        files.append(os.path.join(root, name))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            print(f"⚠️ 파일을 찾을 수 없습니다: {path}", file=sys.stderr)
+    return files
+
+
+def read_items(files):
+    for path in files:
+        with open(path, "rb") as f:
+            yield BatchItem(name=path, data=f.read())
+
+
+def run_extract(args):
+    load_dotenv(dotenv_path='gemini.env')
+    api_key = args.api_key or os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        print("❌ GEMINI_API_KEY가 설정되지 않았습니다.", file=sys.stderr)
+        return 2
+
+    files = collect_files(args.paths)
+    if not files:
+        print("❌ 처리할 청구서 파일이 없습니다.", file=sys.stderr)
+        return 2
+
+    prompt = DEFAULT_PROMPT
+    if args.prompt_file:
+        with open(args.prompt_file, encoding="utf-8") as f:
+            prompt = f.read()
+
+    cache = None if args.no_cache else ExtractionCache()
+    preprocess = None
+    if not args.no_preprocess:
+        preprocess = PreprocessOptions(
+            max_long_edge=args.max_edge,
+            grayscale=args.grayscale,
+            enhance_contrast=args.enhance_contrast,
+            image_format=args.image_format
+        )
+    with_document = bool(args.odt_dir)
+    template_path = args.template or find_template()
+    if with_document:
+        if template_path is None:
+            print("❌ 서식 템플릿 파일(ODT)을 찾을 수 없습니다. --template으로 지정해주세요.", file=sys.stderr)
+            return 2
+        os.makedirs(args.odt_dir, exist_ok=True)
+
+    pipeline = BillPipeline(
+        api_key,
+        model_name=args.model,
+        prompt=prompt,
+        cache=cache,
+        preprocess=preprocess,
+        pdf_dpi=args.dpi,
+        pdf_grayscale=args.grayscale,
+        template_path=template_path,
+        local_first=args.local_first,
+        rounding=RoundingPolicy(unit=args.rounding_unit, mode=args.rounding),
+        store=None if args.no_history else BillStore(args.history_db),
+        router=default_router(args.model, args.fast_model) if args.route else None,
+    )
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+
+    started = time.perf_counter()
+    failures = 0
+    duplicates = 0
+    used_document_names = set()
+    try:
+        results = pipeline.process_many(read_items(files), args.concurrency, with_document,
+                                        pack=args.pack, max_pack_items=args.pack_size)
+        for result in results:
+            if not result.success:
+                failures += 1
+            duplicates += result.from_history
+            record = result.to_dict()
+            if result.document is not None:
+                # 다른 폴더에 같은 이름의 파일이 있으면 순번을 붙여 구분 (서로 덮어쓰지 않도록)
+                stem = os.path.splitext(os.path.basename(result.name))[0]
+                document_name = f"{GENERATED_PREFIX}_{stem}.odt"
+                suffix = 2
+                while document_name in used_document_names:
+                    document_name = f"{GENERATED_PREFIX}_{stem}_{suffix}.odt"
+                    suffix += 1
+                used_document_names.add(document_name)
+                record["document_path"] = os.path.join(args.odt_dir, document_name)
+                with open(record["document_path"], "wb") as f:
+                    f.write(result.document)
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - started
+    if args.trace_file:
+        tracer.export(args.trace_file)
+    print(
+        f"✅ {len(files)}건 처리 완료 (실패 {failures}건, 이력 사용 {duplicates}건, {elapsed:.1f}초, "
+        f"동시 실행 {args.concurrency})",
+        file=sys.stderr
+    )
+    if pipeline.router is not None:
+        routing = router_stats.summary()
+        if routing["bills"]:
+            # 모든 청구서를 마지막 단계(상위 모델)로만 요청했을 때와 상대 비용 비교
+            baseline = routing["bills"] * pipeline.router.tiers[-1].relative_cost
+            print(
+                f"🔀 모델 라우팅: {routing['bills']}건 중 승격 {routing['escalation_rate']:.0%}, "
+                f"상대 비용 {routing['total_cost']:g} (상위 모델만 사용 시 {baseline:g}), "
+                f"승격 사유 {routing['issues'] or '없음'}",
+                file=sys.stderr
+            )
+    return 1 if failures else 0
+
+
+def read_records(path):
+    """
+    extract 명령의 JSON Lines 결과에서 성공한 건을 일괄 생성용 레코드로 읽음 (generator)
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            result = json.loads(line)
+            if result.get("success", True) and result.get("parsed_data"):
+                yield record_from_result(result)
+
+
+def run_documents(args):
+    template_path = args.template or find_template()
+    if template_path is None:
+        print("❌ 서식 템플릿 파일(ODT)을 찾을 수 없습니다. --template으로 지정해주세요.", file=sys.stderr)
+        return 2
+
+    rounding = RoundingPolicy(unit=args.rounding_unit, mode=args.rounding)
+    records = read_records(args.results)
+    if args.merged:
+        report = write_merged_document(template_path, records, args.merged, rounding)
+    else:
+        report = write_documents_zip(template_path, records, args.zip, rounding)
+
+    for name, error in report.failures:
+        print(f"⚠️ {name}: {error}", file=sys.stderr)
+    print(f"✅ {report.summary()}", file=sys.stderr)
+    return 1 if report.failures else 0
+
+
+def run_history(args):
+    store = BillStore(args.history_db)
+    if args.csv or args.parquet:
+        try:
+            if args.csv:
+                count = store.export_csv(args.csv, args.since, args.until, args.lab)
+            else:
+                count = store.export_parquet(args.parquet, args.since, args.until, args.lab)
+        except RuntimeError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 2
+        print(f"✅ {count}건을 {args.csv or args.parquet}에 저장했습니다.", file=sys.stderr)
+        return 0
+
+    if args.monthly:
+        for row in store.monthly_usage(args.since, args.until, args.lab):
+            print(json.dumps(row, ensure_ascii=False))
+        return 0
+
+    for bill in store.query(args.since, args.until, args.lab, limit=args.limit):
+        print(json.dumps({
+            "file": bill.file_name,
+            "service_period": bill.service_period,
+            "water_usage_m3": bill.water_usage_m3,
+            "total_fee": bill.total_fee,
+            "labs": bill.labs,
+            "processed_at": bill.processed_at.isoformat(timespec="seconds"),
+        }, ensure_ascii=False))
+    return 0
+
+
+def add_rounding_arguments(parser):
+    parser.add_argument("--rounding", choices=ROUNDING_MODES, default=TRUNCATE,
+                        help="부과액 반올림 방식 (기본값: truncate, 절사)")
+    parser.add_argument("--rounding-unit", type=int, default=10,
+                        help="부과액 반올림 단위 (원, 기본값: 10)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="판교 소부장 공동연구소 수도요금 청구서 일괄 분석")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    extract = subparsers.add_parser("extract", help="청구서에서 정보를 추출하여 요금 계산 결과와 함께 JSON Lines로 출력")
+    extract.add_argument("paths", nargs="+", help="청구서 파일 또는 폴더")
+    extract.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                         help=f"동시에 실행할 최대 Gemini 요청 수 (기본값: {DEFAULT_CONCURRENCY})")
+    extract.add_argument("--output", help="결과를 저장할 JSON Lines 파일 (기본값: 표준 출력)")
+    extract.add_argument("--model", default=GEMINI_MODEL_NAME, help="사용할 Gemini 모델명")
+    extract.add_argument("--prompt-file", help="분석 프롬프트 파일 (기본 프롬프트 대신 사용)")
+    extract.add_argument("--api-key", help="Gemini API 키 (기본값: GEMINI_API_KEY 환경 변수)")
+    extract.add_argument("--dpi", type=int, default=DEFAULT_PDF_DPI,
+                         help=f"PDF 변환 해상도 (기본값: {DEFAULT_PDF_DPI})")
+    extract.add_argument("--grayscale", action="store_true", help="PDF와 이미지를 흑백으로 변환")
+    extract.add_argument("--max-edge", type=int, default=DEFAULT_MAX_LONG_EDGE,
+                         help=f"전송 이미지의 최대 긴 변 픽셀 (기본값: {DEFAULT_MAX_LONG_EDGE})")
+    extract.add_argument("--enhance-contrast", action="store_true", help="전송 전 대비 보정")
+    extract.add_argument("--image-format", choices=["JPEG", "WEBP"], default="JPEG",
+                         help="전송 이미지 형식 (기본값: JPEG)")
+    extract.add_argument("--no-preprocess", action="store_true", help="이미지를 원본 그대로 전송")
+    extract.add_argument("--pack", action="store_true",
+                         help="여러 청구서를 한 번의 Gemini 요청으로 묶어서 분석")
+    extract.add_argument("--pack-size", type=int, default=DEFAULT_MAX_PACK_ITEMS,
+                         help=f"한 번에 묶을 최대 청구서 수 (기본값: {DEFAULT_MAX_PACK_ITEMS})")
+    extract.add_argument("--local-first", action="store_true",
+                         help="텍스트가 있는 PDF는 인쇄된 항목을 로컬에서 먼저 읽고 나머지만 Gemini에 요청")
+    extract.add_argument("--route", action="store_true",
+                         help="빠른 모델로 먼저 분석하고, 일관성 검사에 실패한 청구서만 --model로 다시 요청")
+    extract.add_argument("--fast-model", default=FAST_MODEL_NAME,
+                         help=f"--route에서 먼저 사용할 빠른 모델 (기본값: {FAST_MODEL_NAME})")
+    extract.add_argument("--odt-dir", help="청구서별 공문(ODT)을 생성하여 저장할 폴더")
+    extract.add_argument("--template", help="공문 템플릿 ODT 경로 (기본값: 서식 폴더에서 찾음)")
+    add_rounding_arguments(extract)
+    extract.add_argument("--no-cache", action="store_true", help="분석 결과 캐시를 사용하지 않음")
+    extract.add_argument("--no-history", action="store_true",
+                         help="처리 이력을 사용하지 않음 (이미 처리한 청구서도 다시 분석하고 이력에 저장하지 않음)")
+    extract.add_argument("--history-db", default=DEFAULT_BILL_STORE_PATH,
+                         help=f"처리 이력 데이터베이스 경로 (기본값: {DEFAULT_BILL_STORE_PATH})")
+    extract.add_argument("--trace-file", help="단계별 처리 시간과 카운터를 저장할 JSON 파일")
+    extract.set_defaults(func=run_extract)
+
+    documents = subparsers.add_parser("documents", help="extract 결과(JSON Lines)로 공문을 일괄 생성")
+    documents.add_argument("results", help="extract 명령의 JSON Lines 결과 파일")
+    output = documents.add_mutually_exclusive_group(required=True)
+    output.add_argument("--zip", help="청구서별 공문 ODT를 담을 ZIP 파일")
+    output.add_argument("--merged", help="모든 공문을 페이지별로 이어 붙일 하나의 ODT 파일")
+    documents.add_argument("--template", help="공문 템플릿 ODT 경로 (기본값: 서식 폴더에서 찾음)")
+    add_rounding_arguments(documents)
+    documents.set_defaults(func=run_documents)
+
+    history = subparsers.add_parser("history", help="처리 이력 조회와 내보내기 (JSON Lines, CSV, Parquet)")
+    history.add_argument("--since", help="사용기간 시작일 하한 (예: 2025-01, 2025-01-15)")
+    history.add_argument("--until", help="사용기간 시작일 상한 (포함하지 않음, 예: 2026-01)")
+    history.add_argument("--lab", help="연구소 (예: lab1)")
+    history.add_argument("--limit", type=int, default=100, help="출력할 최대 청구서 수 (기본값: 100)")
+    history.add_argument("--monthly", action="store_true", help="월별 사용량 합계와 전월 대비 증감률 출력")
+    export = history.add_mutually_exclusive_group()
+    export.add_argument("--csv", help="이력을 저장할 CSV 파일")
+    export.add_argument("--parquet", help="이력을 저장할 Parquet 파일 (pyarrow 필요)")
+    history.add_argument("--history-db", default=DEFAULT_BILL_STORE_PATH,
+                         help=f"처리 이력 데이터베이스 경로 (기본값: {DEFAULT_BILL_STORE_PATH})")
+    history.set_defaults(func=run_history)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # TRACE_LOG 환경 변수가 있으면 단계별 span과 오류를 JSON Lines로 기록
+    configure_json_logging()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""
+청구서 정보 추출 (Streamlit과 무관하게 재사용 가능한 Gemini 호출 로직)
+"""
+import io
+import os
+
+from bill_schema import (
+    GENERATION_CONFIG,
+    PACKED_GENERATION_CONFIG,
+    BillData,
+    BillParseError,
+    parse_bill_response,
+    parse_packed_response
+)
+from extraction_cache import make_cache_key
+from gemini_client import GEMINI_MODEL_NAME, generate_content, stream_content
+from image_utils import preprocess_image
+from json_stream import IncrementalJsonParser
+from pdf_utils import DEFAULT_PDF_DPI, render_pdf_page
+
+DEFAULT_PROMPT = '''이미지에서 다음 정보를 추출하여 JSON 형식으로 반환해주세요:
+1. "due_date_amount": 납기 내 요금 (숫자만 추출)
+2. "water_usage_m3": 상수도요금 사용량 (m³ 단위의 숫자만 추출)
+3. "lab1_tons": 수기 메모에 있는 1연구소 사용량 (톤 단위의 숫자만 추출, 없으면 null)
+4. "lab2_tons": 수기 메모에 있는 2연구소 사용량 (톤 단위의 숫자만 추출, 없으면 null)
+5. "service_period": 사용기간 (예: "YYYY.MM.DD ~ YYYY.MM.DD")
+
+만약 특정 필드를 찾을 수 없다면, 해당 필드의 값은 null로 설정해주세요.
+'''
+
+SUPPORTED_EXTENSIONS = (".png", ".jpg", ".jpeg", ".pdf")
+
+# 로컬 복구로도 해석할 수 없는 응답일 때 다시 요청하는 최대 횟수
+MAX_REQUERY = 1
+
+# 여러 청구서를 한 번에 요청할 때 프롬프트 앞에 붙이는 안내
+PACK_PROMPT_HEADER = '''아래에 청구서 {count}건이 "[이미지 번호]" 표시와 함께 차례로 주어집니다.
+각 청구서마다 아래 지시에 따라 정보를 추출하고, 모든 결과를 하나의 JSON 배열로 반환해주세요.
+배열의 각 항목에는 해당 청구서의 번호를 "index" 필드(0부터 시작하는 정수)로 포함해주세요.
+
+'''
+
+
+def load_bill_image(file_name, data, dpi=DEFAULT_PDF_DPI, grayscale=False):
+    """
+    업로드된 파일(이미지 또는 PDF)을 PIL 이미지로 변환
+    PDF는 첫 페이지만 지정한 해상도로 변환
+    """
+    if os.path.splitext(file_name)[1].lower() == ".pdf":
+        return render_pdf_page(data, page=1, dpi=dpi, grayscale=grayscale)
+
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
+
+
+def prepare_bill_source(image, preprocess=None, original_bytes=None):
+    """
+    Gemini에 보낼 입력을 준비
+    전처리 설정이 있으면 축소·재인코딩한 blob을, 없으면 원본을 그대로 반환
+
+    Returns:
+        (source, PreprocessedImage 또는 None) 튜플
+    """
+    if preprocess is None or isinstance(image, str):
+        return image, None
+    processed = preprocess_image(image, preprocess, original_bytes)
+    return processed.to_blob(), processed
+
+
+def request_extraction(image, api_key, prompt, model_name=GEMINI_MODEL_NAME):
+    """
+    이미지(PIL 이미지, 전처리된 blob 또는 PDF 텍스트 레이어 문자열)와 프롬프트를 Gemini에 보내고 응답 텍스트를 반환
+    JSON 응답 형식과 스키마(GENERATION_CONFIG)를 지정하여 요청
+    오류는 호출자가 처리하도록 그대로 전달
+    """
+    response = generate_content(api_key, model_name, [prompt, image],
+                                generation_config=GENERATION_CONFIG)
+    return response.text
+
+
+def request_packed_extraction(sources, api_key, prompt=DEFAULT_PROMPT, model_name=GEMINI_MODEL_NAME):
+    """
+    여러 청구서(이미지, blob 또는 PDF 텍스트)를 한 번의 요청으로 추출
+
+    Returns:
+        {sources 내 위치: parsed_data} 딕셔너리
+        응답에서 빠졌거나 값이 잘못된 청구서는 포함되지 않음
+
+    Raises:
+        BillParseError: 응답을 JSON 배열로 해석할 수 없는 경우
+    """
+    contents = [PACK_PROMPT_HEADER.format(count=len(sources)) + prompt]
+    for index, source in enumerate(sources):
+        contents.append(f"[이미지 {index}]")
+        contents.append(source)
+
+    response = generate_content(api_key, model_name, contents,
+                                generation_config=PACKED_GENERATION_CONFIG)
+    return {
+        index: bill.to_dict()
+        for index, bill in parse_packed_response(response.text).items()
+        if 0 <= index < len(sources)
+    }
+
+
+def stream_extraction(image, api_key, prompt, on_field=None, model_name=GEMINI_MODEL_NAME):
+    """
+    스트리밍 모드로 정보를 추출하고, 필드가 완성될 때마다 on_field(키, 값)를 호출
+
+    Returns:
+        (parsed_data, complete, response_text) 튜플
+        응답 끝부분이 깨져 complete가 False여도 완성된 필드는 parsed_data에 포함됨
+    """
+    parser = IncrementalJsonParser()
+    chunks = []
+
+    def emit(fields):
+        if on_field is not None:
+            for key, value in fields:
+                on_field(key, value)
+
+    for chunk in stream_content(api_key, model_name, [prompt, image],
+                                generation_config=GENERATION_CONFIG):
+        chunks.append(chunk)
+        emit(parser.feed(chunk))
+    emit(parser.finish())
+
+    response_text = "".join(chunks)
+    try:
+        if parser.complete:
+            return BillData.from_mapping(parser.fields).to_dict(), True, response_text
+        # 끝부분이 깨진 경우 로컬 복구를 먼저 시도
+        return parse_bill_response(response_text).to_dict(), True, response_text
+    except ValueError:
+        return parser.fields, False, response_text
+
+
+def parse_response_text(response_text):
+    """
+    응답 텍스트에서 JSON을 추출하여 숫자 타입이 검증된 딕셔너리로 반환
+    모델이 ```json ... ``` 으로 감싸거나 형식이 조금 깨진 경우도 로컬에서 복구
+
+    Raises:
+        BillParseError: 복구 후에도 해석할 수 없는 경우
+    """
+    return parse_bill_response(response_text).to_dict()
+
+
+def extract_bill(image, api_key, prompt=DEFAULT_PROMPT, model_name=GEMINI_MODEL_NAME,
+                 cache=None, preprocess=None):
+    """
+    청구서 이미지에서 정보를 추출 (캐시가 주어지면 먼저 조회)
+    preprocess(PreprocessOptions)가 주어지면 전처리한 이미지를 전송
+
+    Returns:
+        (parsed_data, from_cache) 튜플
+    """
+    image, _ = prepare_bill_source(image, preprocess)
+
+    cache_key = None
+    if cache is not None:
+        cache_key = make_cache_key(image, prompt, model_name)
+        cached_data = cache.get(cache_key)
+        if cached_data is not None:
+            return cached_data, True
+
+    # 로컬 복구로도 해석할 수 없을 때만 다시 요청
+    for attempt in range(MAX_REQUERY + 1):
+        response_text = request_extraction(image, api_key, prompt, model_name)
+        try:
+            parsed_data = parse_response_text(response_text)
+            break
+        except BillParseError:
+            if attempt == MAX_REQUERY:
+                raise
+
+    if cache is not None:
+        cache.put(cache_key, parsed_data, model_name)
+    return parsed_data, False
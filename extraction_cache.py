@@ -0,0 +1,177 @@
+"""
+Gemini 추출 결과 캐시 (이미지 해시 + 프롬프트 + 모델명 기반 SQLite 저장소)
+"""
+import hashlib
+import json
+from contextlib import contextmanager
+import os
+import sqlite3
+import threading
+import time
+
+from tracing import increment
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "extraction_cache.sqlite3")
+DEFAULT_MAX_ENTRIES = 500
+DEFAULT_TTL_SECONDS = 60 * 60 * 24 * 90  # 90일
+
+
+def make_cache_key(image, prompt, model_name):
+    """
+    이미지, 프롬프트, 모델명으로 캐시 키(SHA-256)를 생성
+    이미지는 RGB로 정규화한 픽셀 데이터를 사용하므로 파일 메타데이터가 달라도 같은 키가 됨
+    PDF 텍스트 레이어처럼 문자열이 주어지면 텍스트 내용을,
+    전처리된 이미지 blob({"mime_type", "data"})이 주어지면 인코딩된 바이트를 사용
+    """
+    hasher = hashlib.sha256()
+    if isinstance(image, str):
+        hasher.update(b"text:")
+        hasher.update(image.encode("utf-8"))
+    elif isinstance(image, dict):
+        hasher.update(f"blob:{image['mime_type']}:".encode("utf-8"))
+        hasher.update(image["data"])
+    else:
+        normalized = image if image.mode == "RGB" else image.convert("RGB")
+        hasher.update(f"{normalized.width}x{normalized.height}".encode("utf-8"))
+        hasher.update(normalized.tobytes())
+    hasher.update(b"\x00")
+    hasher.update(prompt.strip().encode("utf-8"))
+    hasher.update(b"\x00")
+    hasher.update(model_name.encode("utf-8"))
+    return hasher.hexdigest()
+
+
+class ExtractionCache:
+    """
+    추출 결과(parsed_data JSON)를 디스크에 저장하는 캐시
+    - 최대 항목 수를 넘으면 가장 오래 사용되지 않은 항목부터 삭제 (LRU)
+    - TTL이 지난 항목은 조회 시 무효 처리
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES,
+                 ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS extraction_cache (
+                    key TEXT PRIMARY KEY,
+                    model_name TEXT NOT NULL,
+                    parsed_json TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_accessed REAL NOT NULL,
+                    hit_count INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_extraction_cache_accessed "
+                "ON extraction_cache (last_accessed)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """
+        캐시된 parsed_data를 반환 (없거나 만료되었으면 None)
+        """
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT parsed_json, created_at FROM extraction_cache WHERE key = ?",
+                (key,)
+            ).fetchone()
+
+            if row is None or (self.ttl_seconds and now - row[1] > self.ttl_seconds):
+                if row is not None:
+                    conn.execute("DELETE FROM extraction_cache WHERE key = ?", (key,))
+                self.misses += 1
+                increment("cache.misses")
+                return None
+
+            conn.execute(
+                "UPDATE extraction_cache SET last_accessed = ?, hit_count = hit_count + 1 "
+                "WHERE key = ?",
+                (now, key)
+            )
+            self.hits += 1
+            increment("cache.hits")
+            return json.loads(row[0])
+
+    def put(self, key, parsed_data, model_name=""):
+        """
+        추출 결과를 저장하고 필요하면 LRU 방식으로 오래된 항목을 정리
+        """
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO extraction_cache "
+                "(key, model_name, parsed_json, created_at, last_accessed, hit_count) "
+                "VALUES (?, ?, ?, ?, ?, 0)",
+                (key, model_name, json.dumps(parsed_data, ensure_ascii=False), now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        if self.ttl_seconds:
+            conn.execute(
+                "DELETE FROM extraction_cache WHERE created_at < ?",
+                (now - self.ttl_seconds,)
+            )
+        if self.max_entries:
+            conn.execute(
+                """
+                DELETE FROM extraction_cache WHERE key IN (
+                    SELECT key FROM extraction_cache
+                    ORDER BY last_accessed DESC
+                    LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,)
+            )
+
+    def invalidate(self, key):
+        """
+        특정 항목을 삭제 (삭제되었으면 True)
+        """
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute("DELETE FROM extraction_cache WHERE key = ?", (key,))
+            return cursor.rowcount > 0
+
+    def clear(self):
+        """
+        모든 캐시 항목을 삭제
+        """
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM extraction_cache")
+
+    def stats(self):
+        """
+        캐시 적중/실패 횟수와 저장된 항목 수를 반환
+        """
+        with self._lock, self._connect() as conn:
+            size = conn.execute("SELECT COUNT(*) FROM extraction_cache").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": size,
+        }
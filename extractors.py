@@ -0,0 +1,263 @@
+"""
+청구서 추출기 인터페이스와 로컬 우선 추출 체인
+
+로컬 추출기(PDF 텍스트 레이어)가 먼저 인쇄된 항목을 채우고,
+비어 있거나 신뢰도가 낮은 항목(예: 수기 메모의 연구소 사용량)만 Gemini에 요청합니다.
+"""
+import re
+import statistics
+from abc import ABC, abstractmethod
+import threading
+import time
+from dataclasses import dataclass, field
+
+from bill_schema import BILL_FIELDS, BillData
+from extraction import DEFAULT_PROMPT, GEMINI_MODEL_NAME, extract_bill
+
+
+# 항목별 Gemini 지시문 (필요한 항목만 골라 프롬프트를 구성)
+FIELD_INSTRUCTIONS = {
+    "due_date_amount": '"due_date_amount": 납기 내 요금 (숫자만 추출)',
+    "water_usage_m3": '"water_usage_m3": 상수도요금 사용량 (m³ 단위의 숫자만 추출)',
+    "lab1_tons": '"lab1_tons": 수기 메모에 있는 1연구소 사용량 (톤 단위의 숫자만 추출, 없으면 null)',
+    "lab2_tons": '"lab2_tons": 수기 메모에 있는 2연구소 사용량 (톤 단위의 숫자만 추출, 없으면 null)',
+    "service_period": '"service_period": 사용기간 (예: "YYYY.MM.DD ~ YYYY.MM.DD")',
+}
+
+DEFAULT_MIN_CONFIDENCE = 0.8
+
+_AMOUNT_PATTERN = re.compile(r"납기\s*내\s*(?:금액|요금)?[^\d\n]{0,20}([\d,]{3,})\s*원?")
+_USAGE_PATTERN = re.compile(r"(?:상수도\s*)?사용량[^\d\n]{0,20}([\d,]+(?:\.\d+)?)\s*(?:m3|m³|㎥|톤)?")
+_PERIOD_PATTERN = re.compile(
+    r"(\d{4})\s*[.\-/]\s*(\d{1,2})\s*[.\-/]\s*(\d{1,2})\.?\s*[~\-]\s*"
+    r"(\d{4})\s*[.\-/]\s*(\d{1,2})\s*[.\-/]\s*(\d{1,2})"
+)
+
+
+def build_field_prompt(fields):
+    """
+    지정한 항목만 추출하도록 하는 Gemini 프롬프트를 생성
+    """
+    lines = [f"{number}. {FIELD_INSTRUCTIONS[name]}" for number, name in enumerate(fields, start=1)]
+    return (
+        "이미지에서 다음 정보를 추출하여 JSON 형식으로 반환해주세요:\n"
+        + "\n".join(lines)
+        + "\n\n만약 특정 필드를 찾을 수 없다면, 해당 필드의 값은 null로 설정해주세요.\n"
+    )
+
+
+@dataclass
+class BillDocument:
+    """
+    추출기에 전달하는 청구서
+    text: PDF 텍스트 레이어 (없으면 None)
+    source: Gemini에 보낼 입력 (PIL 이미지, 전처리된 blob 또는 텍스트)
+    """
+    name: str
+    text: str = None
+    source: object = None
+
+
+@dataclass
+class ExtractionResult:
+    """추출기 하나의 결과 (항목 값과 항목별 신뢰도 0.0 ~ 1.0)"""
+    fields: dict = field(default_factory=dict)
+    confidence: dict = field(default_factory=dict)
+    # 모델 라우팅을 사용한 경우의 RoutingDecision (캐시 적중이나 라우팅을 사용하지 않으면 None)
+    routing: object = None
+
+
+class BillExtractor(ABC):
+    """
+    추출기 기본 클래스 (extract를 구현하지 않은 하위 클래스는 생성할 수 없음)
+    extract(document, fields, known)는 요청받은 항목 중 찾은 것만 ExtractionResult로 반환
+    known은 앞 단계에서 이미 확정된 항목 {항목명: 값}
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def extract(self, document, fields, known=None):
+        ...
+
+
+class PdfTextLayerExtractor(BillExtractor):
+    """
+    PDF 텍스트 레이어에서 인쇄된 항목(납기 내 금액, 사용량, 사용기간)을 정규식으로 추출
+    같은 항목에 서로 다른 값이 여러 개 보이면 신뢰도를 낮춤
+    """
+
+    name = "pdf_text"
+
+    def extract(self, document, fields, known=None):
+        result = ExtractionResult()
+        if not document.text:
+            return result
+
+        text = document.text
+        if "due_date_amount" in fields:
+            self._set_number(result, "due_date_amount", _AMOUNT_PATTERN.findall(text))
+        if "water_usage_m3" in fields:
+            self._set_number(result, "water_usage_m3", _USAGE_PATTERN.findall(text))
+        if "service_period" in fields:
+            periods = [
+                f"{m[0]}.{int(m[1]):02d}.{int(m[2]):02d} ~ {m[3]}.{int(m[4]):02d}.{int(m[5]):02d}"
+                for m in _PERIOD_PATTERN.findall(text)
+            ]
+            if periods:
+                result.fields["service_period"] = periods[0]
+                result.confidence["service_period"] = 0.95 if len(set(periods)) == 1 else 0.5
+        return result
+
+    @staticmethod
+    def _set_number(result, name, matches):
+        values = []
+        for match in matches:
+            try:
+                values.append(BillData.from_mapping({name: match}).to_dict()[name])
+            except ValueError:
+                continue
+        values = [value for value in values if value is not None]
+        if values:
+            result.fields[name] = values[0]
+            result.confidence[name] = 0.9 if len(set(values)) == 1 else 0.5
+
+
+class GeminiExtractor(BillExtractor):
+    """
+    요청받은 항목만 Gemini로 추출
+    prompt: 사용자가 수정한 프롬프트 (None이거나 기본 프롬프트이면 요청받은 항목만 묻는 프롬프트를 생성)
+    router: model_router.ModelRouter (선택, 앞 단계에서 확정된 항목과 합쳐 일관성 검사를 하고 필요하면 승격)
+    """
+
+    name = "gemini"
+
+    def __init__(self, api_key, model_name=GEMINI_MODEL_NAME, cache=None, preprocess=None,
+                 prompt=None, router=None):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.cache = cache
+        self.preprocess = preprocess
+        self.prompt = prompt
+        self.router = router
+
+    def extract(self, document, fields, known=None):
+        if self.prompt is None or self.prompt == DEFAULT_PROMPT:
+            prompt = build_field_prompt(fields)
+        else:
+            prompt = self.prompt
+
+        decision = None
+        if self.router is not None:
+            parsed_data, _, decision = self.router.extract(
+                document.source, self.api_key, prompt, self.cache, self.preprocess, known=known
+            )
+        else:
+            parsed_data, _ = extract_bill(
+                document.source, self.api_key, prompt, self.model_name, self.cache, self.preprocess
+            )
+        return ExtractionResult(
+            fields={name: parsed_data.get(name) for name in fields},
+            confidence={name: 1.0 for name in fields},
+            routing=decision,
+        )
+
+
+class ExtractorStats:
+    """
+    추출기별 호출 수, 채운 항목 수(적중률), 지연 시간 기록
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records = {}
+
+    def record(self, name, requested, filled, elapsed):
+        with self._lock:
+            record = self._records.setdefault(
+                name, {"calls": 0, "requested": 0, "filled": 0, "latencies": []}
+            )
+            record["calls"] += 1
+            record["requested"] += requested
+            record["filled"] += filled
+            record["latencies"].append(elapsed)
+            del record["latencies"][:-500]
+
+    def summary(self):
+        """
+        {추출기명: {"calls", "hit_rate", "avg_ms"}} 형식의 요약
+        """
+        with self._lock:
+            return {
+                name: {
+                    "calls": record["calls"],
+                    "hit_rate": record["filled"] / record["requested"] if record["requested"] else 0.0,
+                    "avg_ms": statistics.mean(record["latencies"]) * 1000 if record["latencies"] else 0.0,
+                }
+                for name, record in self._records.items()
+            }
+
+
+extractor_stats = ExtractorStats()
+
+
+class ExtractorChain:
+    """
+    추출기를 순서대로 실행하며, 앞 단계에서 비었거나 신뢰도가 min_confidence 미만인 항목만 다음 단계에 요청
+    """
+
+    def __init__(self, extractors, min_confidence=DEFAULT_MIN_CONFIDENCE, stats=extractor_stats):
+        self.extractors = list(extractors)
+        self.min_confidence = min_confidence
+        self.stats = stats
+        # 가장 최근 extract에서 사용한 모델 라우팅 결과 (RoutingDecision, 없으면 None)
+        self.routing = None
+
+    def extract(self, document, fields=BILL_FIELDS):
+        """
+        Returns:
+            (parsed_data, 항목별 추출기명) 튜플
+        """
+        parsed_data = {name: None for name in fields}
+        sources = {}
+        remaining = list(fields)
+        self.routing = None
+
+        for extractor in self.extractors:
+            if not remaining:
+                break
+
+            started = time.perf_counter()
+            known = {name: parsed_data[name] for name in sources}
+            result = extractor.extract(document, remaining, known)
+            elapsed = time.perf_counter() - started
+            if result.routing is not None:
+                self.routing = result.routing
+
+            accepted = [
+                name for name in remaining
+                if result.fields.get(name) is not None
+                and result.confidence.get(name, 0.0) >= self.min_confidence
+            ]
+            # 마지막 단계(Gemini)의 null 응답은 "청구서에 없음"으로 확정
+            is_last = extractor is self.extractors[-1]
+            for name in remaining:
+                if name in accepted or (is_last and name in result.fields):
+                    parsed_data[name] = result.fields.get(name)
+                    sources[name] = extractor.name
+
+            self.stats.record(extractor.name, len(remaining), len(accepted), elapsed)
+            remaining = [name for name in remaining if name not in sources]
+
+        return parsed_data, sources
+
+
+def local_first_chain(api_key, model_name=GEMINI_MODEL_NAME, cache=None, preprocess=None,
+                      min_confidence=DEFAULT_MIN_CONFIDENCE, prompt=None, router=None):
+    """
+    PDF 텍스트 레이어 → Gemini 순서의 기본 추출 체인
+    """
+    return ExtractorChain(
+        [PdfTextLayerExtractor(), GeminiExtractor(api_key, model_name, cache, preprocess, prompt, router)],
+        min_confidence=min_confidence,
+    )
@@ -0,0 +1,216 @@
+"""
+연구소별 수도요금 배분 계산 (정확한 정수/유리수 연산)
+
+부과액 = 납기 내 금액 × 연구소 사용량 ÷ 전체 사용량을 부동소수점 오차 없이 계산한 뒤
+반올림 정책(기본값: 10원 단위 절사)을 적용합니다. 연구소 수에 제한이 없으며,
+연간 정산처럼 많은 (청구서, 연구소) 행은 allocate_batch로 NumPy 배열 연산을 사용합니다.
+"""
+import math
+import re
+from dataclasses import dataclass, field
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from fractions import Fraction
+
+TRUNCATE = "truncate"
+HALF_UP = "half_up"
+CEILING = "ceiling"
+ROUNDING_MODES = (TRUNCATE, HALF_UP, CEILING)
+
+# 일괄 계산에서 사용량을 정수로 바꿀 때의 배율 (0.001톤 단위까지 정확)
+USAGE_SCALE = 1000
+
+# parsed_data에서 연구소 사용량 항목을 찾는 패턴 (lab1_tons, lab2_tons, ...)
+_LAB_FIELD_PATTERN = re.compile(r"^lab(\d+)_tons$")
+
+
+def _to_fraction(value):
+    """숫자 또는 숫자 문자열을 오차 없는 Fraction으로 변환 (float은 10진 표기 그대로 사용)"""
+    if value is None:
+        return Fraction(0)
+    if isinstance(value, (Fraction, int)):
+        return Fraction(value)
+    try:
+        return Fraction(Decimal(str(value).replace(",", "").strip()))
+    except (InvalidOperation, ValueError) as e:
+        raise ValueError(f"숫자가 아닙니다: {value!r}") from e
+
+
+def _round_division(numerator, denominator, mode):
+    """
+    양의 분모에 대해 numerator / denominator를 정수로 반올림 (정수 연산만 사용)
+    """
+    if mode == TRUNCATE:
+        return numerator // denominator
+    if mode == CEILING:
+        return -(-numerator // denominator)
+    return (2 * numerator + denominator) // (2 * denominator)
+
+
+@dataclass(frozen=True)
+class RoundingPolicy:
+    """
+    부과액 반올림 정책
+    unit: 반올림 단위 (원), mode: truncate(절사), half_up(반올림), ceiling(올림)
+    """
+    unit: int = 10
+    mode: str = TRUNCATE
+
+    def __post_init__(self):
+        if self.mode not in ROUNDING_MODES:
+            raise ValueError(f"지원하지 않는 반올림 방식입니다: {self.mode}")
+        if self.unit <= 0:
+            raise ValueError(f"반올림 단위는 양수여야 합니다: {self.unit}")
+
+    def apply(self, value):
+        """
+        금액(Fraction)에 정책을 적용한 정수 금액을 반환
+        """
+        value = Fraction(value)
+        return _round_division(value.numerator, value.denominator * self.unit, self.mode) * self.unit
+
+
+DEFAULT_ROUNDING = RoundingPolicy()
+
+
+@dataclass
+class Allocation:
+    """
+    청구서 한 건의 배분 결과
+    shares: {연구소: 부과액}, total: 연구소 사용량 합계에 대한 부과액
+    remainder: total과 연구소별 부과액 합계의 차이 (반올림으로 생긴 나머지)
+    """
+    unit_price: Fraction
+    shares: dict = field(default_factory=dict)
+    total: int = 0
+    lab_usage: Fraction = Fraction(0)
+
+    @property
+    def remainder(self):
+        return self.total - sum(self.shares.values())
+
+    def unit_price_decimal(self, places=2):
+        """표시용 단가 (소수점 places자리 반올림)"""
+        quantum = Decimal(1).scaleb(-places)
+        return (Decimal(self.unit_price.numerator) / Decimal(self.unit_price.denominator)).quantize(
+            quantum, rounding=ROUND_HALF_UP
+        )
+
+
+def allocate(total_amount, total_usage, lab_usages, policy=DEFAULT_ROUNDING):
+    """
+    전체 요금을 연구소별 사용량에 따라 배분
+
+    Args:
+        total_amount: 납기 내 금액 (원)
+        total_usage: 전체 사용량
+        lab_usages: {연구소: 사용량}
+        policy: RoundingPolicy
+
+    Raises:
+        ValueError: 전체 사용량이 0 이하이거나 사용량이 음수인 경우
+    """
+    amount = _to_fraction(total_amount)
+    usage = _to_fraction(total_usage)
+    if usage <= 0:
+        raise ValueError("상수도 사용량이 0이므로 요금을 계산할 수 없습니다.")
+
+    lab_fractions = {lab: _to_fraction(value) for lab, value in lab_usages.items()}
+    if any(value < 0 for value in lab_fractions.values()):
+        raise ValueError("연구소 사용량은 음수일 수 없습니다.")
+
+    unit_price = amount / usage
+    lab_usage = sum(lab_fractions.values(), Fraction(0))
+    return Allocation(
+        unit_price=unit_price,
+        shares={lab: policy.apply(unit_price * value) for lab, value in lab_fractions.items()},
+        total=policy.apply(unit_price * lab_usage),
+        lab_usage=lab_usage,
+    )
+
+
+def lab_usages_from_bill(parsed_data):
+    """
+    추출 데이터에서 {"lab1": 사용량, "lab2": 사용량, ...}을 번호 순으로 반환 (없는 값은 0)
+    """
+    labs = sorted(
+        (int(match.group(1)), key)
+        for key in parsed_data
+        for match in [_LAB_FIELD_PATTERN.match(key)]
+        if match
+    )
+    return {f"lab{number}": parsed_data.get(key) or 0 for number, key in labs}
+
+
+def allocate_bill(parsed_data, policy=DEFAULT_ROUNDING):
+    """
+    추출 데이터(due_date_amount, water_usage_m3, labN_tons)로 연구소별 부과액을 계산
+    """
+    return allocate(
+        parsed_data.get("due_date_amount") or 0,
+        parsed_data.get("water_usage_m3") or 0,
+        lab_usages_from_bill(parsed_data),
+        policy,
+    )
+
+
+def _scaled_usage(np, values):
+    return np.rint(np.asarray(values, dtype=np.float64) * USAGE_SCALE).astype(np.int64)
+
+
+def allocate_batch(total_amounts, total_usages, lab_usages, policy=DEFAULT_ROUNDING):
+    """
+    여러 청구서의 연구소별 부과액을 한 번에 계산 (NumPy 배열 연산)
+
+    Args:
+        total_amounts: 청구서별 납기 내 금액 (원 단위 정수, 길이 N)
+        total_usages: 청구서별 전체 사용량 (길이 N, 0.001 단위까지 반영)
+        lab_usages: 청구서별 연구소 사용량 (N × 연구소 수)
+        policy: RoundingPolicy
+
+    Returns:
+        (연구소별 부과액 N × 연구소 수 배열, 연구소 합계 부과액 길이 N 배열) 튜플
+        전체 사용량이 0 이하인 행은 0으로 채움
+
+    allocate와 같은 결과를 내며, 금액이 커서 int64 범위를 넘을 수 있으면 Python 정수로 계산합니다.
+    """
+    import numpy as np
+
+    amounts = np.rint(np.asarray(total_amounts, dtype=np.float64)).astype(np.int64)
+    usages = _scaled_usage(np, total_usages)
+    labs = _scaled_usage(np, lab_usages)
+    if labs.ndim != 2 or labs.shape[0] != amounts.shape[0] or usages.shape != amounts.shape:
+        raise ValueError("lab_usages는 (청구서 수 × 연구소 수) 형태여야 합니다.")
+    if (labs < 0).any():
+        raise ValueError("연구소 사용량은 음수일 수 없습니다.")
+
+    valid = usages > 0
+    lab_totals = labs.sum(axis=1)
+
+    # 금액 × 사용량이 int64를 넘을 수 있으면 Python 정수(object 배열)로 계산
+    largest = int(np.abs(amounts).max(initial=0)) * int(lab_totals.max(initial=0))
+    if largest * 2 + int(usages.max(initial=0)) * policy.unit >= 2 ** 62:
+        amounts, usages, labs, lab_totals = (
+            array.astype(object) for array in (amounts, usages, labs, lab_totals)
+        )
+
+    denominators = np.where(valid, usages, 1) * policy.unit
+    shares = _round_division(amounts[:, None] * labs, denominators[:, None], policy.mode) * policy.unit
+    totals = _round_division(amounts * lab_totals, denominators, policy.mode) * policy.unit
+
+    shares = np.where(valid[:, None], shares, 0)
+    totals = np.where(valid, totals, 0)
+    if shares.dtype == object:
+        shares, totals = shares.astype(np.int64), totals.astype(np.int64)
+    return shares, totals
+
+
+def remainder_bound(lab_count, policy=DEFAULT_ROUNDING):
+    """
+    반올림 나머지(합계 부과액 - 연구소별 부과액 합)가 가질 수 있는 범위 (최소, 최대)
+    """
+    spread = max(lab_count - 1, 0) * policy.unit
+    if policy.mode == TRUNCATE:
+        return 0, spread
+    if policy.mode == CEILING:
+        return -spread, 0
+    return -math.ceil(lab_count / 2) * policy.unit, math.ceil(lab_count / 2) * policy.unit
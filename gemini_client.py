@@ -0,0 +1,193 @@
+"""
+프로세스 전체에서 재사용하는 Gemini 클라이언트/모델 팩토리
+
+genai.configure와 GenerativeModel 생성을 (API 키, 모델명)마다 한 번만 수행하여
+Streamlit 재실행이나 여러 세션에서도 같은 연결을 재사용합니다.
+"""
+import os
+import statistics
+import threading
+import time
+
+from request_scheduler import RequestScheduler
+from tracing import increment, span, tracer
+
+
+GEMINI_MODEL_NAME = 'gemini-pro-latest'
+
+_lock = threading.Lock()
+_configured_api_key = None
+_models = {}
+_model_factory = None
+_scheduler = None
+
+
+class LatencyStats:
+    """
+    모델별 첫 호출(cold)과 이후 호출(warm)의 응답 시간 기록
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._warmed = set()
+        self.cold = []
+        self.warm = []
+
+    def record(self, model_key, elapsed):
+        with self._lock:
+            if model_key in self._warmed:
+                self.warm.append(elapsed)
+            else:
+                self._warmed.add(model_key)
+                self.cold.append(elapsed)
+
+    def summary(self):
+        """
+        cold/warm 호출 횟수와 평균 응답 시간(초)을 반환
+        """
+        with self._lock:
+            return {
+                "cold_calls": len(self.cold),
+                "cold_avg": statistics.mean(self.cold) if self.cold else None,
+                "warm_calls": len(self.warm),
+                "warm_avg": statistics.mean(self.warm) if self.warm else None,
+            }
+
+
+latency_stats = LatencyStats()
+
+
+def set_model_factory(factory):
+    """
+    모델 생성 함수를 교체 (factory(model_name) -> 모델 객체)
+    가짜 Gemini 모델로 네트워크 없이 테스트/벤치마크할 때 사용하며, None이면 실제 Gemini 사용
+    """
+    global _model_factory
+    with _lock:
+        _model_factory = factory
+        _models.clear()
+
+
+def get_scheduler():
+    """
+    프로세스 전체에서 공유하는 요청 스케줄러를 반환
+    환경 변수 GEMINI_REQUESTS_PER_MINUTE, GEMINI_TIMEOUT_SECONDS로 할당량과 타임아웃을 조정
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _lock:
+            if _scheduler is None:
+                _scheduler = RequestScheduler(
+                    timeout=float(os.environ.get("GEMINI_TIMEOUT_SECONDS", 60)),
+                    requests_per_minute=float(os.environ.get("GEMINI_REQUESTS_PER_MINUTE", 60)),
+                )
+    return _scheduler
+
+
+def set_scheduler(scheduler):
+    """
+    공유 요청 스케줄러를 교체 (테스트나 할당량 변경 시 사용)
+    """
+    global _scheduler
+    with _lock:
+        _scheduler = scheduler
+
+
+def get_model(api_key, model_name=GEMINI_MODEL_NAME):
+    """
+    (API 키, 모델명)별로 캐시된 GenerativeModel을 반환
+    """
+    global _configured_api_key
+
+    if not api_key:
+        raise ValueError("Google AI Studio API 키가 없습니다.")
+
+    key = (api_key, model_name)
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            if _model_factory is not None:
+                model = _model_factory(model_name)
+            else:
+                # google.generativeai는 불러오는 데 1초 가까이 걸리므로 실제 모델을 만들 때 import
+                import google.generativeai as genai
+
+                if _configured_api_key != api_key:
+                    genai.configure(api_key=api_key)
+                    _configured_api_key = api_key
+                model = genai.GenerativeModel(model_name)
+            _models[key] = model
+    return model
+
+
+def payload_bytes(contents):
+    """
+    요청 내용의 대략적인 전송 크기(바이트)
+    문자열과 전처리된 blob은 실제 크기, PIL 이미지는 압축 전 크기의 1/10로 추정
+    """
+    total = 0
+    for part in contents:
+        if isinstance(part, str):
+            total += len(part.encode("utf-8"))
+        elif isinstance(part, dict):
+            total += len(part.get("data", b""))
+        elif hasattr(part, "getbands"):
+            total += part.width * part.height * len(part.getbands()) // 10
+    return total
+
+
+def _count_request(model_name, contents):
+    increment("gemini.calls")
+    increment(f"gemini.calls.{model_name}")
+    increment("gemini.bytes_uploaded", payload_bytes(contents))
+
+
+def generate_content(api_key, model_name, contents, **kwargs):
+    """
+    캐시된 모델로 generate_content를 호출하고 응답 시간을 기록
+    요청은 공유 스케줄러를 거치므로 속도 제한, 타임아웃, 재시도가 적용됨
+    """
+    model = get_model(api_key, model_name)
+    _count_request(model_name, contents)
+    started = time.perf_counter()
+    with span("gemini.call", model=model_name):
+        response = get_scheduler().call(
+            lambda timeout: model.generate_content(contents, request_options={"timeout": timeout}, **kwargs)
+        )
+    latency_stats.record((api_key, model_name), time.perf_counter() - started)
+    return response
+
+
+def stream_content(api_key, model_name, contents, **kwargs):
+    """
+    캐시된 모델로 스트리밍 호출을 하고 응답 텍스트 조각을 차례로 반환 (generator)
+    전체 응답을 받는 데 걸린 시간을 기록 (요청 시작은 공유 스케줄러를 거침)
+    """
+    model = get_model(api_key, model_name)
+    _count_request(model_name, contents)
+    started = time.perf_counter()
+    # generator 안에서는 span context를 유지할 수 없으므로 소요 시간을 직접 기록
+    try:
+        response = get_scheduler().call(
+            lambda timeout: model.generate_content(
+                contents, stream=True, request_options={"timeout": timeout}, **kwargs
+            )
+        )
+        for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # 안전 필터 등으로 텍스트가 없는 조각
+                continue
+            if text:
+                yield text
+    except Exception as e:
+        tracer.record("gemini.stream", time.perf_counter() - started, error=f"{type(e).__name__}: {e}",
+                      model=model_name)
+        raise
+    tracer.record("gemini.stream", time.perf_counter() - started, model=model_name)
+    latency_stats.record((api_key, model_name), time.perf_counter() - started)
@@ -0,0 +1,104 @@
+"""
+Gemini 전송 전 청구서 이미지 전처리 (회전 보정, 축소, 흑백/대비 보정, 재인코딩)
+"""
+import io
+from dataclasses import dataclass
+
+from tracing import traced
+
+
+DEFAULT_MAX_LONG_EDGE = 2048
+DEFAULT_IMAGE_FORMAT = "JPEG"
+DEFAULT_IMAGE_QUALITY = 85
+
+_MIME_TYPES = {
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+}
+
+
+@dataclass(frozen=True)
+class PreprocessOptions:
+    """이미지 전처리 설정"""
+    max_long_edge: int = DEFAULT_MAX_LONG_EDGE
+    grayscale: bool = False
+    enhance_contrast: bool = False
+    image_format: str = DEFAULT_IMAGE_FORMAT
+    quality: int = DEFAULT_IMAGE_QUALITY
+
+
+@dataclass
+class PreprocessedImage:
+    """전처리된 이미지와 전송 크기 정보"""
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    original_bytes: int = None
+
+    @property
+    def processed_bytes(self):
+        return len(self.data)
+
+    @property
+    def reduction(self):
+        """원본 대비 줄어든 비율 (0.0 ~ 1.0)"""
+        if not self.original_bytes:
+            return 0.0
+        return 1 - self.processed_bytes / self.original_bytes
+
+    def to_blob(self):
+        """Gemini generate_content에 바로 전달할 수 있는 blob 딕셔너리"""
+        return {"mime_type": self.mime_type, "data": self.data}
+
+
+@traced("image.preprocess")
+def preprocess_image(image, options=None, original_bytes=None):
+    """
+    청구서 이미지를 Gemini 전송용으로 전처리
+
+    Args:
+        image: PIL 이미지
+        options: PreprocessOptions (없으면 기본값)
+        original_bytes: 원본 파일 크기 (없으면 None으로 두고 감소율은 0으로 표시,
+            원본을 다시 인코딩해 추정하면 전처리보다 오래 걸리므로 추정하지 않음)
+
+    Returns:
+        PreprocessedImage
+    """
+    from PIL import Image, ImageOps
+
+    options = options or PreprocessOptions()
+    image_format = options.image_format.upper()
+    if image_format not in _MIME_TYPES:
+        raise ValueError(f"지원하지 않는 이미지 형식입니다: {options.image_format}")
+
+    # 휴대폰 사진의 EXIF 회전 정보 반영
+    processed = ImageOps.exif_transpose(image)
+
+    # 긴 변 기준으로 축소 (확대는 하지 않음)
+    long_edge = max(processed.size)
+    if options.max_long_edge and long_edge > options.max_long_edge:
+        scale = options.max_long_edge / long_edge
+        new_size = (max(1, round(processed.width * scale)), max(1, round(processed.height * scale)))
+        processed = processed.resize(new_size, Image.LANCZOS)
+
+    if options.grayscale:
+        processed = processed.convert("L")
+    elif processed.mode not in ("RGB", "L"):
+        processed = processed.convert("RGB")
+
+    # 수기 메모가 흐린 경우 대비 보정
+    if options.enhance_contrast:
+        processed = ImageOps.autocontrast(processed, cutoff=1)
+
+    buffer = io.BytesIO()
+    processed.save(buffer, format=image_format, quality=options.quality, optimize=True)
+
+    return PreprocessedImage(
+        data=buffer.getvalue(),
+        mime_type=_MIME_TYPES[image_format],
+        width=processed.width,
+        height=processed.height,
+        original_bytes=original_bytes
+    )
@@ -0,0 +1,204 @@
+"""
+백그라운드 작업 큐 (SQLite에 상태와 결과를 저장하는 공유 작업자 풀)
+
+작업을 제출하면 작업 ID를 바로 반환하고, 작업은 프로세스 전체에서 공유하는
+스레드 풀에서 실행됩니다. 상태·진행 상황·결과가 SQLite에 기록되므로
+Streamlit 화면이 다시 실행되어도 작업 ID로 진행 상황을 조회할 수 있습니다.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+DEFAULT_JOB_DB_PATH = os.path.join(".cache", "jobs.sqlite3")
+DEFAULT_JOB_WORKERS = 4
+DEFAULT_JOB_RETENTION_SECONDS = 7 * 24 * 60 * 60  # 7일
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_INTERRUPTED_MESSAGE = "서버가 다시 시작되어 작업이 중단되었습니다. 다시 요청해주세요."
+
+
+@dataclass
+class Job:
+    """작업 한 건의 상태"""
+    id: str
+    kind: str
+    status: str
+    owner: str = None
+    progress: object = None
+    result: object = None
+    error: str = None
+    created_at: float = None
+    started_at: float = None
+    finished_at: float = None
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class JobQueue:
+    """
+    SQLite 기반 작업 큐
+
+    작업 함수는 func(report, *args, **kwargs) 형식으로 호출되며,
+    report(progress)로 JSON 직렬화 가능한 진행 상황을 기록할 수 있습니다.
+    반환값(JSON 직렬화 가능)은 작업 결과로 저장됩니다.
+    """
+
+    def __init__(self, db_path=DEFAULT_JOB_DB_PATH, max_workers=DEFAULT_JOB_WORKERS,
+                 retention_seconds=DEFAULT_JOB_RETENTION_SECONDS):
+        self.db_path = db_path
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    owner TEXT,
+                    status TEXT NOT NULL,
+                    progress TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_owner ON jobs (owner, created_at)")
+            # 이전 프로세스에서 끝나지 못한 작업은 다시 실행할 수 없으므로 실패로 기록
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE status IN (?, ?)",
+                (FAILED, _INTERRUPTED_MESSAGE, time.time(), QUEUED, RUNNING)
+            )
+            conn.execute(
+                "DELETE FROM jobs WHERE created_at < ?",
+                (time.time() - self.retention_seconds,)
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with self._lock:
+                yield conn
+                conn.commit()
+        finally:
+            conn.close()
+
+    def submit(self, kind, func, *args, owner=None, **kwargs):
+        """
+        작업을 등록하고 작업 ID를 바로 반환
+
+        Args:
+            kind: 작업 종류 (예: "extraction", "document", "batch")
+            func: func(report, *args, **kwargs)로 호출할 작업 함수
+            owner: 작업을 요청한 세션 ID (같은 세션의 작업만 조회할 때 사용)
+        """
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, owner, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, owner, QUEUED, time.time())
+            )
+        self._executor.submit(self._run, job_id, func, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, func, args, kwargs):
+        self._update(job_id, status=RUNNING, started_at=time.time())
+
+        def report(progress):
+            self._update(job_id, progress=json.dumps(progress, ensure_ascii=False))
+
+        try:
+            # 결과를 저장할 수 없는 경우(JSON으로 변환 불가)도 실패로 기록하여 RUNNING에 남지 않도록 함
+            result = json.dumps(func(report, *args, **kwargs), ensure_ascii=False)
+        except Exception as e:
+            self._update(job_id, status=FAILED, error=f"{type(e).__name__}: {e}",
+                         finished_at=time.time())
+            return
+        self._update(job_id, status=DONE, result=result, finished_at=time.time())
+
+    def _update(self, job_id, **columns):
+        assignments = ", ".join(f"{name} = ?" for name in columns)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*columns.values(), job_id))
+
+    @staticmethod
+    def _to_job(row):
+        job_id, kind, owner, status, progress, result, error, created_at, started_at, finished_at = row
+        return Job(
+            id=job_id,
+            kind=kind,
+            owner=owner,
+            status=status,
+            progress=json.loads(progress) if progress else None,
+            result=json.loads(result) if result else None,
+            error=error,
+            created_at=created_at,
+            started_at=started_at,
+            finished_at=finished_at,
+        )
+
+    def get(self, job_id):
+        """
+        작업 상태를 반환 (없으면 None)
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, kind, owner, status, progress, result, error, "
+                "created_at, started_at, finished_at FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        return self._to_job(row) if row else None
+
+    def list_jobs(self, owner=None, limit=20):
+        """
+        최근 작업 목록을 반환 (owner를 지정하면 해당 세션의 작업만)
+        """
+        query = ("SELECT id, kind, owner, status, progress, result, error, "
+                 "created_at, started_at, finished_at FROM jobs")
+        params = ()
+        if owner is not None:
+            query += " WHERE owner = ?"
+            params = (owner,)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        with self._connect() as conn:
+            rows = conn.execute(query, (*params, limit)).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def stats(self):
+        """
+        상태별 작업 수를 반환
+        """
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
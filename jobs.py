@@ -0,0 +1,130 @@
+"""
+백그라운드 작업 큐(job_queue.JobQueue)에서 실행하는 청구서 분석·문서 생성 작업
+
+모든 작업 함수는 첫 번째 인자로 진행 상황 기록 함수 report를 받고,
+JSON으로 저장할 수 있는 결과를 반환합니다. Streamlit에 의존하지 않습니다.
+"""
+import time
+
+from batch import DEFAULT_CONCURRENCY, DEFAULT_MAX_PACK_ITEMS, extract_bills, extract_bills_packed
+from bill_schema import BillParseError
+from extraction import DEFAULT_PROMPT, GEMINI_MODEL_NAME, extract_bill, stream_extraction
+from extractors import BillDocument, local_first_chain
+from odt_utils import build_water_bill_document, cleanup_generated_documents, save_generated_document
+from pdf_utils import DEFAULT_PDF_DPI
+
+
+def run_extraction_job(report, source, api_key, prompt=DEFAULT_PROMPT, model_name=GEMINI_MODEL_NAME,
+                       cache=None, cache_key=None, pdf_text=None, name="", stream=True,
+                       store=None, bill_hash=None, router=None):
+    """
+    청구서 한 건 분석 작업
+    pdf_text가 있으면 로컬 우선 추출, stream이면 완성된 항목을 진행 상황으로 기록
+    store와 bill_hash가 있으면 온전한 결과를 처리 이력에 저장
+    router(model_router.ModelRouter)가 있으면 빠른 모델로 먼저 분석(스트리밍)하고,
+    일관성 검사에 실패하면 상위 모델로 다시 요청 (cache_key는 router.name 기준이어야 함)
+
+    Returns:
+        {"parsed_data": 추출 결과, "complete": 응답이 온전한지 여부,
+         "routing": 라우팅 결과 (router를 사용한 경우)}
+    """
+    decision = None
+    if pdf_text:
+        chain = local_first_chain(api_key, model_name, cache, prompt=prompt, router=router)
+        parsed_data, sources = chain.extract(BillDocument(name=name, text=pdf_text, source=source))
+        decision = chain.routing
+        report({"fields": parsed_data, "sources": sources})
+        complete = True
+    elif stream:
+        fields = {}
+
+        def on_field(key, value):
+            fields[key] = value
+            report({"fields": dict(fields)})
+
+        started = time.perf_counter()
+        try:
+            parsed_data, complete, response_text = stream_extraction(
+                source, api_key, prompt, on_field, router.first_model if router is not None else model_name
+            )
+        except Exception:
+            if router is None:
+                raise
+            parsed_data = None  # 빠른 모델의 오류는 상위 모델로 승격
+        if router is not None:
+            # 스트리밍 결과(끝부분이 깨졌으면 완성된 항목만)를 검사하고 필요하면 상위 모델로 재요청
+            parsed_data, decision = router.route(source, api_key, prompt,
+                                                 first_result=(parsed_data, time.perf_counter() - started))
+            report({"fields": parsed_data, "model": decision.model_name})
+            complete = True
+        elif not parsed_data:
+            raise BillParseError("AI 응답에서 항목을 찾을 수 없습니다.", response_text)
+    elif router is not None:
+        parsed_data, decision = router.route(source, api_key, prompt)
+        complete = True
+    else:
+        parsed_data, _ = extract_bill(source, api_key, prompt, model_name)
+        complete = True
+
+    if complete and cache is not None and cache_key is not None:
+        cache.put(cache_key, parsed_data, router.name if router is not None else model_name)
+    if complete and store is not None and bill_hash is not None:
+        store.record(bill_hash, name, parsed_data, decision.model_name if decision else model_name)
+    return {"parsed_data": parsed_data, "complete": complete,
+            "routing": decision.to_dict() if decision else None}
+
+
+def _batch_row(result):
+    row = {"파일": result.name, "상태": "✅ 완료" if result.success else "❌ 실패"}
+    row.update(result.parsed_data or {})
+    row["소요 시간(초)"] = round(result.elapsed, 2)
+    row["캐시"] = "⚡" if result.from_cache else ""
+    row["이력"] = "📚" if result.from_history else ""
+    if result.model_name:
+        row["모델"] = f"{result.model_name} ⬆️" if result.escalated else result.model_name
+    row["오류"] = result.error or ""
+    return row
+
+
+def run_batch_job(report, items, api_key, prompt=DEFAULT_PROMPT, model_name=GEMINI_MODEL_NAME,
+                  concurrency=DEFAULT_CONCURRENCY, cache=None, pdf_dpi=DEFAULT_PDF_DPI,
+                  pdf_grayscale=False, preprocess=None, pack=False, max_pack_items=DEFAULT_MAX_PACK_ITEMS,
+                  store=None, router=None):
+    """
+    여러 청구서 일괄 분석 작업 (완료된 행을 진행 상황으로 기록)
+    store가 있으면 이미 처리한 청구서는 처리 이력의 결과를 사용하고, 새 결과는 이력에 저장
+    router가 있으면 빠른 모델 먼저 요청하고 검사에 실패한 청구서만 상위 모델로 재요청
+
+    Returns:
+        {"rows": 결과 행 목록}
+    """
+    items = list(items)
+    if pack:
+        results = extract_bills_packed(items, api_key, prompt, model_name, concurrency, cache,
+                                       pdf_dpi, pdf_grayscale, preprocess, max_pack_items=max_pack_items,
+                                       store=store, router=router)
+    else:
+        results = extract_bills(items, api_key, prompt, model_name, concurrency, cache,
+                                pdf_dpi, pdf_grayscale, preprocess, store=store, router=router)
+
+    rows = []
+    report({"done": 0, "total": len(items), "rows": rows})
+    for result in results:
+        rows.append(_batch_row(result))
+        report({"done": len(rows), "total": len(items), "rows": rows})
+    return {"rows": rows}
+
+
+def run_document_job(report, template_path, parsed_data, output_dir):
+    """
+    공문 서식을 생성하여 output_dir에 보관하는 작업
+
+    Returns:
+        {"path": 저장된 파일 경로, "replacements": 치환된 내용}
+    """
+    result = build_water_bill_document(template_path, parsed_data)
+    if not result["success"]:
+        raise RuntimeError(result.get("error", "문서 생성 실패"))
+    path = save_generated_document(result["content"], output_dir)
+    cleanup_generated_documents(output_dir)
+    return {"path": path, "replacements": result["replacements"]}
@@ -0,0 +1,138 @@
+"""
+스트리밍 응답용 증분 JSON 파서
+
+Gemini 스트리밍 응답 조각을 순서대로 넣으면, 최상위 JSON 객체의 필드가
+완성되는 즉시 (키, 값)을 돌려줍니다. 응답 끝부분이 깨져도 이미 완성된 필드는 유지됩니다.
+"""
+import json
+
+_WHITESPACE = " \t\r\n"
+# 숫자 값이 끝났다고 확신할 수 있는 다음 글자
+_NUMBER_TERMINATORS = _WHITESPACE + ",}]"
+
+_SEEK_OBJECT = "seek_object"
+_KEY = "key"
+_COLON = "colon"
+_VALUE = "value"
+_DONE = "done"
+_ERROR = "error"
+
+
+class IncrementalJsonParser:
+    """
+    최상위 JSON 객체를 필드 단위로 증분 파싱
+    ```json 코드 블록이나 앞쪽 설명 문장은 첫 '{'가 나올 때까지 건너뜀
+    """
+
+    def __init__(self):
+        self.fields = {}
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._state = _SEEK_OBJECT
+        self._pending_key = None
+
+    @property
+    def complete(self):
+        """객체의 닫는 괄호까지 정상적으로 읽었으면 True"""
+        return self._state == _DONE
+
+    @property
+    def malformed(self):
+        """JSON 구조가 깨져 더 이상 파싱할 수 없으면 True"""
+        return self._state == _ERROR
+
+    def feed(self, chunk):
+        """
+        응답 조각을 추가하고 이번에 새로 완성된 (키, 값) 목록을 반환
+        """
+        self._buffer += chunk
+        return self._parse(final=False)
+
+    def finish(self):
+        """
+        스트림이 끝났을 때 호출. 버퍼 끝의 숫자처럼 보류 중이던 값을 확정하고 새로 완성된 (키, 값) 목록을 반환
+        """
+        return self._parse(final=True)
+
+    def _skip_whitespace(self):
+        buffer = self._buffer
+        while self._pos < len(buffer) and buffer[self._pos] in _WHITESPACE:
+            self._pos += 1
+
+    def _parse(self, final):
+        completed = []
+        buffer = self._buffer
+
+        while self._state not in (_DONE, _ERROR):
+            self._skip_whitespace()
+            if self._pos >= len(buffer):
+                break
+
+            if self._state == _SEEK_OBJECT:
+                start = buffer.find("{", self._pos)
+                if start == -1:
+                    self._pos = len(buffer)
+                    break
+                self._pos = start + 1
+                self._state = _KEY
+
+            elif self._state == _KEY:
+                char = buffer[self._pos]
+                if char == "}":
+                    self._pos += 1
+                    self._state = _DONE
+                elif char == ",":
+                    self._pos += 1
+                elif char != '"':
+                    self._state = _ERROR
+                else:
+                    try:
+                        key, end = self._decoder.raw_decode(buffer, self._pos)
+                    except json.JSONDecodeError:
+                        break  # 키 문자열이 아직 끝나지 않음
+                    self._pending_key = key
+                    self._pos = end
+                    self._state = _COLON
+
+            elif self._state == _COLON:
+                if buffer[self._pos] != ":":
+                    self._state = _ERROR
+                else:
+                    self._pos += 1
+                    self._state = _VALUE
+
+            elif self._state == _VALUE:
+                try:
+                    value, end = self._decoder.raw_decode(buffer, self._pos)
+                except json.JSONDecodeError:
+                    if final:
+                        self._state = _ERROR
+                    break  # 값이 아직 끝나지 않음
+
+                # 숫자는 뒤에 구분자가 올 때까지 보류 ("100" 뒤에 ".5"가 이어질 수 있음)
+                is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+                if is_number and not final and (
+                        end == len(buffer) or buffer[end] not in _NUMBER_TERMINATORS):
+                    break
+
+                self.fields[self._pending_key] = value
+                completed.append((self._pending_key, value))
+                self._pending_key = None
+                self._pos = end
+                self._state = _KEY
+
+        return completed
+
+
+def parse_partial_json(text):
+    """
+    전체 응답 텍스트를 한 번에 파싱 (끝부분이 깨져도 완성된 필드는 반환)
+
+    Returns:
+        (필드 딕셔너리, 정상적으로 끝까지 파싱되었는지 여부) 튜플
+    """
+    parser = IncrementalJsonParser()
+    parser.feed(text)
+    parser.finish()
+    return parser.fields, parser.complete
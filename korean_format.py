@@ -0,0 +1,147 @@
+"""
+한글 금액 표기와 사용기간 처리 (미리 만든 표와 캐시 사용)
+
+- number_to_korean: 자릿수 표와 만 단위 조각 캐시로 변환하며, 조 이상(경, 해, ...)도 지원
+- ServicePeriod: 사용기간을 한 번만 파싱하여 월, 다음 달 말일, 표시 형식을 제공
+  (YYYY.MM.DD, YYYY-MM-DD, YYYY/MM/DD, YYYY년 MM월 DD일, 종료일의 연도 생략 지원)
+"""
+import calendar
+import logging
+import re
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+_DIGITS = ("", "일", "이", "삼", "사", "오", "육", "칠", "팔", "구")
+_SMALL_UNITS = ("", "십", "백", "천")
+_LARGE_UNITS = ("", "만", "억", "조", "경", "해", "자", "양", "구", "간", "정", "재", "극")
+
+# 표현할 수 있는 최대 금액 (극 단위까지)
+MAX_KOREAN_NUMBER = 10 ** (4 * len(_LARGE_UNITS)) - 1
+
+# 시작일 (연도 필수)과 종료일 (연도 생략 가능): 2025.06.23 / 2025-06-23 / 2025/6/23 / 2025년 6월 23일
+_FULL_DATE_PATTERN = re.compile(r"(\d{4})\s*(?:[.\-/]|년)\s*(\d{1,2})\s*(?:[.\-/]|월)\s*(\d{1,2})\s*(?:일|\.)?")
+_MONTH_DAY_PATTERN = re.compile(r"(\d{1,2})\s*(?:[.\-/]|월)\s*(\d{1,2})\s*(?:일|\.)?")
+
+
+@lru_cache(maxsize=10000)
+def _chunk_to_korean(n):
+    """만 미만의 수를 한글로 변환 (1은 십, 백, 천 앞에서 생략)"""
+    parts = []
+    for position in range(3, -1, -1):
+        n, digit = divmod(n, 10)
+        if digit == 0:
+            continue
+        if digit == 1 and position < 3:
+            parts.append(_SMALL_UNITS[3 - position])
+        else:
+            parts.append(_DIGITS[digit] + _SMALL_UNITS[3 - position])
+    return "".join(reversed(parts))
+
+
+@lru_cache(maxsize=4096)
+def _number_to_korean(number):
+    if number == 0:
+        return "영"
+    if number < 0:
+        return "마이너스 " + _number_to_korean(-number)
+    if number > MAX_KOREAN_NUMBER:
+        raise ValueError(f"한글로 표기할 수 있는 범위를 넘었습니다: {number}")
+
+    parts = []
+    unit_index = 0
+    while number > 0:
+        number, chunk = divmod(number, 10000)
+        if chunk:
+            parts.append(_chunk_to_korean(chunk) + _LARGE_UNITS[unit_index])
+        unit_index += 1
+    return "".join(reversed(parts))
+
+
+def number_to_korean(number):
+    """
+    숫자를 한글로 변환
+    예: 6738 -> "육천칠백삼십팔", 10**16 -> "일경"
+
+    Raises:
+        ValueError: 정수가 아니거나 표기할 수 있는 범위를 넘은 경우
+    """
+    if number != int(number):
+        raise ValueError(f"정수만 한글로 변환할 수 있습니다: {number}")
+    return _number_to_korean(int(number))
+
+
+def _next_month_last_day(day):
+    year, month = (day.year + 1, 1) if day.month == 12 else (day.year, day.month + 1)
+    return date(year, month, calendar.monthrange(year, month)[1])
+
+
+@dataclass(frozen=True)
+class ServicePeriod:
+    """사용기간 (시작일, 종료일)"""
+    start: date
+    end: date
+
+    @classmethod
+    def parse(cls, text):
+        """
+        사용기간 문자열을 파싱 (해석할 수 없으면 None)
+        예: "2025.06.23 ~ 2025.07.22", "2025-06-23 - 2025-07-22", "2025년 6월 23일 ~ 7월 22일"
+        """
+        if not text:
+            return None
+        return _parse_period(str(text).strip())
+
+    @property
+    def month(self):
+        """시작일의 월"""
+        return self.start.month
+
+    def next_month_last_day(self):
+        """
+        다음 달 말일 ("YYYY. M. D." 형식)
+        예: 2025.07.14 ~ 2025.07.29 -> "2025. 8. 31."
+        """
+        day = _next_month_last_day(self.start)
+        return f"{day.year}. {day.month}. {day.day}."
+
+    def format(self):
+        """
+        표시 형식 (같은 해이면 연도는 처음에만 표시)
+        예: 2025.06.23 ~ 2025.07.22 -> "2025. 6. 23. ~ 7. 22."
+        """
+        start, end = self.start, self.end
+        if start.year == end.year:
+            return f"{start.year}. {start.month}. {start.day}. ~ {end.month}. {end.day}."
+        return f"{start.year}. {start.month}. {start.day}. ~ {end.year}. {end.month}. {end.day}."
+
+
+@lru_cache(maxsize=1024)
+def _parse_period(text):
+    start_match = _FULL_DATE_PATTERN.search(text)
+    if start_match is None:
+        logger.warning("사용기간을 해석할 수 없습니다: %r", text)
+        return None
+
+    rest = text[start_match.end():]
+    end_match = _FULL_DATE_PATTERN.search(rest)
+    try:
+        start = date(*(int(value) for value in start_match.groups()))
+        if end_match is not None:
+            end = date(*(int(value) for value in end_match.groups()))
+        else:
+            # 종료일의 연도가 생략된 경우 (예: 2025.12.23 ~ 01.22)
+            month_day = _MONTH_DAY_PATTERN.search(rest)
+            if month_day is None:
+                logger.warning("사용기간의 종료일을 찾을 수 없습니다: %r", text)
+                return None
+            month, day = (int(value) for value in month_day.groups())
+            end = date(start.year, month, day)
+            if end < start:
+                end = date(start.year + 1, month, day)
+    except ValueError as e:
+        logger.warning("사용기간의 날짜가 올바르지 않습니다: %r (%s)", text, e)
+        return None
+    return ServicePeriod(start, end)
@@ -0,0 +1,355 @@
+"""
+모델 라우팅 (빠르고 저렴한 모델 먼저, 검사를 통과하지 못하면 상위 모델로 재요청)
+
+인쇄 상태가 깨끗한 청구서는 Flash 모델로도 충분하므로 먼저 빠른 모델에 요청하고,
+결과가 일관성 검사(금액·사용량이 숫자인지, 1연구소 + 2연구소 ≤ 총 사용량인지, 사용기간을 해석할 수 있는지 등)를
+통과하지 못한 경우에만 Pro 모델로 다시 요청합니다.
+단계별 호출 수, 승격 비율과 사유, 지연 시간, 상대 비용을 router_stats에 기록하여
+벤치마크 결과로 검사 기준을 조정할 수 있게 합니다.
+"""
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from dataclasses import asdict, dataclass, field
+
+from bill_schema import to_number
+from extraction import DEFAULT_PROMPT, GEMINI_MODEL_NAME, extract_bill, prepare_bill_source
+from extraction_cache import make_cache_key
+from korean_format import ServicePeriod
+from request_scheduler import percentile
+from tracing import increment, span
+
+FAST_MODEL_NAME = "gemini-flash-latest"
+
+# 1연구소 + 2연구소 사용량이 총 사용량을 넘어도 허용하는 비율 (수기 메모 반올림 오차)
+DEFAULT_USAGE_TOLERANCE = 0.02
+# 납기 내 금액 / 사용량으로 계산한 단가(원/m³)의 정상 범위 (자릿수를 잘못 읽은 경우 검출)
+DEFAULT_UNIT_PRICE_RANGE = (100, 20000)
+
+DEFAULT_DECISION_HISTORY = 200
+
+# 검사 실패 사유
+ISSUE_MESSAGES = {
+    "error": "요청 또는 응답 해석 실패",
+    "amount": "납기 내 금액이 없거나 숫자가 아님",
+    "usage": "총 사용량이 없거나 숫자가 아님",
+    "labs_invalid": "연구소 사용량이 숫자가 아니거나 음수",
+    "labs_missing": "연구소 사용량(수기 메모)을 찾지 못함",
+    "labs_exceed": "1연구소 + 2연구소 사용량이 총 사용량보다 큼",
+    "unit_price": "단가(금액 / 사용량)가 정상 범위를 벗어남",
+    "period": "사용기간을 해석할 수 없음",
+}
+
+
+@dataclass(frozen=True)
+class ModelTier:
+    """
+    라우팅 단계 하나
+    relative_cost: 요청 한 건의 상대 비용 (가장 저렴한 모델 = 1, 요금표에 맞춰 조정)
+    """
+    model_name: str
+    relative_cost: float = 1.0
+
+
+DEFAULT_TIERS = (
+    ModelTier(FAST_MODEL_NAME, relative_cost=1.0),
+    ModelTier(GEMINI_MODEL_NAME, relative_cost=4.0),
+)
+
+
+def _number(value):
+    try:
+        return to_number(value)
+    except ValueError:
+        return None
+
+
+def check_consistency(parsed_data, usage_tolerance=DEFAULT_USAGE_TOLERANCE,
+                      unit_price_range=DEFAULT_UNIT_PRICE_RANGE, require_labs=True):
+    """
+    추출 결과의 일관성을 검사하여 실패 사유 코드(ISSUE_MESSAGES의 키) 목록을 반환 (통과하면 빈 목록)
+
+    Args:
+        parsed_data: 추출 결과 딕셔너리
+        usage_tolerance: 연구소 사용량 합계가 총 사용량을 넘어도 허용하는 비율
+        unit_price_range: 단가(원/m³)의 (최솟값, 최댓값), None이면 검사하지 않음
+        require_labs: True이면 연구소 사용량이 모두 비어 있을 때 실패로 처리
+    """
+    parsed_data = parsed_data or {}
+    issues = []
+
+    amount = _number(parsed_data.get("due_date_amount"))
+    if amount is None or amount <= 0:
+        issues.append("amount")
+    usage = _number(parsed_data.get("water_usage_m3"))
+    if usage is None or usage <= 0:
+        issues.append("usage")
+
+    raw_labs = [parsed_data.get("lab1_tons"), parsed_data.get("lab2_tons")]
+    labs = [_number(value) for value in raw_labs]
+    if any(raw is not None and (lab is None or lab < 0) for raw, lab in zip(raw_labs, labs)):
+        issues.append("labs_invalid")
+    elif all(lab is None for lab in labs):
+        if require_labs:
+            issues.append("labs_missing")
+    elif "usage" not in issues and sum(lab or 0 for lab in labs) > usage * (1 + usage_tolerance):
+        issues.append("labs_exceed")
+
+    if unit_price_range and "amount" not in issues and "usage" not in issues:
+        low, high = unit_price_range
+        if not low <= amount / usage <= high:
+            issues.append("unit_price")
+
+    if ServicePeriod.parse(parsed_data.get("service_period")) is None:
+        issues.append("period")
+    return issues
+
+
+@dataclass
+class TierAttempt:
+    """단계 하나의 요청 결과"""
+    model_name: str
+    elapsed: float
+    cost: float
+    issues: tuple = ()
+    error: str = None
+
+    @property
+    def passed(self):
+        return not self.issues
+
+
+@dataclass
+class RoutingDecision:
+    """
+    청구서 한 건의 라우팅 결과
+    model_name: 최종 결과를 낸 모델 (모든 단계가 실패했으면 None)
+    """
+    model_name: str = None
+    attempts: list = field(default_factory=list)
+
+    @property
+    def escalated(self):
+        return len(self.attempts) > 1
+
+    @property
+    def elapsed(self):
+        return sum(attempt.elapsed for attempt in self.attempts)
+
+    @property
+    def cost(self):
+        return sum(attempt.cost for attempt in self.attempts)
+
+    def to_dict(self):
+        return {
+            "model_name": self.model_name,
+            "escalated": self.escalated,
+            "elapsed": round(self.elapsed, 3),
+            "cost": self.cost,
+            "attempts": [asdict(attempt) for attempt in self.attempts],
+        }
+
+
+class RouterStats:
+    """
+    단계(모델)별 호출 수, 통과/승격/오류 수, 지연 시간, 상대 비용과 승격 사유 기록
+    """
+
+    def __init__(self, history=DEFAULT_DECISION_HISTORY):
+        self._lock = threading.Lock()
+        self._history = history
+        self.reset()
+
+    def reset(self):
+        """
+        모든 기록을 지움
+        """
+        with self._lock:
+            self._tiers = defaultdict(lambda: {
+                "calls": 0, "passed": 0, "escalated": 0, "errors": 0, "cost": 0.0,
+                "latencies": deque(maxlen=500),
+            })
+            self._issues = Counter()
+            self._bills = 0
+            self._escalated_bills = 0
+            self._failed_bills = 0
+            self._recent = deque(maxlen=self._history)
+
+    def record(self, decision):
+        with self._lock:
+            self._bills += 1
+            self._escalated_bills += decision.escalated
+            self._failed_bills += decision.model_name is None
+            last = len(decision.attempts) - 1
+            for index, attempt in enumerate(decision.attempts):
+                tier = self._tiers[attempt.model_name]
+                tier["calls"] += 1
+                tier["cost"] += attempt.cost
+                tier["latencies"].append(attempt.elapsed)
+                if attempt.error:
+                    tier["errors"] += 1
+                if attempt.passed:
+                    tier["passed"] += 1
+                elif index < last:
+                    tier["escalated"] += 1
+                self._issues.update(attempt.issues)
+            self._recent.append(decision)
+
+    def summary(self):
+        """
+        {"bills", "escalation_rate", "failed", "total_cost", "issues", "tiers": {모델명: {...}}} 형식의 요약
+        """
+        with self._lock:
+            tiers = {name: dict(tier, latencies=sorted(tier["latencies"])) for name, tier in self._tiers.items()}
+            issues = dict(self._issues.most_common())
+            bills, escalated, failed = self._bills, self._escalated_bills, self._failed_bills
+
+        def ms(value):
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "bills": bills,
+            "escalation_rate": escalated / bills if bills else 0.0,
+            "failed": failed,
+            "total_cost": sum(tier["cost"] for tier in tiers.values()),
+            "issues": issues,
+            "tiers": {
+                name: {
+                    "calls": tier["calls"],
+                    "passed": tier["passed"],
+                    "escalated": tier["escalated"],
+                    "errors": tier["errors"],
+                    "pass_rate": tier["passed"] / tier["calls"] if tier["calls"] else 0.0,
+                    "cost": tier["cost"],
+                    "avg_ms": ms(sum(tier["latencies"]) / len(tier["latencies"])) if tier["latencies"] else None,
+                    "p50_ms": ms(percentile(tier["latencies"], 0.50)),
+                    "p95_ms": ms(percentile(tier["latencies"], 0.95)),
+                }
+                for name, tier in tiers.items()
+            },
+        }
+
+    def recent(self, limit=None):
+        """
+        최근 라우팅 결과 (최신 순)
+        """
+        with self._lock:
+            decisions = list(self._recent)
+        decisions.reverse()
+        return decisions[:limit] if limit is not None else decisions
+
+
+router_stats = RouterStats()
+
+
+class ModelRouter:
+    """
+    tiers 순서대로 요청하며, 결과가 일관성 검사를 통과하면 그 결과를 사용하고
+    실패하거나 오류가 나면 다음 단계로 승격 (마지막 단계의 결과는 검사와 관계없이 사용)
+    """
+
+    def __init__(self, tiers=DEFAULT_TIERS, usage_tolerance=DEFAULT_USAGE_TOLERANCE,
+                 unit_price_range=DEFAULT_UNIT_PRICE_RANGE, require_labs=True, stats=router_stats):
+        if not tiers:
+            raise ValueError("라우팅 단계가 없습니다.")
+        self.tiers = tuple(tiers)
+        self.usage_tolerance = usage_tolerance
+        self.unit_price_range = unit_price_range
+        self.require_labs = require_labs
+        self.stats = stats
+
+    @property
+    def name(self):
+        """캐시 키와 이력에 쓰는 라우팅 이름 (예: "gemini-flash-latest>gemini-pro-latest")"""
+        return ">".join(tier.model_name for tier in self.tiers)
+
+    @property
+    def first_model(self):
+        return self.tiers[0].model_name
+
+    def check(self, parsed_data):
+        """
+        일관성 검사 실패 사유 목록 (통과하면 빈 목록)
+        """
+        return check_consistency(parsed_data, self.usage_tolerance, self.unit_price_range, self.require_labs)
+
+    def route(self, source, api_key, prompt=DEFAULT_PROMPT, first_result=None, known=None):
+        """
+        준비된 입력(prepare_bill_source의 결과)을 단계별로 요청
+
+        Args:
+            first_result: 첫 단계 결과를 이미 받은 경우 (parsed_data, 소요 시간) 튜플
+                (묶음 요청이나 스트리밍으로 얻은 결과를 검사만 하고 필요하면 승격, 요청이 실패했으면 parsed_data는 None)
+            known: 다른 추출기(PDF 텍스트 레이어 등)가 이미 채운 항목 {항목명: 값}
+                (응답과 합쳐서 검사, 반환하는 parsed_data에는 포함하지 않음)
+
+        Returns:
+            (parsed_data, RoutingDecision) 튜플
+
+        Raises:
+            마지막 단계의 요청 오류
+        """
+        decision = RoutingDecision()
+        for index, tier in enumerate(self.tiers):
+            is_last = index == len(self.tiers) - 1
+            parsed_data, error = None, None
+            with span("router.tier", model=tier.model_name) as attrs:
+                started = time.perf_counter()
+                if index == 0 and first_result is not None:
+                    parsed_data, elapsed = first_result
+                    if parsed_data is None:
+                        error = "첫 단계 요청 실패"
+                else:
+                    try:
+                        parsed_data, _ = extract_bill(source, api_key, prompt, tier.model_name)
+                    except Exception as e:
+                        if is_last:
+                            decision.attempts.append(TierAttempt(
+                                tier.model_name, time.perf_counter() - started, tier.relative_cost,
+                                ("error",), f"{type(e).__name__}: {e}"
+                            ))
+                            self.stats.record(decision)
+                            raise
+                        error = f"{type(e).__name__}: {e}"
+                    elapsed = time.perf_counter() - started
+                issues = ("error",) if error else tuple(self.check({**(parsed_data or {}), **(known or {})}))
+                attrs["issues"] = ",".join(issues)
+
+            decision.attempts.append(TierAttempt(tier.model_name, elapsed, tier.relative_cost, issues, error))
+            if not issues or is_last:
+                decision.model_name = tier.model_name
+                self.stats.record(decision)
+                return parsed_data, decision
+            increment("router.escalations")
+
+    def extract(self, image, api_key, prompt=DEFAULT_PROMPT, cache=None, preprocess=None, known=None):
+        """
+        extraction.extract_bill과 같은 방식으로 청구서 정보를 추출하되 단계별로 라우팅
+        캐시는 라우팅 이름(name) 기준으로 최종 결과만 저장 (known은 route와 같음)
+
+        Returns:
+            (parsed_data, from_cache, RoutingDecision 또는 None(캐시 적중)) 튜플
+        """
+        source, _ = prepare_bill_source(image, preprocess)
+
+        cache_key = None
+        if cache is not None:
+            cache_key = make_cache_key(source, prompt, self.name)
+            cached_data = cache.get(cache_key)
+            if cached_data is not None:
+                return cached_data, True, None
+
+        parsed_data, decision = self.route(source, api_key, prompt, known=known)
+        if cache is not None:
+            cache.put(cache_key, parsed_data, self.name)
+        return parsed_data, False, decision
+
+
+def default_router(model_name=GEMINI_MODEL_NAME, fast_model_name=FAST_MODEL_NAME, **options):
+    """
+    빠른 모델 → model_name 순서의 기본 라우터 (두 모델이 같으면 한 단계만 사용)
+    """
+    tiers = [ModelTier(fast_model_name, relative_cost=1.0)]
+    if model_name != fast_model_name:
+        tiers.append(ModelTier(model_name, relative_cost=DEFAULT_TIERS[-1].relative_cost))
+    return ModelRouter(tiers, **options)
@@ -1,66 +1,23 @@
 """
 ODT 파일 처리 및 한글 숫자 변환 유틸리티
 """
-from odf import text, teletype
-from odf.opendocument import load
 import zipfile
-import tempfile
 import os
+import io
+import glob
+import logging
+import re
+import time
+from bisect import bisect_right
 from datetime import datetime
-from dateutil.relativedelta import relativedelta
-import calendar
+from functools import lru_cache
+from xml.sax.saxutils import escape
 
+from fee_allocation import DEFAULT_ROUNDING, allocate_bill
+from korean_format import ServicePeriod, number_to_korean
+from tracing import traced
 
-def number_to_korean(number):
-    """
-    숫자를 한글로 변환하는 함수
-    예: 6738 -> "육천칠백삼십팔"
-    """
-    if number == 0:
-        return "영"
-    
-    # 한글 숫자
-    units = ["", "일", "이", "삼", "사", "오", "육", "칠", "팔", "구"]
-    tens = ["", "십", "백", "천"]
-    thousands = ["", "만", "억", "조"]
-    
-    def convert_under_10000(n):
-        """만 단위 미만 숫자를 한글로 변환"""
-        if n == 0:
-            return ""
-        
-        result = []
-        for i, digit in enumerate(str(n).zfill(4)):
-            digit = int(digit)
-            pos = 3 - i
-            
-            if digit == 0:
-                continue
-            
-            # 1은 십, 백, 천 앞에서 생략
-            if digit == 1 and pos > 0:
-                result.append(tens[pos])
-            else:
-                result.append(units[digit] + tens[pos])
-        
-        return "".join(result)
-    
-    # 음수 처리
-    if number < 0:
-        return "마이너스 " + number_to_korean(abs(number))
-    
-    # 만 단위로 분리
-    parts = []
-    thousand_index = 0
-    
-    while number > 0:
-        part = number % 10000
-        if part > 0:
-            parts.append(convert_under_10000(part) + thousands[thousand_index])
-        number //= 10000
-        thousand_index += 1
-    
-    return "".join(reversed(parts))
+logger = logging.getLogger(__name__)
 
 
 def format_number_with_comma(number):
@@ -76,25 +33,11 @@ def parse_service_period(period_str):
     사용기간 문자열을 파싱하여 시작일과 종료일을 반환
     예: "2025.06.23 ~ 2025.07.22" -> (datetime, datetime)
     """
-    try:
-        # 다양한 형식 지원
-        period_str = period_str.replace(" ", "").strip()
-        
-        if "~" in period_str:
-            start_str, end_str = period_str.split("~")
-        elif "-" in period_str:
-            start_str, end_str = period_str.split("-")
-        else:
-            raise ValueError("Invalid period format")
-        
-        # 날짜 파싱 (YYYY.MM.DD 형식)
-        start_date = datetime.strptime(start_str.strip(), "%Y.%m.%d")
-        end_date = datetime.strptime(end_str.strip(), "%Y.%m.%d")
-        
-        return start_date, end_date
-    except Exception as e:
-        print(f"Error parsing service period: {e}")
+    period = ServicePeriod.parse(period_str)
+    if period is None:
         return None, None
+    return (datetime.combine(period.start, datetime.min.time()),
+            datetime.combine(period.end, datetime.min.time()))
 
 
 def get_month_from_period(period_str):
@@ -102,10 +45,8 @@ def get_month_from_period(period_str):
     사용기간에서 월 숫자를 추출
     예: "2025.07.14 ~ 2025.07.29" -> 7
     """
-    start_date, _ = parse_service_period(period_str)
-    if start_date:
-        return start_date.month
-    return None
+    period = ServicePeriod.parse(period_str)
+    return period.month if period else None
 
 
 def get_next_month_last_day(period_str):
@@ -113,18 +54,8 @@ def get_next_month_last_day(period_str):
     사용기간 다음 달의 말일을 반환
     예: "2025.07.14 ~ 2025.07.29" -> "2025. 8. 31."
     """
-    start_date, _ = parse_service_period(period_str)
-    if not start_date:
-        return None
-    
-    # 다음 달 첫째 날
-    next_month = start_date + relativedelta(months=1)
-    
-    # 다음 달의 마지막 날
-    last_day = calendar.monthrange(next_month.year, next_month.month)[1]
-    
-    # 형식: "YYYY. M. D."
-    return f"{next_month.year}. {next_month.month}. {last_day}."
+    period = ServicePeriod.parse(period_str)
+    return period.next_month_last_day() if period else None
 
 
 def format_service_period(period_str):
@@ -133,18 +64,8 @@ def format_service_period(period_str):
     년도는 처음에만 표시
     예: "2025.06.23~2025.07.22" -> "2025. 6. 23. ~ 7. 22."
     """
-    start_date, end_date = parse_service_period(period_str)
-    if not start_date or not end_date:
-        return period_str
-    
-    # 같은 해인 경우 년도는 처음에만 표시
-    if start_date.year == end_date.year:
-        formatted = f"{start_date.year}. {start_date.month}. {start_date.day}. ~ {end_date.month}. {end_date.day}."
-    else:
-        # 다른 해인 경우 둘 다 표시
-        formatted = f"{start_date.year}. {start_date.month}. {start_date.day}. ~ {end_date.year}. {end_date.month}. {end_date.day}."
-    
-    return formatted
+    period = ServicePeriod.parse(period_str)
+    return period.format() if period else period_str
 
 
 def replace_text_in_odt(template_path, output_path, replacements):
@@ -153,13 +74,10 @@ def replace_text_in_odt(template_path, output_path, replacements):
     
     Args:
         template_path: 템플릿 ODT 파일 경로
-        output_path: 출력 ODT 파일 경로
+        output_path: 출력 ODT 파일 경로 또는 쓰기 가능한 파일 객체 (예: BytesIO)
         replacements: 치환할 텍스트 딕셔너리 {찾을_텍스트: 바꿀_텍스트}
     """
     try:
-        # 임시 디렉토리 생성
-        import shutil
-        
         # ODT 파일은 ZIP 파일이므로 직접 수정
         with zipfile.ZipFile(template_path, 'r') as zip_ref:
             # content.xml 읽기
@@ -182,78 +100,363 @@ def replace_text_in_odt(template_path, output_path, replacements):
         
         return True
         
-    except Exception as e:
-        print(f"Error processing ODT file: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("ODT 파일 처리 중 오류가 발생했습니다: %s", template_path)
         return False
 
 
-def generate_water_bill_document(template_path, output_path, extracted_data):
+# XML 태그와 텍스트 안의 [치환항목] 패턴
+_TAG_PATTERN = re.compile(r"<[^>]*>")
+_PLACEHOLDER_PATTERN = re.compile(r"\[[^\[\]<>]{1,40}\]")
+
+# 이미 압축된 형식은 다시 압축하지 않고 저장
+_STORED_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif")
+
+# 병합 문서용: 본문 영역, 문서에 한 번만 올 수 있는 선언, 문서 안에서 유일해야 하는 이름
+_BODY_PATTERN = re.compile(r"(<office:text\b[^>]*>)(.*)(</office:text>)", re.DOTALL)
+_BODY_SINGLETON_PATTERN = re.compile(
+    r"<text:(?:sequence|variable|user-field)-decls\b.*?</text:(?:sequence|variable|user-field)-decls>"
+    r"|<text:(?:sequence|variable|user-field)-decls/>"
+    r"|<office:forms\b[^>]*/>|<office:forms\b.*?</office:forms>",
+    re.DOTALL
+)
+_UNIQUE_NAME_PATTERN = re.compile(r'\b((?:table|draw):name)="([^"]*)"')
+_PAGE_BREAK_STYLE_NAME = "BulkPageBreak"
+_PAGE_BREAK_STYLE = (
+    f'<style:style style:name="{_PAGE_BREAK_STYLE_NAME}" style:family="paragraph">'
+    '<style:paragraph-properties fo:break-before="page"/></style:style>'
+)
+
+
+class OdtTemplate:
+    """
+    한 번 로드하여 여러 번 렌더링할 수 있는 ODT 템플릿
+
+    - content.xml에서 [치환항목] 위치를 로드 시점에 한 번만 찾음
+      (서식 적용으로 <text:span> 여러 개에 나뉜 항목도 인식)
+    - 렌더링은 미리 나눠 둔 조각을 한 번에 join
+    - content.xml 이외의 파일은 미리 만들어 둔 ZIP에 한 번만 기록하고 재사용
+      (mimetype은 맨 앞, 무압축으로 저장)
+    """
+
+    def __init__(self, template_path):
+        self.template_path = template_path
+
+        with zipfile.ZipFile(template_path, 'r') as zip_ref:
+            content_info = zip_ref.getinfo('content.xml')
+            content_xml = zip_ref.read('content.xml').decode('utf-8')
+            self._segments, self.placeholders = self._compile(content_xml)
+            self._content_date_time = content_info.date_time
+            self._static_zip = self._build_static_zip(zip_ref)
+
+    @staticmethod
+    def _compile(content_xml):
+        """
+        content.xml을 고정 문자열과 치환 슬롯 (항목명, 원본 XML, 항목 뒤에 남길 태그) 목록으로 분해
+        """
+        # 태그를 제외한 텍스트 조각과, 각 조각의 (텍스트 내 시작 위치, XML 내 시작 위치)
+        text_parts = []
+        text_starts = []
+        xml_starts = []
+        text_length = 0
+        cursor = 0
+        for match in _TAG_PATTERN.finditer(content_xml):
+            if match.start() > cursor:
+                text_parts.append(content_xml[cursor:match.start()])
+                text_starts.append(text_length)
+                xml_starts.append(cursor)
+                text_length += match.start() - cursor
+            cursor = match.end()
+        if cursor < len(content_xml):
+            text_parts.append(content_xml[cursor:])
+            text_starts.append(text_length)
+            xml_starts.append(cursor)
+        plain_text = "".join(text_parts)
+
+        def to_xml_offset(text_offset):
+            index = bisect_right(text_starts, text_offset) - 1
+            return xml_starts[index] + text_offset - text_starts[index]
+
+        segments = []
+        placeholders = set()
+        cursor = 0
+        for match in _PLACEHOLDER_PATTERN.finditer(plain_text):
+            start = to_xml_offset(match.start())
+            end = to_xml_offset(match.end() - 1) + 1
+            original = content_xml[start:end]
+            # 항목 사이에 끼어 있는 태그는 그대로 유지하여 XML 구조를 보존
+            trailing_tags = "".join(_TAG_PATTERN.findall(original))
+
+            segments.append(content_xml[cursor:start])
+            segments.append((match.group(), original, trailing_tags))
+            placeholders.add(match.group())
+            cursor = end
+        segments.append(content_xml[cursor:])
+
+        return segments, frozenset(placeholders)
+
+    def _content_info(self):
+        # writestr/open이 CRC·크기·오프셋을 ZipInfo에 기록하므로 동시 렌더링끼리 공유하지 않도록 매번 새로 만듦
+        info = zipfile.ZipInfo('content.xml', self._content_date_time)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        return info
+
+    @staticmethod
+    def _build_static_zip(zip_ref):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as zip_out:
+            names = zip_ref.namelist()
+            if 'mimetype' in names:
+                info = zipfile.ZipInfo('mimetype', zip_ref.getinfo('mimetype').date_time)
+                info.compress_type = zipfile.ZIP_STORED
+                zip_out.writestr(info, zip_ref.read('mimetype'))
+
+            for name in names:
+                if name in ('mimetype', 'content.xml'):
+                    continue
+                info = zipfile.ZipInfo(name, zip_ref.getinfo(name).date_time)
+                if name.lower().endswith(_STORED_EXTENSIONS):
+                    info.compress_type = zipfile.ZIP_STORED
+                else:
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                zip_out.writestr(info, zip_ref.read(name))
+        return buffer.getvalue()
+
+    def render_content(self, replacements):
+        """
+        치환이 적용된 content.xml 문자열을 반환
+        """
+        parts = []
+        for segment in self._segments:
+            if isinstance(segment, str):
+                parts.append(segment)
+                continue
+
+            key, original, trailing_tags = segment
+            if key in replacements:
+                parts.append(escape(str(replacements[key])))
+                parts.append(trailing_tags)
+            else:
+                parts.append(original)
+        return "".join(parts)
+
+    @traced("odt.render")
+    def render(self, output, replacements):
+        """
+        치환이 적용된 ODT 파일을 output(파일 경로 또는 파일 객체)에 기록
+        """
+        buffer = io.BytesIO(self._static_zip)
+        buffer.seek(0, io.SEEK_END)
+        with zipfile.ZipFile(buffer, 'a') as zip_out:
+            zip_out.writestr(self._content_info(), self.render_content(replacements).encode('utf-8'))
+
+        if isinstance(output, (str, os.PathLike)):
+            with open(output, 'wb') as f:
+                f.write(buffer.getvalue())
+        else:
+            output.write(buffer.getvalue())
+
+    def render_bytes(self, replacements):
+        """
+        치환이 적용된 ODT 파일을 바이트로 반환
+        """
+        buffer = io.BytesIO()
+        self.render(buffer, replacements)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _with_page_break_style(head):
+        if "</office:automatic-styles>" in head:
+            return head.replace("</office:automatic-styles>", _PAGE_BREAK_STYLE + "</office:automatic-styles>", 1)
+        if "<office:automatic-styles/>" in head:
+            return head.replace("<office:automatic-styles/>",
+                                f"<office:automatic-styles>{_PAGE_BREAK_STYLE}</office:automatic-styles>", 1)
+        return head.replace("<office:body>",
+                            f"<office:automatic-styles>{_PAGE_BREAK_STYLE}</office:automatic-styles><office:body>", 1)
+
+    @traced("odt.render_merged")
+    def render_merged(self, output, replacements_iter):
+        """
+        여러 치환 내용을 페이지를 나눈 섹션으로 이어 붙인 하나의 ODT를 output(파일 경로 또는 파일 객체)에 기록
+        content.xml은 섹션 단위로 스트리밍하여 기록하므로 문서 수와 관계없이 메모리 사용량이 일정함
+
+        Returns:
+            기록한 섹션 수
+        """
+        count = 0
+        with zipfile.ZipFile(output, 'w') as zip_out:
+            with zipfile.ZipFile(io.BytesIO(self._static_zip)) as static_zip:
+                for info in static_zip.infolist():
+                    zip_out.writestr(info, static_zip.read(info.filename))
+
+            with zip_out.open(self._content_info(), 'w', force_zip64=True) as content:
+                tail = None
+                for replacements in replacements_iter:
+                    rendered = self.render_content(replacements)
+                    match = _BODY_PATTERN.search(rendered)
+                    if match is None:
+                        raise ValueError("content.xml에서 본문(office:text)을 찾을 수 없습니다.")
+
+                    body = match.group(2)
+                    if count == 0:
+                        head = self._with_page_break_style(rendered[:match.end(1)])
+                        content.write(head.encode('utf-8'))
+                        content.write("".join(_BODY_SINGLETON_PATTERN.findall(body)).encode('utf-8'))
+                        tail = rendered[match.start(3):]
+                    else:
+                        content.write(f'<text:p text:style-name="{_PAGE_BREAK_STYLE_NAME}"/>'.encode('utf-8'))
+
+                    count += 1
+                    body = _BODY_SINGLETON_PATTERN.sub("", body)
+                    if count > 1:
+                        # 표, 그림 등의 이름이 문서 안에서 겹치지 않도록 섹션 번호를 붙임
+                        body = _UNIQUE_NAME_PATTERN.sub(lambda m: f'{m.group(1)}="{m.group(2)}_{count}"', body)
+                    content.write(f'<text:section text:name="청구서{count}">{body}</text:section>'.encode('utf-8'))
+
+                if tail is None:
+                    # 기록할 내용이 없으면 템플릿 그대로 저장
+                    content.write(self.render_content({}).encode('utf-8'))
+                else:
+                    content.write(tail.encode('utf-8'))
+        return count
+
+
+@lru_cache(maxsize=8)
+def _load_template(template_path, mtime_ns, size):
+    return OdtTemplate(template_path)
+
+
+def get_odt_template(template_path):
+    """
+    컴파일된 템플릿을 반환 (파일이 바뀌면 다시 로드)
+    """
+    stat = os.stat(template_path)
+    return _load_template(os.path.abspath(template_path), stat.st_mtime_ns, stat.st_size)
+
+
+def build_water_bill_replacements(extracted_data, rounding=DEFAULT_ROUNDING):
+    """
+    추출된 데이터로 공문 템플릿의 [치환항목] 값을 계산
+
+    Args:
+        extracted_data: AI가 추출한 데이터 딕셔너리
+        rounding: 부과액 반올림 정책 (fee_allocation.RoundingPolicy)
+    """
+    # 데이터 추출
+    total_amount = float(extracted_data.get("due_date_amount") or 0)
+    total_usage = float(extracted_data.get("water_usage_m3") or 0)
+    lab1_usage = float(extracted_data.get("lab1_tons") or 0)
+    lab2_usage = float(extracted_data.get("lab2_tons") or 0)
+    service_period = extracted_data.get("service_period") or ""
+    lab_total_usage = lab1_usage + lab2_usage
+
+    # 계산 (정확한 유리수 연산 후 반올림 정책 적용, 기본값: 10원 단위 절사)
+    if total_usage > 0:
+        allocation = allocate_bill(extracted_data, rounding)
+        base_price = allocation.unit_price_decimal()
+        charged_amount_truncated = allocation.total
+    else:
+        base_price = 0
+        charged_amount_truncated = 0
+
+    # 사용기간 관련 정보 (한 번만 파싱)
+    period = ServicePeriod.parse(service_period)
+    service_month = period.month if period else None
+    next_month_last_day = period.next_month_last_day() if period else None
+    formatted_period = period.format() if period else service_period
+
+    # 한글 금액 ("원" 제외)
+    amount_korean = number_to_korean(charged_amount_truncated)
+
+    return {
+        "[총요금]": format_number_with_comma(total_amount),
+        "[총사용량]": format_number_with_comma(total_usage),
+        "[사용기간]": formatted_period,
+        "[기준금액]": format_number_with_comma(base_price),
+        "[1연구소사용량]": format_number_with_comma(lab1_usage),
+        "[2연구소사용량]": format_number_with_comma(lab2_usage),
+        "[연구소사용량]": format_number_with_comma(lab_total_usage),
+        "[부과액]": format_number_with_comma(charged_amount_truncated),
+        "[사용기간월]": str(service_month) if service_month else "",
+        "[사용기간월다음달말일]": next_month_last_day if next_month_last_day else "",
+        "[부과액한글]": amount_korean,
+    }
+
+
+def generate_water_bill_document(template_path, output_path, extracted_data, rounding=DEFAULT_ROUNDING):
     """
     추출된 데이터를 사용하여 수도요금 문서 생성
     
     Args:
         template_path: 템플릿 ODT 파일 경로
-        output_path: 출력 ODT 파일 경로
+        output_path: 출력 ODT 파일 경로 또는 쓰기 가능한 파일 객체 (예: BytesIO)
         extracted_data: AI가 추출한 데이터 딕셔너리
+        rounding: 부과액 반올림 정책 (fee_allocation.RoundingPolicy)
     """
     try:
-        # 데이터 추출
-        total_amount = float(extracted_data.get("due_date_amount", 0))
-        total_usage = float(extracted_data.get("water_usage_m3", 0))
-        lab1_usage = float(extracted_data.get("lab1_tons", 0))
-        lab2_usage = float(extracted_data.get("lab2_tons", 0))
-        service_period = extracted_data.get("service_period", "")
-        
-        # 계산
-        base_price = total_amount / total_usage if total_usage > 0 else 0
-        lab_total_usage = lab1_usage + lab2_usage
-        charged_amount = base_price * lab_total_usage
-        
-        # 10원 단위로 절삭
-        charged_amount_truncated = (int(charged_amount) // 10) * 10
-        
-        # 사용기간 관련 정보
-        service_month = get_month_from_period(service_period)
-        next_month_last_day = get_next_month_last_day(service_period)
-        formatted_period = format_service_period(service_period)
-        
-        # 한글 금액 ("원" 제외)
-        amount_korean = number_to_korean(charged_amount_truncated)
-        
         # 치환할 내용 준비
-        replacements = {
-            "[총요금]": format_number_with_comma(total_amount),
-            "[총사용량]": format_number_with_comma(total_usage),
-            "[사용기간]": formatted_period,
-            "[기준금액]": format_number_with_comma(round(base_price, 2)),
-            "[1연구소사용량]": format_number_with_comma(lab1_usage),
-            "[2연구소사용량]": format_number_with_comma(lab2_usage),
-            "[연구소사용량]": format_number_with_comma(lab_total_usage),
-            "[부과액]": format_number_with_comma(charged_amount_truncated),
-            "[사용기간월]": str(service_month) if service_month else "",
-            "[사용기간월다음달말일]": next_month_last_day if next_month_last_day else "",
-            "[부과액한글]": amount_korean,
-        }
+        replacements = build_water_bill_replacements(extracted_data, rounding)
         
-        # ODT 파일 생성
-        success = replace_text_in_odt(template_path, output_path, replacements)
+        # ODT 파일 생성 (컴파일된 템플릿 재사용)
+        get_odt_template(template_path).render(output_path, replacements)
         
-        if success:
-            return {
-                "success": True,
-                "replacements": replacements,
-                "output_path": output_path
-            }
-        else:
-            return {
-                "success": False,
-                "error": "ODT 파일 처리 중 오류 발생"
-            }
+        return {
+            "success": True,
+            "replacements": replacements,
+            "output_path": output_path
+        }
     
     except Exception as e:
         return {
             "success": False,
             "error": str(e)
         }
+
+
+
+def build_water_bill_document(template_path, extracted_data, rounding=DEFAULT_ROUNDING):
+    """
+    수도요금 문서를 디스크에 쓰지 않고 메모리에서 생성
+
+    Returns:
+        generate_water_bill_document와 같은 결과 딕셔너리
+        성공 시 "content"에 ODT 파일 바이트가 담김
+    """
+    buffer = io.BytesIO()
+    result = generate_water_bill_document(template_path, buffer, extracted_data, rounding)
+    if result["success"]:
+        result["output_path"] = None
+        result["content"] = buffer.getvalue()
+    return result
+
+
+def save_generated_document(content, output_dir, prefix="수도요금부과"):
+    """
+    생성된 문서 바이트를 타임스탬프가 붙은 파일로 저장하고 경로를 반환
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_path = os.path.join(output_dir, f"{prefix}_{timestamp}.odt")
+    with open(output_path, "wb") as f:
+        f.write(content)
+    return output_path
+
+
+def cleanup_generated_documents(output_dir, prefix="수도요금부과", max_files=50, max_age_days=30):
+    """
+    오래된 생성 문서를 정리
+    max_age_days일이 지난 파일과, 최신 max_files개를 넘는 파일을 삭제
+
+    Returns:
+        삭제된 파일 경로 목록
+    """
+    paths = glob.glob(os.path.join(output_dir, f"{prefix}_*.odt"))
+    paths.sort(key=os.path.getmtime, reverse=True)
+
+    cutoff = time.time() - max_age_days * 24 * 60 * 60
+    removed = []
+    for index, path in enumerate(paths):
+        if index >= max_files or os.path.getmtime(path) < cutoff:
+            os.remove(path)
+            removed.append(path)
+    return removed
@@ -1,42 +1,404 @@
 import streamlit as st
-import google.generativeai as genai
-from PIL import Image
 import os
-from pdf2image import convert_from_bytes
 import json
 from datetime import datetime
-import glob
+import hashlib
+import io
+import threading
+import time
+import uuid
 
 # Import ODT utilities
-from odt_utils import (
-    generate_water_bill_document,
-    format_number_with_comma,
-    number_to_korean
-)
+from odt_utils import build_water_bill_document
+from extraction_cache import ExtractionCache, make_cache_key
+from extraction import DEFAULT_PROMPT, GEMINI_MODEL_NAME
+from extractors import extractor_stats
+from model_router import FAST_MODEL_NAME, ISSUE_MESSAGES, default_router, router_stats
+from batch import DEFAULT_CONCURRENCY, DEFAULT_MAX_PACK_ITEMS, BatchItem
+from job_queue import DONE, JobQueue
+from jobs import run_batch_job, run_document_job, run_extraction_job
+from pipeline import calculate_lab_fees, find_template
+from bulk_documents import write_documents_zip, write_merged_document
+from bill_store import BillStore, content_hash
+from bill_schema import BILL_FIELDS
+from pdf_utils import DEFAULT_PDF_DPI, extract_pdf_text, get_pdf_page_count, render_pdf_page
+from image_utils import DEFAULT_MAX_LONG_EDGE, PreprocessOptions, preprocess_image
+from gemini_client import get_model, get_scheduler, latency_stats
+from tracing import configure_json_logging, tracer
+
+# 서버에 보관하는 생성 문서 위치 (템플릿 폴더와 분리)
+OUTPUT_DIR = "출력"
+
+# API 키 등 환경 변수 파일
+ENV_FILE = "gemini.env"
+
+# 백그라운드 작업 진행 상황을 다시 확인하는 간격 (초)
+JOB_POLL_SECONDS = 1.0
+
+# Korean labels for the extracted fields
+FIELD_LABELS = {
+    "due_date_amount": "총 금액",
+    "water_usage_m3": "총 사용량 (m³)",
+    "lab1_tons": "제1연구소 사용량 (톤)",
+    "lab2_tons": "제2연구소 사용량 (톤)",
+    "service_period": "사용기간"
+}
 
 # --- Functions ---
 
-def get_gemini_response(image, api_key, prompt):
+def file_mtime(path):
     """
-    Sends an image and a prompt to the Gemini Pro Vision model and returns the response.
+    Returns the file's modification time, or None if it doesn't exist (used to invalidate cached resources).
     """
-    if not api_key:
-        st.error("Google AI Studio API 키를 입력해주세요.")
-        return None
-
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-pro-latest')
-        response = model.generate_content([prompt, image])
-        return response.text
-    except Exception as e:
-        st.error(f"An error occurred: {e}")
-        # Attempt to get more specific error information if available
-        if hasattr(e, 'response') and hasattr(e.response, 'prompt_feedback'):
-            st.error(f"Prompt Feedback: {e.response.prompt_feedback}")
+        return os.path.getmtime(path)
+    except OSError:
         return None
 
-from dotenv import load_dotenv
+
+@st.cache_resource(show_spinner=False)
+def env_file_keys():
+    """
+    Returns the process-wide set of environment variable names that were loaded from the env file.
+    """
+    return set()
+
+
+@st.cache_resource(show_spinner=False)
+def load_env_file(path, mtime):
+    """
+    Loads the env file into os.environ once per file version instead of on every rerun.
+    The mtime argument reloads it when the file changes: keys that came from the file take the edited
+    values (or are removed if deleted), while variables set outside the file still win.
+    """
+    from dotenv import dotenv_values
+
+    loaded_keys = env_file_keys()
+    values = {key: value for key, value in dotenv_values(path).items() if value is not None}
+    for key in loaded_keys - values.keys():
+        os.environ.pop(key, None)
+        loaded_keys.discard(key)
+    for key, value in values.items():
+        if key in loaded_keys or key not in os.environ:
+            os.environ[key] = value
+            loaded_keys.add(key)
+
+
+@st.cache_resource(show_spinner=False)
+def warm_up_model(api_key, model_name):
+    """
+    Creates the shared Gemini model in a background thread so the first render doesn't wait for
+    the google.generativeai import. get_model is locked, so an early analysis simply waits for it.
+    """
+    thread = threading.Thread(target=get_model, args=(api_key, model_name), daemon=True)
+    thread.start()
+    return thread
+
+
+@st.cache_data(show_spinner=False)
+def get_template_hash(template_path, mtime):
+    """
+    Returns the SHA-256 of a template file. The mtime argument invalidates the entry when the file changes.
+    """
+    with open(template_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def build_document_cached(template_hash, parsed_json_str, _template_path):
+    """
+    Builds the ODT document in memory, memoized on (template hash, parsed JSON).
+    """
+    return build_water_bill_document(_template_path, json.loads(parsed_json_str))
+
+
+@st.cache_resource
+def get_extraction_cache():
+    """
+    Returns the process-wide extraction cache shared by all sessions.
+    """
+    return ExtractionCache()
+
+
+@st.cache_resource
+def get_bill_store():
+    """
+    Returns the process-wide bill history store used for duplicate detection and usage queries.
+    """
+    return BillStore()
+
+
+@st.cache_resource
+def get_job_queue():
+    """
+    Returns the process-wide background job queue; all sessions share its worker pool.
+    """
+    return JobQueue()
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def get_pdf_page_count_cached(file_hash, _pdf_bytes):
+    """
+    Returns the page count of a PDF, cached by file hash.
+    """
+    return get_pdf_page_count(_pdf_bytes)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def render_pdf_page_cached(file_hash, page, dpi, grayscale, _pdf_bytes):
+    """
+    Rasterizes a single PDF page, cached by file hash and render settings so reruns skip conversion.
+    """
+    return render_pdf_page(_pdf_bytes, page=page, dpi=dpi, grayscale=grayscale)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def extract_pdf_text_cached(file_hash, page, _pdf_bytes):
+    """
+    Returns the text layer of a PDF page ("" for scanned PDFs), cached by file hash.
+    """
+    return extract_pdf_text(_pdf_bytes, page=page)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def preprocess_image_cached(file_hash, page, render_settings, options, original_bytes, _image):
+    """
+    Preprocesses the bill image for upload, cached by file hash, page, PDF render settings and options.
+    """
+    return preprocess_image(_image, options, original_bytes)
+
+
+def render_batch_mode(api_key, extraction_cache, pdf_settings, preprocess_options, job_queue, session_id,
+                      bill_store, router=None):
+    """
+    Renders the multi-file batch analysis view.
+    The batch runs as a background job and each row appears as soon as it completes;
+    bills already in the history store are answered from it without calling Gemini.
+    Returns True while the job is still running so the page keeps polling.
+    """
+    st.header("📚 청구서 일괄 분석")
+    st.markdown("여러 건물·여러 달의 청구서를 한 번에 업로드하여 동시에 분석합니다.")
+
+    uploaded_files = st.file_uploader(
+        "파일을 선택하거나 드래그하여 업로드",
+        type=["png", "jpg", "jpeg", "pdf"],
+        accept_multiple_files=True,
+        help="PNG, JPG, JPEG, PDF 형식을 지원합니다.",
+        key="batch_uploader"
+    )
+    concurrency = st.slider("동시 분석 개수", min_value=1, max_value=16, value=DEFAULT_CONCURRENCY)
+    pack_requests = st.checkbox(
+        "여러 청구서를 한 번의 요청으로 묶기",
+        help="청구서 여러 장을 한 번의 AI 요청으로 분석하여 요청 수를 줄입니다."
+    )
+    pack_size = DEFAULT_MAX_PACK_ITEMS
+    if pack_requests:
+        pack_size = st.slider("요청당 청구서 수", min_value=2, max_value=12, value=DEFAULT_MAX_PACK_ITEMS)
+
+    job_id = st.session_state.get("batch_job_id")
+    job = job_queue.get(job_id) if job_id else None
+    running = job is not None and not job.finished
+
+    if running:
+        progress = job.progress or {}
+        done, total = progress.get("done", 0), progress.get("total", 0)
+        st.progress(done / total if total else 0.0,
+                    text=f"{done} / {total}건 완료" if total else "분석 대기 중...")
+        if progress.get("rows"):
+            st.dataframe(progress["rows"], use_container_width=True)
+        st.caption("⏳ 백그라운드에서 분석 중입니다. 화면을 조작해도 분석은 계속됩니다.")
+        return True
+
+    if job is not None:
+        del st.session_state.batch_job_id
+        if job.status == DONE:
+            st.session_state.batch_results = job.result["rows"]
+            failures = sum(1 for row in st.session_state.batch_results if row["오류"])
+            duplicates = sum(1 for row in st.session_state.batch_results if row.get("이력"))
+            if duplicates:
+                st.info(f"📚 {duplicates}건은 이미 처리한 청구서여서 저장된 결과를 사용했습니다.")
+            if failures:
+                st.warning(f"⚠️ {failures}건의 분석에 실패했습니다. 오류 내용을 확인해주세요.")
+            else:
+                st.success("✅ 모든 청구서 분석이 완료되었습니다!")
+        else:
+            st.error(f"❌ 일괄 분석 중 오류가 발생했습니다: {job.error}")
+
+    if not uploaded_files:
+        st.info("👆 분석할 청구서 파일들을 업로드하세요.")
+    elif not api_key:
+        st.error("Google AI Studio API 키를 입력해주세요.")
+    elif st.button(f"🚀 {len(uploaded_files)}건 일괄 분석 시작", type="primary", use_container_width=True):
+        items = [BatchItem(name=f.name, data=f.getvalue()) for f in uploaded_files]
+        st.session_state.batch_job_id = job_queue.submit(
+            "batch", run_batch_job, items, api_key, DEFAULT_PROMPT, GEMINI_MODEL_NAME,
+            concurrency=concurrency,
+            cache=extraction_cache,
+            pdf_dpi=pdf_settings["dpi"],
+            pdf_grayscale=pdf_settings["grayscale"],
+            preprocess=preprocess_options,
+            pack=pack_requests,
+            max_pack_items=pack_size,
+            store=bill_store,
+            router=router,
+            owner=session_id
+        )
+        st.session_state.batch_results = None
+        st.session_state.bulk_documents = None
+        st.rerun()
+
+    if st.session_state.get("batch_results"):
+        st.dataframe(st.session_state.batch_results, use_container_width=True)
+        st.download_button(
+            label="💾 분석 결과 다운로드 (JSON)",
+            data=json.dumps(st.session_state.batch_results, ensure_ascii=False, indent=2),
+            file_name=f"수도요금_일괄분석_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            mime="application/json",
+            use_container_width=True
+        )
+        render_bulk_documents(st.session_state.batch_results)
+    return False
+
+
+def render_routing_stats():
+    """
+    Shows how many bills each model answered, why bills were escalated, and the relative cost so far.
+    """
+    routing = router_stats.summary()
+    if not routing["bills"]:
+        st.caption("아직 라우팅 기록이 없습니다.")
+        return
+    st.write(
+        f"청구서 {routing['bills']}건 · 승격 {routing['escalation_rate']:.0%} · "
+        f"상대 비용 {routing['total_cost']:g}"
+    )
+    for model_name, tier in routing["tiers"].items():
+        st.write(
+            f"`{model_name}`: {tier['calls']}회 · 통과 {tier['pass_rate']:.0%} · "
+            f"평균 {tier['avg_ms'] or 0:,.0f}ms"
+        )
+    for issue, count in routing["issues"].items():
+        st.caption(f"승격 사유: {ISSUE_MESSAGES.get(issue, issue)} {count}건")
+
+
+def render_history_panel(bill_store):
+    """
+    Renders the sidebar history panel: stored bill count, month-over-month usage and CSV export.
+    """
+    history = bill_store.stats()
+    st.write(f"저장된 청구서: {history['bills']}건")
+    if not history["bills"]:
+        return
+    if history["first_period"]:
+        st.caption(f"사용기간 {history['first_period']} ~ {history['last_period']}")
+
+    lab = st.selectbox("연구소", ["전체", "lab1", "lab2"], key="history_lab",
+                       format_func=lambda value: {"lab1": "제1연구소", "lab2": "제2연구소"}.get(value, value))
+    monthly = bill_store.monthly_usage(lab=None if lab == "전체" else lab)
+    if monthly:
+        st.dataframe(
+            [{
+                "월": row["month"],
+                "청구서": row["bills"],
+                "사용량": row["usage"],
+                "부과액": row["fee"],
+                "전월 대비": f"{row['change']:+.1%}" if row["change"] is not None else "",
+            } for row in monthly[-12:]],
+            use_container_width=True,
+            hide_index=True,
+        )
+
+    # 전체 이력을 읽어야 하므로 요청할 때만 CSV를 만듦
+    if st.button("📤 이력 CSV 만들기", key="export_history"):
+        buffer = io.StringIO()
+        bill_store.export_csv(buffer)
+        st.download_button(
+            label="💾 이력 내보내기 (CSV)",
+            data=buffer.getvalue().encode("utf-8-sig"),
+            file_name=f"수도요금_처리이력_{datetime.now().strftime('%Y%m%d')}.csv",
+            mime="text/csv",
+            use_container_width=True,
+            key="download_history"
+        )
+
+
+def render_trace_panel():
+    """
+    Renders the hidden tracing panel (open the page with ?debug=1): per-stage latency percentiles,
+    counters, and export of the full snapshot to a local file.
+    """
+    stages = tracer.stage_summary()
+    if not stages:
+        st.caption("아직 기록된 단계가 없습니다.")
+        return
+    st.dataframe(
+        [{
+            "단계": name,
+            "횟수": stage["count"],
+            "오류": stage["errors"],
+            "p50 (ms)": round(stage["p50"] * 1000, 1),
+            "p95 (ms)": round(stage["p95"] * 1000, 1),
+            "p99 (ms)": round(stage["p99"] * 1000, 1),
+        } for name, stage in stages.items()],
+        use_container_width=True,
+        hide_index=True,
+    )
+    for name, value in tracer.counters().items():
+        st.caption(f"`{name}`: {value:,}")
+
+    if st.button("📁 추적 기록 파일로 저장", key="export_trace"):
+        path = tracer.export(os.path.join(".cache", f"trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"))
+        st.success(f"{path}에 저장했습니다.")
+    st.download_button(
+        label="💾 추적 기록 다운로드 (JSON)",
+        data=json.dumps(tracer.snapshot(), ensure_ascii=False, indent=2, default=str),
+        file_name=f"trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+        mime="application/json",
+        use_container_width=True,
+        key="download_trace"
+    )
+
+
+def render_bulk_documents(rows):
+    """
+    Renders bulk notice generation for the successful batch rows (a zip of ODTs or one merged ODT).
+    """
+    template_path = find_template()
+    records = [
+        {"name": row["파일"], **{name: row.get(name) for name in BILL_FIELDS}}
+        for row in rows if not row["오류"]
+    ]
+    if template_path is None or not records:
+        return
+
+    st.markdown("---")
+    st.subheader("📝 공문 일괄 작성")
+    output_format = st.radio(
+        "생성 방식", ["청구서별 파일 (ZIP)", "하나의 문서로 병합 (ODT)"], horizontal=True, key="bulk_format"
+    )
+    if st.button(f"📄 공문 {len(records)}건 생성", key="bulk_documents"):
+        buffer = io.BytesIO()
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        with st.spinner("공문을 생성하고 있습니다..."):
+            if output_format.endswith("(ZIP)"):
+                report = write_documents_zip(template_path, records, buffer)
+                file_name, mime = f"수도요금부과_일괄_{timestamp}.zip", "application/zip"
+            else:
+                report = write_merged_document(template_path, records, buffer)
+                file_name, mime = f"수도요금부과_병합_{timestamp}.odt", "application/vnd.oasis.opendocument.text"
+        st.session_state.bulk_documents = (buffer.getvalue(), file_name, mime, report.summary())
+
+    if st.session_state.get("bulk_documents"):
+        content, file_name, mime, summary = st.session_state.bulk_documents
+        st.caption(f"✅ {summary}")
+        st.download_button(
+            label="💾 공문 다운로드",
+            data=content,
+            file_name=file_name,
+            mime=mime,
+            use_container_width=True,
+            key="download_bulk_documents"
+        )
 
 # --- Streamlit App ---
 
@@ -45,11 +407,25 @@ def main():
     """
     Main function to run the Streamlit application.
     """
-    # Load API key from gemini.env
-    load_dotenv(dotenv_path='gemini.env')
+    # Must be the first Streamlit command: the cached resources below may show a spinner on a cold start
+    st.set_page_config(page_title="판교 소부장 공동연구소 수도요금 자동화", page_icon="💧", layout="wide")
+
+    # Load API key from gemini.env (only re-read when the file changes)
+    load_env_file(ENV_FILE, file_mtime(ENV_FILE))
+    # TRACE_LOG 환경 변수가 있으면 단계별 span과 오류를 JSON Lines로 기록
+    configure_json_logging()
     api_key = os.environ.get("GEMINI_API_KEY")
+    if api_key:
+        # Create the shared client once per process so the first analysis doesn't pay for it
+        warm_up_model(api_key, GEMINI_MODEL_NAME)
+
+    # Jobs are tagged with the session id so each user only sees their own
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    session_id = st.session_state.session_id
+    job_queue = get_job_queue()
+    poll_jobs = False
 
-    st.set_page_config(page_title="판교 소부장 공동연구소 수도요금 자동화", page_icon="💧", layout="wide")
     st.title("💧 판교 소부장 공동연구소 수도요금 자동화 프로그램")
     st.markdown("""  
     수도 요금 청구서를 업로드하면 AI가 자동으로 정보를 추출하고 연구소별 요금을 계산합니다.  
@@ -66,8 +442,110 @@ def main():
     """)
     st.sidebar.markdown("---")
     st.sidebar.success("✅ 시스템 준비 완료")
+
+    extraction_cache = get_extraction_cache()
+    with st.sidebar.expander("🗄️ 분석 결과 캐시"):
+        cache_stats = extraction_cache.stats()
+        st.write(f"저장된 항목: {cache_stats['entries']}개")
+        st.write(f"적중 / 실패: {cache_stats['hits']} / {cache_stats['misses']}")
+        if st.button("캐시 비우기", key="clear_extraction_cache"):
+            extraction_cache.clear()
+            st.success("캐시를 비웠습니다.")
+
+    with st.sidebar.expander("🖨️ PDF 변환 설정"):
+        pdf_settings = {
+            "dpi": st.slider("변환 해상도 (DPI)", min_value=72, max_value=300,
+                             value=DEFAULT_PDF_DPI, step=1),
+            "grayscale": st.checkbox("흑백으로 변환", value=False),
+            "use_text_layer": st.checkbox(
+                "텍스트 레이어 우선 사용",
+                value=False,
+                help="텍스트가 포함된 PDF는 이미지로 변환하지 않고 텍스트를 바로 분석합니다. "
+                     "수기 메모(연구소 사용량)는 인식되지 않을 수 있습니다."
+            ),
+        }
+
+    with st.sidebar.expander("🖼️ 이미지 전처리"):
+        preprocess_options = None
+        if st.checkbox("전송 전 이미지 최적화", value=True,
+                       help="회전 보정, 축소, 재인코딩으로 전송 크기와 분석 시간을 줄입니다."):
+            preprocess_options = PreprocessOptions(
+                max_long_edge=st.slider("최대 긴 변 (px)", min_value=768, max_value=4096,
+                                        value=DEFAULT_MAX_LONG_EDGE, step=128),
+                grayscale=st.checkbox("흑백 변환", value=False),
+                enhance_contrast=st.checkbox("대비 보정 (흐린 수기 메모용)", value=False),
+                image_format=st.selectbox("전송 형식", ["JPEG", "WEBP"]),
+            )
+
+    with st.sidebar.expander("🔀 모델 라우팅"):
+        router = None
+        if st.checkbox(
+            "빠른 모델 먼저 사용", value=False,
+            help=f"{FAST_MODEL_NAME}로 먼저 분석하고, 금액·사용량·사용기간 검사에 실패한 청구서만 "
+                 f"{GEMINI_MODEL_NAME}로 다시 요청합니다."
+        ):
+            router = default_router(GEMINI_MODEL_NAME)
+            if api_key:
+                warm_up_model(api_key, FAST_MODEL_NAME)
+        render_routing_stats()
+
+    with st.sidebar.expander("⏱️ Gemini 응답 시간"):
+        latency = latency_stats.summary()
+        if latency["cold_calls"]:
+            st.write(f"첫 호출 (cold): {latency['cold_avg']:.2f}초 × {latency['cold_calls']}회")
+        if latency["warm_calls"]:
+            st.write(f"이후 호출 (warm): {latency['warm_avg']:.2f}초 × {latency['warm_calls']}회")
+        if not latency["cold_calls"]:
+            st.caption("아직 호출 기록이 없습니다.")
+
+        scheduler_metrics = get_scheduler().metrics()
+        st.write(
+            f"요청 {scheduler_metrics['calls']}회 · 재시도 {scheduler_metrics['retries']}회 · "
+            f"실패 {scheduler_metrics['failures']}회 · 대기 {scheduler_metrics['queue_depth']}건"
+        )
+        if scheduler_metrics["latency_p50"] is not None:
+            st.write(
+                f"p50 {scheduler_metrics['latency_p50']:.2f}초 · "
+                f"p95 {scheduler_metrics['latency_p95']:.2f}초 · "
+                f"p99 {scheduler_metrics['latency_p99']:.2f}초"
+            )
+        if scheduler_metrics["circuit_state"] != "closed":
+            st.warning("⚠️ Gemini 오류가 반복되어 요청이 잠시 차단되었습니다.")
+
+        for extractor_name, summary in extractor_stats.summary().items():
+            st.write(
+                f"추출기 `{extractor_name}`: {summary['calls']}회 · "
+                f"적중률 {summary['hit_rate']:.0%} · 평균 {summary['avg_ms']:,.0f}ms"
+            )
+
+    bill_store = get_bill_store()
+    with st.sidebar.expander("📚 처리 이력"):
+        render_history_panel(bill_store)
+
+    with st.sidebar.expander("🧵 백그라운드 작업"):
+        job_counts = job_queue.stats()
+        st.write(
+            f"대기 {job_counts['queued']}건 · 실행 중 {job_counts['running']}건 · "
+            f"완료 {job_counts['done']}건 · 실패 {job_counts['failed']}건"
+        )
+        for job in job_queue.list_jobs(owner=session_id, limit=5):
+            st.caption(f"{job.kind} · {job.status} · {job.elapsed:.1f}초")
+
+    # 성능 추적 패널은 주소에 ?debug=1을 붙였을 때만 표시
+    if st.query_params.get("debug") == "1":
+        with st.sidebar.expander("🔍 성능 추적", expanded=True):
+            render_trace_panel()
+
     st.sidebar.caption("Powered by Google Gemini AI")
 
+    mode = st.sidebar.radio("분석 방식", ["단건 분석", "일괄 분석"], horizontal=True)
+    if mode == "일괄 분석":
+        if render_batch_mode(api_key, extraction_cache, pdf_settings, preprocess_options,
+                             job_queue, session_id, bill_store, router):
+            time.sleep(JOB_POLL_SECONDS)
+            st.rerun()
+        return
+
     # --- Main Content ---
     col1, col2 = st.columns(2)
 
@@ -80,61 +558,158 @@ def main():
             help="PNG, JPG, JPEG, PDF 형식을 지원합니다."
         )
 
-        image_to_process = None
+        bill_source = None
+        pdf_text = None
         if uploaded_file is not None:
             if uploaded_file.type == "application/pdf":
-                with st.spinner("PDF를 이미지로 변환 중..."):
-                    images = convert_from_bytes(uploaded_file.read())
-                    if images:
-                        image_to_process = images[0]
-                        st.image(image_to_process, caption="📄 업로드된 청구서 (PDF 첫 페이지)", use_column_width=True)
+                pdf_bytes = uploaded_file.getvalue()
+                file_hash = hashlib.sha256(pdf_bytes).hexdigest()
+                original_bytes = len(pdf_bytes)
+                render_settings = (pdf_settings["dpi"], pdf_settings["grayscale"])
+                page_count = get_pdf_page_count_cached(file_hash, pdf_bytes)
+                page = 1
+                if page_count > 1:
+                    page = st.number_input("분석할 페이지", min_value=1, max_value=page_count, value=1)
+
+                pdf_text = extract_pdf_text_cached(file_hash, page, pdf_bytes)
+                if pdf_settings["use_text_layer"]:
+                    if pdf_text:
+                        bill_source = pdf_text
+                        st.caption("📝 PDF 텍스트 레이어를 사용합니다 (이미지 변환 생략).")
+                        with st.expander("추출된 텍스트 보기"):
+                            st.text(pdf_text)
+
+                if bill_source is None:
+                    with st.spinner("PDF를 이미지로 변환 중..."):
+                        bill_source = render_pdf_page_cached(
+                            file_hash, page, pdf_settings["dpi"], pdf_settings["grayscale"], pdf_bytes
+                        )
+                    st.image(bill_source, caption=f"📄 업로드된 청구서 (PDF {page}페이지)", use_column_width=True)
             else:
-                image_to_process = Image.open(uploaded_file)
-                st.image(image_to_process, caption="📄 업로드된 청구서", use_column_width=True)
+                image_bytes = uploaded_file.getvalue()
+                file_hash = hashlib.sha256(image_bytes).hexdigest()
+                original_bytes = len(image_bytes)
+                render_settings = None
+                page = 1
+                from PIL import Image
+
+                bill_source = Image.open(uploaded_file)
+                st.image(bill_source, caption="📄 업로드된 청구서", use_column_width=True)
+
+            bill_hash = content_hash(uploaded_file.getvalue(), page)
+
+            # Gemini에는 전처리된 이미지를 전송 (PDF 텍스트 레이어는 그대로 사용)
+            if preprocess_options is not None and not isinstance(bill_source, str):
+                processed = preprocess_image_cached(
+                    file_hash, page, render_settings, preprocess_options, original_bytes, bill_source
+                )
+                bill_source = processed.to_blob()
+                st.caption(
+                    f"🖼️ 전송 크기: {processed.original_bytes / 1024:,.0f}KB → "
+                    f"{processed.processed_bytes / 1024:,.0f}KB "
+                    f"({processed.width}×{processed.height}, {processed.reduction:.0%} 감소)"
+                )
 
     with col2:
         st.header("🤖 AI 분석 결과")
-        if image_to_process is not None:
+        if bill_source is not None:
             with st.expander("⚙️ AI 분석 프롬프트 설정 (고급)", expanded=False):
                 prompt = st.text_area(
                     "분석 프롬프트 (필요시 수정 가능):",
-                '''이미지에서 다음 정보를 추출하여 JSON 형식으로 반환해주세요:
-1. "due_date_amount": 납기 내 요금 (숫자만 추출)
-2. "water_usage_m3": 상수도요금 사용량 (m³ 단위의 숫자만 추출)
-3. "lab1_tons": 수기 메모에 있는 1연구소 사용량 (톤 단위의 숫자만 추출, 없으면 null)
-4. "lab2_tons": 수기 메모에 있는 2연구소 사용량 (톤 단위의 숫자만 추출, 없으면 null)
-5. "service_period": 사용기간 (예: "YYYY.MM.DD ~ YYYY.MM.DD")
-
-만약 특정 필드를 찾을 수 없다면, 해당 필드의 값은 null로 설정해주세요.
-''',
+                    DEFAULT_PROMPT,
                     height=200
                 )
+                bypass_cache = st.checkbox(
+                    "캐시 무시하고 다시 분석",
+                    help="이전에 분석한 청구서라도 AI를 다시 호출합니다."
+                )
+                stream_response = st.checkbox(
+                    "실시간으로 결과 표시 (스트리밍)",
+                    value=True,
+                    help="항목이 인식되는 즉시 화면에 표시합니다."
+                )
+                local_first = st.checkbox(
+                    "로컬 추출 우선 (텍스트가 있는 PDF)",
+                    value=True,
+                    help="인쇄된 항목(금액, 사용량, 사용기간)은 PDF 텍스트에서 바로 읽고, "
+                         "나머지 항목만 AI에 요청합니다."
+                )
             
+            extraction_job = None
+            if st.session_state.get("extraction_job_id"):
+                extraction_job = job_queue.get(st.session_state.extraction_job_id)
+            extraction_running = extraction_job is not None and not extraction_job.finished
+
             st.markdown("")
-            if st.button("🚀 청구서 분석 시작", type="primary", use_container_width=True):
-                with st.spinner("💡 AI가 청구서를 분석하고 있습니다... 잠시만 기다려주세요."):
-                    response_text = get_gemini_response(image_to_process, api_key, prompt)
-                    if response_text:
-                        st.success("✅ 청구서 분석이 완료되었습니다!")
-                        # Clean the response to extract only the JSON part
-                        try:
-                            # The model might return the JSON wrapped in ```json ... ```
-                            json_str = response_text.strip().replace("```json", "").replace("```", "").strip()
-                            parsed_json = json.loads(json_str)
-                            
-                            # Store in session state to prevent loss on rerun
-                            st.session_state.parsed_data = parsed_json
-                            st.rerun()  # Rerun to display results
+            if st.button("🚀 청구서 분석 시작", type="primary", use_container_width=True,
+                         disabled=extraction_running):
+                # 이미 처리한 청구서는 이력에 저장된 결과를 사용 (Gemini 호출 없음)
+                stored = None if bypass_cache else bill_store.find(bill_hash)
+                if stored is not None:
+                    st.session_state.parsed_data = stored.parsed_data
+                    st.session_state.from_cache = False
+                    st.session_state.from_history = stored.processed_at.strftime("%Y-%m-%d %H:%M")
+                    st.session_state.partial_response = False
+                    st.session_state.routing = None
+                    st.rerun()
 
+                # 모델 라우팅을 사용하면 라우팅 이름으로 최종 결과를 캐시
+                model_label = router.name if router is not None else GEMINI_MODEL_NAME
+                cache_key = make_cache_key(bill_source, prompt, model_label)
+                cached_data = None if bypass_cache else extraction_cache.get(cache_key)
+                if cached_data is not None:
+                    bill_store.record(bill_hash, uploaded_file.name, cached_data, model_label)
+                    st.session_state.parsed_data = cached_data
+                    st.session_state.cache_key = cache_key
+                    st.session_state.from_cache = True
+                    st.session_state.from_history = None
+                    st.session_state.partial_response = False
+                    st.session_state.routing = None
+                    st.rerun()
 
-                        except json.JSONDecodeError:
-                            st.error("❌ AI 응답 형식 오류가 발생했습니다. 원본 응답을 표시합니다.")
-                            st.markdown(response_text)
-                        except Exception as e:
-                            st.error(f"❌ 오류가 발생했습니다: {e}")
-                            st.markdown(response_text)
-                    else:
-                        st.warning("⚠️ 분석에 실패했습니다. 청구서를 다시 확인해주세요.")
+                if not api_key:
+                    st.error("Google AI Studio API 키를 입력해주세요.")
+                else:
+                    # 분석은 백그라운드 작업으로 실행하고, 화면은 작업 ID로 진행 상황만 확인
+                    st.session_state.extraction_job_id = job_queue.submit(
+                        "extraction", run_extraction_job, bill_source, api_key, prompt, GEMINI_MODEL_NAME,
+                        cache=extraction_cache,
+                        cache_key=cache_key,
+                        pdf_text=pdf_text if local_first else None,
+                        name=uploaded_file.name,
+                        stream=stream_response,
+                        store=bill_store,
+                        bill_hash=bill_hash,
+                        router=router,
+                        owner=session_id
+                    )
+                    st.session_state.extraction_cache_key = cache_key
+                    st.session_state.parsed_data = None
+                    st.rerun()
+
+            if extraction_running:
+                st.subheader("📡 실시간 분석 결과")
+                fields = (extraction_job.progress or {}).get("fields", {})
+                for key, label in FIELD_LABELS.items():
+                    display_value = fields.get(key, "⏳")
+                    st.write(f"**{label}**: {'정보 없음' if display_value is None else display_value}")
+                st.caption(
+                    f"💡 AI가 청구서를 분석하고 있습니다... ({extraction_job.elapsed:.0f}초) "
+                    "다른 설정을 바꿔도 분석은 계속됩니다."
+                )
+                poll_jobs = True
+            elif extraction_job is not None:
+                del st.session_state.extraction_job_id
+                if extraction_job.status == DONE:
+                    st.session_state.parsed_data = extraction_job.result["parsed_data"]
+                    st.session_state.cache_key = st.session_state.extraction_cache_key
+                    st.session_state.from_cache = False
+                    st.session_state.from_history = None
+                    st.session_state.partial_response = not extraction_job.result["complete"]
+                    st.session_state.routing = extraction_job.result.get("routing")
+                    st.rerun()
+                st.error(f"An error occurred: {extraction_job.error}")
+                st.warning("⚠️ 분석에 실패했습니다. 청구서를 다시 확인해주세요.")
             
             # Display results if data exists in session state
             if "parsed_data" in st.session_state and st.session_state.parsed_data:
@@ -142,18 +717,27 @@ def main():
                 
                 # Display extracted information in Korean
                 st.subheader("📊 청구서에서 추출된 정보")
-                
-                # Create a Korean-labeled dictionary
-                korean_labels = {
-                    "due_date_amount": "총 금액",
-                    "water_usage_m3": "총 사용량 (m³)",
-                    "lab1_tons": "제1연구소 사용량 (톤)",
-                    "lab2_tons": "제2연구소 사용량 (톤)",
-                    "service_period": "사용기간"
-                }
+                if st.session_state.get("from_history"):
+                    st.caption(f"📚 이미 처리한 청구서입니다 ({st.session_state.from_history} 처리). "
+                               "저장된 결과를 불러왔습니다. 다시 분석하려면 '캐시 무시하고 다시 분석'을 선택하세요.")
+                if st.session_state.get("from_cache"):
+                    st.caption("⚡ 이전 분석 결과를 캐시에서 불러왔습니다.")
+                    if st.button("🗑️ 이 청구서의 캐시 삭제", key="invalidate_cache_entry"):
+                        extraction_cache.invalidate(st.session_state.cache_key)
+                        st.session_state.from_cache = False
+                        st.info("캐시를 삭제했습니다. 다시 분석하면 AI를 새로 호출합니다.")
+                if st.session_state.get("partial_response"):
+                    st.warning("⚠️ AI 응답의 끝부분이 손상되어 완성된 항목만 표시합니다. 누락된 항목은 다시 분석해주세요.")
+                routing = st.session_state.get("routing")
+                if routing and routing["escalated"]:
+                    reasons = ", ".join(ISSUE_MESSAGES.get(issue, issue) for issue in routing["attempts"][0]["issues"])
+                    st.caption(f"🔀 빠른 모델의 결과가 검사를 통과하지 못해 {routing['model_name']}로 다시 분석했습니다 "
+                               f"({reasons}).")
+                elif routing:
+                    st.caption(f"🔀 {routing['model_name']}로 분석했습니다.")
                 
                 # Display in a more readable format
-                for key, korean_label in korean_labels.items():
+                for key, korean_label in FIELD_LABELS.items():
                     value = parsed_json.get(key, "정보 없음")
                     if value is None:
                         value = "정보 없음"
@@ -177,13 +761,9 @@ def main():
                     service_period = parsed_json.get("service_period", "날짜 정보 없음")
 
                     if water_usage_m3 > 0:
-                        price_per_unit = due_date_amount / water_usage_m3
-                        lab1_fee = price_per_unit * lab1_tons
-                        lab2_fee = price_per_unit * lab2_tons
-
-                        # Truncate to the nearest 10 by using integer division
-                        lab1_fee_truncated = (int(lab1_fee) // 10) * 10
-                        lab2_fee_truncated = (int(lab2_fee) // 10) * 10
+                        fees = calculate_lab_fees(parsed_json)
+                        lab1_fee_truncated = fees["lab1_fee"]
+                        lab2_fee_truncated = fees["lab2_fee"]
 
                         col1, col2 = st.columns(2)
                         
@@ -204,22 +784,16 @@ def main():
                         st.subheader("📝 공문 서식 자동 작성")
                         
                         # 템플릿 파일 찾기
-                        template_files = glob.glob("서식/*.odt")
+                        template_path = find_template()
                         
-                        if template_files:
+                        if template_path:
                             st.info("✅ 서식 템플릿이 준비되어 있습니다. 아래 버튼을 클릭하여 공문을 생성하세요.")
                             
-                            # 출력 파일명 생성
-                            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                            output_filename = f"수도요금부과_{timestamp}.odt"
-                            output_path = os.path.join("서식", output_filename)
-                            
-                            # ODT 파일 미리 생성
-                            template_path = template_files[0]
-                            result = generate_water_bill_document(
-                                template_path,
-                                output_path,
-                                parsed_json
+                            # 문서는 (템플릿 해시, 추출 데이터) 기준으로 메모리에서 한 번만 생성
+                            result = build_document_cached(
+                                get_template_hash(template_path, os.path.getmtime(template_path)),
+                                json.dumps(parsed_json, ensure_ascii=False, sort_keys=True),
+                                template_path
                             )
                             
                             if result["success"]:
@@ -229,15 +803,33 @@ def main():
                                         st.write(f"**{key}**: {value}")
                                 
                                 # 파일 다운로드 버튼
-                                with open(output_path, "rb") as file:
-                                    st.download_button(
-                                        label="💾 공문 서식 다운로드 (ODT)",
-                                        data=file,
-                                        file_name=output_filename,
-                                        mime="application/vnd.oasis.opendocument.text",
-                                        use_container_width=True,
-                                        key="download_odt"
+                                output_filename = f"수도요금부과_{datetime.now().strftime('%Y%m%d_%H%M%S')}.odt"
+                                st.download_button(
+                                    label="💾 공문 서식 다운로드 (ODT)",
+                                    data=result["content"],
+                                    file_name=output_filename,
+                                    mime="application/vnd.oasis.opendocument.text",
+                                    use_container_width=True,
+                                    key="download_odt"
+                                )
+                                document_job = None
+                                if st.session_state.get("document_job_id"):
+                                    document_job = job_queue.get(st.session_state.document_job_id)
+                                if st.button("🗂️ 서버에 사본 보관", key="save_odt"):
+                                    st.session_state.document_job_id = job_queue.submit(
+                                        "document", run_document_job, template_path, parsed_json, OUTPUT_DIR,
+                                        owner=session_id
                                     )
+                                    st.rerun()
+                                if document_job is not None and not document_job.finished:
+                                    st.caption("⏳ 서버에 사본을 보관하는 중입니다...")
+                                    poll_jobs = True
+                                elif document_job is not None:
+                                    del st.session_state.document_job_id
+                                    if document_job.status == DONE:
+                                        st.info(f"📁 {document_job.result['path']}에 저장했습니다.")
+                                    else:
+                                        st.error(f"❌ 사본 보관 중 오류가 발생했습니다: {document_job.error}")
                                 st.success("✅ 공문 서식이 생성되었습니다. 위 버튼을 클릭하여 다운로드하세요!")
                             else:
                                 st.error(f"❌ 문서 생성 중 오류가 발생했습니다: {result.get('error', '알 수 없는 오류')}")
@@ -281,5 +873,10 @@ def main():
         - 분석에 약 5-10초 정도 소요됩니다.
         """)
 
+    # 진행 중인 백그라운드 작업이 있으면 잠시 후 화면을 다시 그려 진행 상황을 갱신
+    if poll_jobs:
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+PDF 청구서 처리 유틸리티 (필요한 페이지만 지정한 해상도로 변환)
+"""
+import shutil
+import subprocess
+
+from tracing import traced
+
+
+DEFAULT_PDF_DPI = 150
+# 텍스트 레이어로 인정할 최소 글자 수 (스캔 PDF의 잡음 텍스트 제외)
+MIN_TEXT_LAYER_CHARS = 30
+
+
+def get_pdf_page_count(pdf_bytes):
+    """
+    PDF의 전체 페이지 수를 반환
+    """
+    from pdf2image import pdfinfo_from_bytes
+
+    return int(pdfinfo_from_bytes(pdf_bytes)["Pages"])
+
+
+@traced("pdf.render")
+def render_pdf_page(pdf_bytes, page=1, dpi=DEFAULT_PDF_DPI, grayscale=False):
+    """
+    PDF의 지정한 페이지 하나만 이미지로 변환
+
+    Args:
+        pdf_bytes: PDF 파일 바이트
+        page: 변환할 페이지 번호 (1부터 시작)
+        dpi: 변환 해상도
+        grayscale: True이면 흑백으로 변환
+    """
+    from pdf2image import convert_from_bytes
+
+    images = convert_from_bytes(
+        pdf_bytes,
+        dpi=dpi,
+        first_page=page,
+        last_page=page,
+        grayscale=grayscale
+    )
+    if not images:
+        raise ValueError(f"PDF에서 {page}페이지를 찾을 수 없습니다.")
+    return images[0]
+
+
+@traced("pdf.text")
+def extract_pdf_text(pdf_bytes, page=1):
+    """
+    PDF 텍스트 레이어에서 지정한 페이지의 텍스트를 추출 (poppler의 pdftotext 사용)
+    텍스트 레이어가 없거나 pdftotext를 사용할 수 없으면 빈 문자열을 반환
+    """
+    if shutil.which("pdftotext") is None:
+        return ""
+
+    result = subprocess.run(
+        ["pdftotext", "-f", str(page), "-l", str(page), "-layout", "-enc", "UTF-8", "-", "-"],
+        input=pdf_bytes,
+        capture_output=True,
+        timeout=30
+    )
+    if result.returncode != 0:
+        return ""
+
+    text = result.stdout.decode("utf-8", errors="replace").strip()
+    if len("".join(text.split())) < MIN_TEXT_LAYER_CHARS:
+        return ""
+    return text
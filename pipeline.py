@@ -0,0 +1,196 @@
+"""
+청구서 처리 파이프라인 (이미지 로드 → 정보 추출 → 연구소별 요금 계산 → 공문 생성)
+
+Streamlit 화면, CLI(cli.py), HTTP 서비스(service.py)가 같은 파이프라인을 사용하며,
+Gemini 모델(gemini_client), 분석 결과 캐시, 컴파일된 ODT 템플릿은 프로세스 전체에서 공유됩니다.
+"""
+import glob
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+from batch import DEFAULT_CONCURRENCY, DEFAULT_MAX_PACK_ITEMS, BatchItem, extract_bills, extract_bills_packed
+from extraction import DEFAULT_PROMPT, GEMINI_MODEL_NAME
+from fee_allocation import DEFAULT_ROUNDING, allocate_bill
+from odt_utils import build_water_bill_document
+from pdf_utils import DEFAULT_PDF_DPI
+
+DEFAULT_TEMPLATE_DIR = "서식"
+GENERATED_PREFIX = "수도요금부과"
+
+
+def find_template(template_dir=DEFAULT_TEMPLATE_DIR):
+    """
+    서식 폴더에서 공문 템플릿(ODT)을 찾아 경로를 반환 (없으면 None)
+    이전 버전에서 서식 폴더에 저장된 생성 문서는 제외
+    폴더 목록은 폴더의 수정 시각이 바뀔 때(파일 추가·삭제·이름 변경)만 다시 읽음
+    """
+    try:
+        mtime_ns = os.stat(template_dir).st_mtime_ns
+    except OSError:
+        return None
+    return _find_template(os.path.abspath(template_dir), template_dir, mtime_ns)
+
+
+@lru_cache(maxsize=8)
+def _find_template(abs_template_dir, template_dir, mtime_ns):
+    template_files = sorted(
+        path for path in glob.glob(os.path.join(template_dir, "*.odt"))
+        if not os.path.basename(path).startswith(f"{GENERATED_PREFIX}_")
+    )
+    return template_files[0] if template_files else None
+
+
+def calculate_lab_fees(parsed_data, rounding=DEFAULT_ROUNDING):
+    """
+    추출된 정보로 연구소별 사용 요금을 계산 (기본값: 10원 단위 절사)
+
+    Returns:
+        {"price_per_unit", "lab1_fee", "lab2_fee", ..., "lab_fees", "total_fee", "remainder"} 딕셔너리
+        total_fee는 연구소 사용량 합계에 대한 부과액(공문의 부과액), remainder는 반올림으로 생긴 차이
+
+    Raises:
+        ValueError: 숫자 항목이 잘못되었거나 상수도 사용량이 0인 경우
+    """
+    allocation = allocate_bill(parsed_data, rounding)
+    fees = {"price_per_unit": float(allocation.unit_price)}
+    fees.update({f"{lab}_fee": fee for lab, fee in allocation.shares.items()})
+    fees.update({
+        "lab_fees": allocation.shares,
+        "total_fee": allocation.total,
+        "remainder": allocation.remainder,
+    })
+    return fees
+
+
+@dataclass
+class PipelineResult:
+    """청구서 한 건의 파이프라인 처리 결과"""
+    name: str
+    parsed_data: dict = None
+    fees: dict = None
+    document: bytes = None
+    error: str = None
+    from_cache: bool = False
+    from_history: bool = False
+    elapsed: float = 0.0
+    model_name: str = None
+    escalated: bool = False
+
+    @property
+    def success(self):
+        return self.error is None
+
+    def to_dict(self):
+        """JSON으로 출력할 수 있는 딕셔너리 (문서 바이트 제외)"""
+        return {
+            "file": self.name,
+            "success": self.success,
+            "parsed_data": self.parsed_data,
+            "fees": self.fees,
+            "has_document": self.document is not None,
+            "error": self.error,
+            "from_cache": self.from_cache,
+            "from_history": self.from_history,
+            "model": self.model_name,
+            "escalated": self.escalated,
+            "elapsed": round(self.elapsed, 3),
+        }
+
+
+class BillPipeline:
+    """
+    청구서 처리 파이프라인
+
+    Args:
+        api_key: Gemini API 키
+        model_name: 사용할 Gemini 모델명
+        prompt: 분석 프롬프트
+        cache: ExtractionCache (선택)
+        preprocess: 이미지 전처리 설정 PreprocessOptions (선택)
+        pdf_dpi: PDF 변환 해상도
+        pdf_grayscale: True이면 PDF를 흑백으로 변환
+        template_path: 공문 템플릿 경로 (None이면 서식 폴더에서 찾음)
+        local_first: True이면 텍스트가 있는 PDF의 인쇄된 항목을 로컬에서 먼저 추출
+        rounding: 부과액 반올림 정책 (fee_allocation.RoundingPolicy)
+        store: 처리 이력 BillStore (선택, 이미 처리한 청구서는 Gemini를 호출하지 않음)
+        router: model_router.ModelRouter (선택, 빠른 모델 먼저 요청하고 검사에 실패하면 상위 모델로 재요청)
+    """
+
+    def __init__(self, api_key, model_name=GEMINI_MODEL_NAME, prompt=DEFAULT_PROMPT, cache=None,
+                 preprocess=None, pdf_dpi=DEFAULT_PDF_DPI, pdf_grayscale=False, template_path=None,
+                 local_first=False, rounding=DEFAULT_ROUNDING, store=None, router=None):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.prompt = prompt
+        self.cache = cache
+        self.preprocess = preprocess
+        self.pdf_dpi = pdf_dpi
+        self.pdf_grayscale = pdf_grayscale
+        self.template_path = template_path
+        self.local_first = local_first
+        self.rounding = rounding
+        self.store = store
+        self.router = router
+
+    def build_document(self, parsed_data):
+        """
+        추출 데이터로 공문을 생성하여 (ODT 바이트, 치환 내용)을 반환
+
+        Raises:
+            FileNotFoundError: 템플릿이 없는 경우
+            RuntimeError: 문서 생성에 실패한 경우
+        """
+        template_path = self.template_path or find_template()
+        if template_path is None:
+            raise FileNotFoundError("서식 템플릿 파일(ODT)을 찾을 수 없습니다.")
+        result = build_water_bill_document(template_path, parsed_data, self.rounding)
+        if not result["success"]:
+            raise RuntimeError(result.get("error", "문서 생성 실패"))
+        return result["content"], result["replacements"]
+
+    def _finish(self, batch_result, with_document):
+        result = PipelineResult(
+            name=batch_result.name,
+            parsed_data=batch_result.parsed_data,
+            error=batch_result.error,
+            from_cache=batch_result.from_cache,
+            from_history=batch_result.from_history,
+            elapsed=batch_result.elapsed,
+            model_name=batch_result.model_name,
+            escalated=batch_result.escalated,
+        )
+        if not result.success:
+            return result
+        try:
+            result.fees = calculate_lab_fees(result.parsed_data, self.rounding)
+            if with_document:
+                result.document, _ = self.build_document(result.parsed_data)
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+        return result
+
+    def process_many(self, items, concurrency=DEFAULT_CONCURRENCY, with_document=False,
+                     pack=False, max_pack_items=DEFAULT_MAX_PACK_ITEMS):
+        """
+        여러 청구서(BatchItem)를 동시에 처리하고 완료되는 순서대로 PipelineResult를 반환 (generator)
+        """
+        if pack:
+            results = extract_bills_packed(items, self.api_key, self.prompt, self.model_name,
+                                           concurrency, self.cache, self.pdf_dpi, self.pdf_grayscale,
+                                           self.preprocess, max_pack_items=max_pack_items, store=self.store,
+                                           router=self.router)
+        else:
+            results = extract_bills(items, self.api_key, self.prompt, self.model_name,
+                                    concurrency, self.cache, self.pdf_dpi, self.pdf_grayscale,
+                                    self.preprocess, local_first=self.local_first, store=self.store,
+                                    router=self.router)
+        for batch_result in results:
+            yield self._finish(batch_result, with_document)
+
+    def process(self, name, data, with_document=False):
+        """
+        청구서 한 건(파일명, 원본 바이트)을 처리하여 PipelineResult를 반환
+        """
+        return next(self.process_many([BatchItem(name=name, data=data)], concurrency=1,
+                                      with_document=with_document))
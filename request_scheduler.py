@@ -0,0 +1,258 @@
+"""
+Gemini 요청 스케줄러 (타임아웃, 지수 백오프 재시도, 토큰 버킷 속도 제한, 서킷 브레이커)
+
+요청 함수는 timeout(초) 인자를 받아 호출되므로, 실제 Gemini 대신
+가짜 함수나 가짜 모델을 넣어 네트워크 없이 동작을 확인할 수 있습니다.
+"""
+import math
+import random
+import threading
+import time
+from collections import deque
+
+
+# 재시도할 HTTP 상태 코드 (429: 할당량 초과, 5xx: 일시적 서버 오류)
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {
+    "TooManyRequests",
+    "ResourceExhausted",
+    "InternalServerError",
+    "ServiceUnavailable",
+    "DeadlineExceeded",
+    "GatewayTimeout",
+}
+
+
+class CircuitOpenError(RuntimeError):
+    """서킷 브레이커가 열려 있어 요청을 보내지 않았을 때 발생"""
+
+
+def is_retryable(error):
+    """
+    일시적인 오류(429, 5xx, 타임아웃, 연결 오류)인지 판단
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, "code", None)
+    try:
+        if code is not None and int(code) in RETRYABLE_STATUS_CODES:
+            return True
+    except (TypeError, ValueError):
+        pass
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+
+class TokenBucket:
+    """
+    토큰 버킷 속도 제한기
+    rate_per_second 속도로 토큰이 채워지고, 최대 capacity개까지 한 번에 사용할 수 있음
+    """
+
+    def __init__(self, rate_per_second, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_second)
+        self._updated = now
+
+    def acquire(self):
+        """
+        토큰을 하나 사용 (없으면 채워질 때까지 대기)
+        """
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate_per_second
+            self._sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    연속 실패가 failure_threshold회 이상이면 reset_timeout초 동안 요청을 차단
+    차단 시간이 지나면 한 번 시험 요청을 허용하고, 성공하면 다시 정상 상태로 전환
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def before_call(self):
+        """
+        요청 전에 호출. 차단 중이면 CircuitOpenError 발생
+        """
+        with self._lock:
+            state = self._state()
+            if state == self.OPEN or (state == self.HALF_OPEN and self._trial_in_flight):
+                raise CircuitOpenError("Gemini 요청이 연속으로 실패하여 잠시 차단되었습니다.")
+            if state == self.HALF_OPEN:
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._trial_in_flight = False
+
+
+def percentile(values, fraction):
+    """
+    정렬된 값 목록에서 백분위수를 반환 (최근접 순위 방식)
+    """
+    if not values:
+        return None
+    rank = max(1, math.ceil(fraction * len(values)))
+    return values[rank - 1]
+
+
+class RequestScheduler:
+    """
+    요청 실행기
+    - 토큰 버킷으로 분당 요청 수 제한 (대기 중인 요청 수를 queue_depth로 기록)
+    - 요청마다 timeout 적용 (요청 함수에 timeout 인자로 전달)
+    - 일시적 오류는 지수 백오프 + 지터로 재시도
+    - 연속 실패 시 서킷 브레이커로 차단
+    """
+
+    def __init__(self, timeout=60.0, requests_per_minute=60, burst=5, max_attempts=4,
+                 base_delay=1.0, max_delay=20.0, failure_threshold=5, reset_timeout=30.0,
+                 clock=time.monotonic, sleep=time.sleep, rng=None):
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._clock = clock
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+        self.limiter = TokenBucket(requests_per_minute / 60.0, burst, clock=clock, sleep=sleep)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout, clock=clock)
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.rejected = 0
+
+    def backoff_delay(self, attempt):
+        """
+        attempt번째 재시도 전 대기 시간 (full jitter 방식)
+        """
+        return self._rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _wait_for_slot(self):
+        with self._lock:
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            self.limiter.acquire()
+        finally:
+            with self._lock:
+                self.queue_depth -= 1
+
+    def call(self, request, timeout=None):
+        """
+        request(timeout=초)를 스케줄링하여 실행하고 결과를 반환
+
+        Raises:
+            CircuitOpenError: 서킷 브레이커가 열려 있는 경우
+            마지막 시도의 예외: 재시도할 수 없는 오류이거나 재시도 횟수를 모두 사용한 경우
+        """
+        timeout = timeout or self.timeout
+        with self._lock:
+            self.calls += 1
+
+        for attempt in range(self.max_attempts):
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                with self._lock:
+                    self.rejected += 1
+                    self.failures += 1
+                raise
+
+            self._wait_for_slot()
+            started = self._clock()
+            try:
+                result = request(timeout=timeout)
+            except Exception as e:
+                retryable = is_retryable(e)
+                if retryable:
+                    self.breaker.record_failure()
+                else:
+                    # 잘못된 요청 등은 서버 상태와 무관하므로 차단 판단에 넣지 않음
+                    self.breaker.record_success()
+                if not retryable or attempt == self.max_attempts - 1:
+                    with self._lock:
+                        self.failures += 1
+                    raise
+                with self._lock:
+                    self.retries += 1
+                self._sleep(self.backoff_delay(attempt))
+                continue
+
+            self.breaker.record_success()
+            with self._lock:
+                self.successes += 1
+                self._latencies.append(self._clock() - started)
+            return result
+
+    def metrics(self):
+        """
+        대기열 길이, 재시도 횟수, 응답 시간 백분위수(초) 등 현재 지표를 반환
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "calls": self.calls,
+                "successes": self.successes,
+                "failures": self.failures,
+                "retries": self.retries,
+                "rejected": self.rejected,
+                "circuit_state": self.breaker.state,
+                "latency_p50": percentile(latencies, 0.50),
+                "latency_p95": percentile(latencies, 0.95),
+                "latency_p99": percentile(latencies, 0.99),
+            }
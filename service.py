@@ -0,0 +1,197 @@
+"""
+수도요금 청구서 처리 HTTP 서비스 (aiohttp, Streamlit 없이 실행)
+
+사용 예:
+    python service.py --port 8080
+
+엔드포인트:
+    POST /extract        청구서 파일(multipart 'file' 또는 본문 + ?filename=)을 분석하여 JSON 반환
+                         ?document=1이면 공문(ODT)을 생성하여 파일로 반환
+    POST /document       추출 데이터(JSON)로 공문(ODT)을 생성하여 반환
+    GET  /health         상태 확인
+    GET  /metrics        캐시, 처리 이력, 요청 스케줄러, 모델 라우팅, 단계별 처리 시간 지표
+                         ?format=prometheus이면 Prometheus 텍스트 형식으로 반환
+"""
+import argparse
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from aiohttp import web
+from dotenv import load_dotenv
+
+from batch import DEFAULT_CONCURRENCY
+from bill_store import BillStore
+from bill_schema import BillData
+from extraction import GEMINI_MODEL_NAME, SUPPORTED_EXTENSIONS
+from extraction_cache import ExtractionCache
+from gemini_client import get_model, get_scheduler
+from image_utils import PreprocessOptions
+from model_router import FAST_MODEL_NAME, default_router, router_stats
+from pipeline import BillPipeline, calculate_lab_fees
+from tracing import configure_json_logging, tracer
+
+# 업로드 크기 제한 (Gemini 인라인 요청 한도와 같은 20MB)
+MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+ODT_MIME_TYPE = "application/vnd.oasis.opendocument.text"
+
+_PIPELINE = web.AppKey("pipeline", BillPipeline)
+_EXECUTOR = web.AppKey("executor", ThreadPoolExecutor)
+
+
+def _run_blocking(request, func, *args):
+    # 파이프라인은 동기 코드이므로 공유 스레드 풀에서 실행하여 이벤트 루프를 막지 않음
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(request.app[_EXECUTOR], func, *args)
+
+
+def _odt_response(content, file_name):
+    return web.Response(
+        body=content,
+        content_type=ODT_MIME_TYPE,
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(file_name)}"},
+    )
+
+
+async def _read_upload(request):
+    """
+    요청에서 (파일명, 바이트)를 읽음 (multipart의 'file' 필드 또는 요청 본문)
+    """
+    if request.content_type.startswith("multipart/"):
+        reader = await request.multipart()
+        async for part in reader:
+            if part.name == "file":
+                return part.filename or "upload", await part.read()
+        raise web.HTTPBadRequest(text="multipart 요청에 'file' 필드가 없습니다.")
+
+    file_name = request.query.get("filename")
+    if not file_name:
+        raise web.HTTPBadRequest(text="요청 본문으로 보낼 때는 ?filename= 파라미터가 필요합니다.")
+    return file_name, await request.read()
+
+
+async def handle_extract(request):
+    file_name, data = await _read_upload(request)
+    if not file_name.lower().endswith(SUPPORTED_EXTENSIONS):
+        raise web.HTTPUnsupportedMediaType(text=f"지원하지 않는 파일 형식입니다: {file_name}")
+
+    with_document = request.query.get("document") in ("1", "true")
+    result = await _run_blocking(request, request.app[_PIPELINE].process, file_name, data, with_document)
+    if not result.success:
+        return web.json_response(result.to_dict(), status=422)
+    if with_document:
+        stem = os.path.splitext(os.path.basename(file_name))[0]
+        return _odt_response(result.document, f"수도요금부과_{stem}.odt")
+    return web.json_response(result.to_dict())
+
+
+async def handle_document(request):
+    try:
+        parsed_data = BillData.from_mapping(await request.json()).to_dict()
+        calculate_lab_fees(parsed_data)
+    except ValueError as e:
+        raise web.HTTPBadRequest(text=f"추출 데이터가 올바르지 않습니다: {e}")
+
+    try:
+        content, _ = await _run_blocking(request, request.app[_PIPELINE].build_document, parsed_data)
+    except (FileNotFoundError, RuntimeError) as e:
+        raise web.HTTPInternalServerError(text=str(e))
+    return _odt_response(content, "수도요금부과.odt")
+
+
+async def handle_health(request):
+    return web.json_response({"status": "ok"})
+
+
+async def handle_metrics(request):
+    if request.query.get("format") == "prometheus":
+        return web.Response(text=tracer.prometheus_text(), content_type="text/plain",
+                            headers={"X-Prometheus-Format": "0.0.4"})
+    pipeline = request.app[_PIPELINE]
+    cache, store = pipeline.cache, pipeline.store
+    return web.json_response({
+        "cache": cache.stats() if cache is not None else None,
+        "history": store.stats() if store is not None else None,
+        "scheduler": get_scheduler().metrics(),
+        "routing": router_stats.summary() if pipeline.router is not None else None,
+        "stages": tracer.stage_summary(),
+        "counters": tracer.counters(),
+    })
+
+
+def create_app(pipeline, concurrency=DEFAULT_CONCURRENCY):
+    """
+    파이프라인을 사용하는 aiohttp 애플리케이션을 생성
+    """
+    app = web.Application(client_max_size=MAX_UPLOAD_BYTES)
+    app[_PIPELINE] = pipeline
+    app[_EXECUTOR] = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="service-worker")
+
+    async def shutdown_executor(app):
+        app[_EXECUTOR].shutdown(wait=False)
+
+    app.on_cleanup.append(shutdown_executor)
+    app.add_routes([
+        web.post("/extract", handle_extract),
+        web.post("/document", handle_document),
+        web.get("/health", handle_health),
+        web.get("/metrics", handle_metrics),
+    ])
+    return app
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="수도요금 청구서 처리 HTTP 서비스")
+    parser.add_argument("--host", default="127.0.0.1", help="바인딩할 주소 (기본값: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="포트 (기본값: 8080)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"동시에 처리할 최대 요청 수 (기본값: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--model", default=GEMINI_MODEL_NAME, help="사용할 Gemini 모델명")
+    parser.add_argument("--template", help="공문 템플릿 ODT 경로 (기본값: 서식 폴더에서 찾음)")
+    parser.add_argument("--local-first", action="store_true",
+                        help="텍스트가 있는 PDF는 인쇄된 항목을 로컬에서 먼저 읽고 나머지만 Gemini에 요청")
+    parser.add_argument("--route", action="store_true",
+                        help="빠른 모델로 먼저 분석하고, 일관성 검사에 실패한 청구서만 --model로 다시 요청")
+    parser.add_argument("--fast-model", default=FAST_MODEL_NAME,
+                        help=f"--route에서 먼저 사용할 빠른 모델 (기본값: {FAST_MODEL_NAME})")
+    parser.add_argument("--no-cache", action="store_true", help="분석 결과 캐시를 사용하지 않음")
+    parser.add_argument("--no-history", action="store_true",
+                        help="처리 이력을 사용하지 않음 (이미 처리한 청구서도 다시 분석)")
+    parser.add_argument("--trace-log", help="단계별 span과 오류를 JSON Lines로 기록할 파일 (\"-\"이면 표준 오류, "
+                                            "기본값: TRACE_LOG 환경 변수)")
+    parser.add_argument("--otel", action="store_true",
+                        help="opentelemetry가 설치되어 있으면 span을 OpenTelemetry로도 전달")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    load_dotenv(dotenv_path='gemini.env')
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        raise SystemExit("❌ GEMINI_API_KEY가 설정되지 않았습니다.")
+    configure_json_logging(args.trace_log)
+    if args.otel and not tracer.enable_opentelemetry():
+        print("⚠️ opentelemetry가 설치되어 있지 않아 OpenTelemetry 전달을 건너뜁니다.")
+
+    # 첫 요청이 모델 생성 비용을 치르지 않도록 미리 생성
+    router = default_router(args.model, args.fast_model) if args.route else None
+    model_names = [tier.model_name for tier in router.tiers] if router is not None else [args.model]
+    for model_name in model_names:
+        get_model(api_key, model_name)
+    pipeline = BillPipeline(
+        api_key,
+        model_name=args.model,
+        cache=None if args.no_cache else ExtractionCache(),
+        preprocess=PreprocessOptions(),
+        template_path=args.template,
+        local_first=args.local_first,
+        store=None if args.no_history else BillStore(),
+        router=router,
+    )
+    web.run_app(create_app(pipeline, args.concurrency), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
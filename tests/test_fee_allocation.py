@@ -0,0 +1,130 @@
+"""
+fee_allocation 속성 검사 (무작위 청구서, 고정 시드)
+
+- 연구소별 정확한 배분액(유리수)의 합이 연구소 합계 요금과 정확히 같고,
+  연구소가 전체 사용량을 나누어 쓰면 납기 내 금액과 같은지
+- 반올림한 부과액이 정확한 배분액에서 반올림 단위 이내이고, 나머지가 remainder_bound 범위 안인지
+- allocate_batch(NumPy 정수 연산과 Python 정수 대체 경로)가 allocate와 행마다 같은 결과를 내는지
+"""
+import os
+import random
+import sys
+from fractions import Fraction
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fee_allocation import (  # noqa: E402
+    CEILING,
+    HALF_UP,
+    ROUNDING_MODES,
+    TRUNCATE,
+    RoundingPolicy,
+    allocate,
+    allocate_batch,
+    remainder_bound,
+)
+
+BILLS = 300
+LAB_COUNTS = (1, 2, 3, 5)
+POLICIES = [RoundingPolicy(unit=unit, mode=mode) for mode in ROUNDING_MODES for unit in (1, 10, 100)]
+
+
+def random_bills(count, labs, seed, max_amount=50_000_000, cover_usage=False):
+    """
+    (금액, 전체 사용량, 연구소별 사용량) 목록 (사용량은 0.001 단위, 연구소 합계 ≤ 전체 사용량)
+    cover_usage이면 마지막 연구소가 남은 사용량을 모두 사용
+    """
+    rng = random.Random(seed)
+    bills = []
+    for _ in range(count):
+        remaining = rng.randint(1, 5_000_000)
+        total_usage = remaining / 1000
+        amount = rng.randint(0, max_amount)
+        lab_usages = []
+        for index in range(labs):
+            share = remaining if cover_usage and index == labs - 1 else rng.randint(0, remaining)
+            lab_usages.append(share / 1000)
+            remaining -= share
+        bills.append((amount, total_usage, lab_usages))
+    return bills
+
+
+def lab_dict(lab_usages):
+    return {f"lab{number}": value for number, value in enumerate(lab_usages, start=1)}
+
+
+def policy_id(policy):
+    return f"{policy.mode}-{policy.unit}"
+
+
+@pytest.mark.parametrize("labs", LAB_COUNTS)
+def test_exact_shares_sum_to_total(labs):
+    for amount, usage, lab_usages in random_bills(BILLS, labs, seed=labs, cover_usage=True):
+        allocation = allocate(amount, usage, lab_dict(lab_usages))
+        exact = [allocation.unit_price * Fraction(str(value)) for value in lab_usages]
+
+        assert sum(exact) == allocation.unit_price * allocation.lab_usage
+        # 연구소가 전체 사용량을 나누어 쓰면 정확한 배분액의 합은 납기 내 금액과 같음
+        assert allocation.lab_usage == Fraction(str(usage))
+        assert sum(exact) == amount
+        assert sum(allocation.shares.values()) + allocation.remainder == allocation.total
+
+
+@pytest.mark.parametrize("policy", POLICIES, ids=policy_id)
+@pytest.mark.parametrize("labs", LAB_COUNTS)
+def test_rounding_stays_within_bounds(labs, policy):
+    low, high = remainder_bound(labs, policy)
+    for amount, usage, lab_usages in random_bills(BILLS, labs, seed=labs * 100 + policy.unit):
+        allocation = allocate(amount, usage, lab_dict(lab_usages), policy)
+
+        assert low <= allocation.remainder <= high
+        for value, share in zip(lab_usages, allocation.shares.values()):
+            assert share % policy.unit == 0
+            error = share - allocation.unit_price * Fraction(str(value))
+            if policy.mode == TRUNCATE:
+                assert -policy.unit < error <= 0
+            elif policy.mode == CEILING:
+                assert 0 <= error < policy.unit
+            else:
+                assert -Fraction(policy.unit, 2) <= error <= Fraction(policy.unit, 2)
+
+
+def assert_batch_matches_scalar(bills, policy):
+    shares, totals = allocate_batch(
+        [bill[0] for bill in bills], [bill[1] for bill in bills], [bill[2] for bill in bills], policy
+    )
+    for index, (amount, usage, lab_usages) in enumerate(bills):
+        allocation = allocate(amount, usage, lab_dict(lab_usages), policy)
+        assert shares[index].tolist() == list(allocation.shares.values())
+        assert int(totals[index]) == allocation.total
+
+
+@pytest.mark.parametrize("policy", POLICIES, ids=policy_id)
+@pytest.mark.parametrize("labs", LAB_COUNTS)
+def test_batch_matches_scalar(labs, policy):
+    pytest.importorskip("numpy")
+    assert_batch_matches_scalar(random_bills(BILLS, labs, seed=labs * 1000 + policy.unit), policy)
+
+
+@pytest.mark.parametrize("policy", POLICIES, ids=policy_id)
+def test_batch_object_fallback_matches_scalar(policy):
+    pytest.importorskip("numpy")
+    # 금액 × 사용량이 int64 범위를 넘는 큰 금액이면 Python 정수(object 배열) 경로로 계산
+    bills = random_bills(50, 2, seed=policy.unit, max_amount=10 ** 13)
+    bills.append((10 ** 13, 5000.0, [2500.0, 2500.0]))
+    assert_batch_matches_scalar(bills, policy)
+
+
+def test_batch_zero_usage_rows_are_zero():
+    pytest.importorskip("numpy")
+    shares, totals = allocate_batch([10_000, 7_080], [0, 30], [[1, 2], [10, 20]])
+    assert shares[0].tolist() == [0, 0] and int(totals[0]) == 0
+    assert shares[1].tolist() == list(allocate(7_080, 30, {"lab1": 10, "lab2": 20}).shares.values())
+
+
+def test_half_up_rounds_halves_up():
+    policy = RoundingPolicy(unit=10, mode=HALF_UP)
+    assert allocate(15, 1, {"lab1": 1}, policy).shares["lab1"] == 20
+    assert allocate(14, 1, {"lab1": 1}, policy).shares["lab1"] == 10
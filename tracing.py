@@ -0,0 +1,326 @@
+"""
+경량 성능 추적 (단계별 span, 카운터, JSON 로그)
+
+PDF 변환, 이미지 전처리, Gemini 호출, JSON 해석, ODT 작성 등 단계마다 span을 기록하여
+청구서 한 건의 처리 시간이 어디에 쓰이는지 확인합니다.
+- tracer.span(name) / @traced(name): 단계별 소요 시간 (최근 기록으로 p50/p95/p99 계산)
+- tracer.increment(name, value): API 호출 수, 캐시 적중, 전송 바이트 등 카운터
+- configure_json_logging: span과 오류를 JSON Lines 로그로 기록 (환경 변수 TRACE_LOG)
+- prometheus_text / enable_opentelemetry / export: Prometheus 형식, OpenTelemetry(설치된 경우), 파일 내보내기
+"""
+import contextvars
+import functools
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
+
+from request_scheduler import percentile
+
+# 단계별로 보관할 최근 소요 시간 수와 최근 span 기록 수
+DEFAULT_STAGE_HISTORY = 1000
+DEFAULT_RECENT_SPANS = 200
+
+# JSON 로그를 기록할 파일 경로 ("-"이면 표준 오류)
+TRACE_LOG_ENV = "TRACE_LOG"
+
+logger = logging.getLogger("trace")
+# 핸들러를 설정하지 않았으면(TRACE_LOG 없음) 실패한 span이 logging.lastResort로 표준 오류에 출력되지 않도록 함
+logger.addHandler(logging.NullHandler())
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+@dataclass
+class SpanRecord:
+    """완료된 span 한 건"""
+    name: str
+    span_id: int
+    parent_id: int = None
+    started_at: float = 0.0
+    duration: float = 0.0
+    attributes: dict = field(default_factory=dict)
+    error: str = None
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class Tracer:
+    """
+    프로세스 전체에서 공유하는 span·카운터 기록기 (스레드 안전)
+    """
+
+    def __init__(self, stage_history=DEFAULT_STAGE_HISTORY, recent_spans=DEFAULT_RECENT_SPANS):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._durations = defaultdict(lambda: deque(maxlen=stage_history))
+        self._counts = defaultdict(int)
+        self._totals = defaultdict(float)
+        self._errors = defaultdict(int)
+        self._counters = defaultdict(float)
+        self._recent = deque(maxlen=recent_spans)
+        self._otel_tracer = None
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """
+        단계 하나의 소요 시간을 기록하는 context manager
+        반환되는 딕셔너리에 값을 넣으면 span 속성으로 함께 기록됨
+
+        예:
+            with tracer.span("odt.render", template=path) as attrs:
+                attrs["bytes"] = len(content)
+        """
+        span_id = next(self._ids)
+        parent_id = _current_span.get()
+        token = _current_span.set(span_id)
+        otel_span = (self._otel_tracer.start_as_current_span(name)
+                     if self._otel_tracer is not None else nullcontext())
+        started_at = time.time()
+        started = time.perf_counter()
+        error = None
+        try:
+            with otel_span as current:
+                yield attributes
+                if current is not None:
+                    for key, value in attributes.items():
+                        current.set_attribute(key, value if isinstance(value, (str, int, float, bool)) else str(value))
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            self._finish(SpanRecord(
+                name=name,
+                span_id=span_id,
+                parent_id=parent_id,
+                started_at=started_at,
+                duration=time.perf_counter() - started,
+                attributes=attributes,
+                error=error,
+            ))
+
+    def traced(self, name):
+        """
+        함수 호출 전체를 span으로 기록하는 decorator
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record(self, name, duration, error=None, **attributes):
+        """
+        직접 잰 소요 시간을 span으로 기록 (generator처럼 context manager로 감싸기 어려운 단계용)
+        """
+        self._finish(SpanRecord(
+            name=name,
+            span_id=next(self._ids),
+            parent_id=_current_span.get(),
+            started_at=time.time() - duration,
+            duration=duration,
+            attributes=attributes,
+            error=error,
+        ))
+
+    def _finish(self, record):
+        with self._lock:
+            self._durations[record.name].append(record.duration)
+            self._counts[record.name] += 1
+            self._totals[record.name] += record.duration
+            if record.error:
+                self._errors[record.name] += 1
+            self._recent.append(record)
+        if record.error:
+            logger.warning("span failed", extra={"fields": record.to_dict()})
+        elif logger.isEnabledFor(logging.INFO):
+            logger.info("span", extra={"fields": record.to_dict()})
+
+    def increment(self, name, value=1):
+        """
+        카운터를 value만큼 증가 (예: "gemini.calls", "cache.hits", "gemini.bytes_uploaded")
+        """
+        with self._lock:
+            self._counters[name] += value
+
+    def stage_summary(self):
+        """
+        단계별 호출 수, 오류 수, 평균과 최근 기록의 p50/p95/p99 소요 시간(초)
+        """
+        with self._lock:
+            stages = {name: sorted(durations) for name, durations in self._durations.items()}
+            counts, totals, errors = dict(self._counts), dict(self._totals), dict(self._errors)
+        return {
+            name: {
+                "count": counts[name],
+                "errors": errors.get(name, 0),
+                "avg": totals[name] / counts[name],
+                "p50": percentile(durations, 0.50),
+                "p95": percentile(durations, 0.95),
+                "p99": percentile(durations, 0.99),
+            }
+            for name, durations in sorted(stages.items())
+        }
+
+    def counters(self):
+        """
+        카운터 값 (정수로 표현되는 값은 정수로 반환)
+        """
+        with self._lock:
+            items = sorted(self._counters.items())
+        return {name: int(value) if float(value).is_integer() else value for name, value in items}
+
+    def recent_spans(self, limit=None):
+        """
+        최근 span 기록 (최신 순)
+        """
+        with self._lock:
+            records = list(self._recent)
+        records.reverse()
+        return records[:limit] if limit is not None else records
+
+    def snapshot(self):
+        """
+        단계별 요약, 카운터, 최근 span을 JSON으로 저장할 수 있는 딕셔너리로 반환
+        """
+        return {
+            "generated_at": time.time(),
+            "stages": self.stage_summary(),
+            "counters": self.counters(),
+            "spans": [record.to_dict() for record in self.recent_spans()],
+        }
+
+    def export(self, path):
+        """
+        snapshot을 JSON 파일로 저장하고 경로를 반환
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2, default=str)
+        return path
+
+    def prometheus_text(self, prefix="gemini_bill"):
+        """
+        Prometheus 텍스트 형식(0.0.4)의 지표
+        단계별 소요 시간은 summary, 오류 수와 카운터는 counter로 출력
+        """
+        lines = [
+            f"# HELP {prefix}_stage_seconds 단계별 처리 시간 (초)",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        summary = self.stage_summary()
+        with self._lock:
+            totals = dict(self._totals)
+        for name, stage in summary.items():
+            label = f'stage="{_escape_label(name)}"'
+            for key, quantile in (("p50", "0.5"), ("p95", "0.95"), ("p99", "0.99")):
+                lines.append(f'{prefix}_stage_seconds{{{label},quantile="{quantile}"}} {stage[key]}')
+            lines.append(f"{prefix}_stage_seconds_sum{{{label}}} {totals[name]}")
+            lines.append(f"{prefix}_stage_seconds_count{{{label}}} {stage['count']}")
+
+        lines += [
+            f"# HELP {prefix}_stage_errors_total 단계별 오류 수",
+            f"# TYPE {prefix}_stage_errors_total counter",
+        ]
+        lines += [f'{prefix}_stage_errors_total{{stage="{_escape_label(name)}"}} {stage["errors"]}'
+                  for name, stage in summary.items()]
+
+        for name, value in self.counters().items():
+            metric = f"{prefix}_{_METRIC_NAME_PATTERN.sub('_', name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def enable_opentelemetry(self, service_name="gemini-bill"):
+        """
+        opentelemetry가 설치되어 있으면 span을 OpenTelemetry로도 전달 (설치되지 않았으면 False)
+        exporter 설정(TracerProvider)은 애플리케이션이나 opentelemetry-instrument가 담당
+        """
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            return False
+        self._otel_tracer = trace.get_tracer(service_name)
+        return True
+
+    def reset(self):
+        """
+        모든 기록을 지움
+        """
+        with self._lock:
+            for store in (self._durations, self._counts, self._totals, self._errors,
+                          self._counters, self._recent):
+                store.clear()
+
+
+_METRIC_NAME_PATTERN = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def _escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+tracer = Tracer()
+span = tracer.span
+traced = tracer.traced
+increment = tracer.increment
+
+
+class JsonLogFormatter(logging.Formatter):
+    """
+    로그 레코드를 한 줄짜리 JSON으로 변환 (extra={"fields": {...}}의 값을 함께 기록)
+    """
+
+    def format(self, record):
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_json_logging(path=None, level=logging.INFO):
+    """
+    루트 로거에 JSON Lines 핸들러를 추가 (path가 없거나 "-"이면 표준 오류)
+    path를 지정하지 않으면 환경 변수 TRACE_LOG를 사용하고, 그것도 없으면 아무것도 하지 않음
+
+    Returns:
+        추가한 핸들러 (설정하지 않았으면 None)
+    """
+    path = path or os.environ.get(TRACE_LOG_ENV)
+    if not path:
+        return None
+    root = logging.getLogger()
+    for handler in root.handlers:
+        if getattr(handler, "_trace_log_path", None) == path:
+            return handler
+
+    if path == "-":
+        handler = logging.StreamHandler()
+    else:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handler = logging.FileHandler(path, encoding="utf-8")
+    handler._trace_log_path = path
+    handler.setFormatter(JsonLogFormatter())
+    root.addHandler(handler)
+    if root.level > level or root.level == logging.NOTSET:
+        root.setLevel(level)
+    return handler